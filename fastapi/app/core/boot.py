@@ -0,0 +1,34 @@
+"""Worker boot timing reported by ``/health``.
+
+``STARTED`` is taken when ``app.main`` begins importing (this module is its
+first import); ``mark_imported`` closes the import phase and ``mark_ready``
+is called once the lifespan hook has loaded the model stack.
+"""
+import time
+from typing import Dict, Optional
+
+STARTED = time.perf_counter()
+_imported: Optional[float] = None
+_ready: Optional[float] = None
+
+
+def mark_imported() -> None:
+    global _imported
+    _imported = time.perf_counter()
+
+
+def mark_ready() -> None:
+    global _ready
+    _ready = time.perf_counter()
+
+
+def _ms(t: Optional[float]) -> Optional[float]:
+    return None if t is None else round((t - STARTED) * 1000.0, 1)
+
+
+def timings() -> Dict[str, Optional[float]]:
+    """Milliseconds from the start of ``import app.main`` to import end and to readiness."""
+    return {"import_ms": _ms(_imported), "boot_ms": _ms(_ready)}
+
+
+__all__ = ["STARTED", "mark_imported", "mark_ready", "timings"]
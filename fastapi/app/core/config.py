@@ -6,6 +6,7 @@ from pathlib import Path
 
 _HERE = Path(__file__).resolve().parent
 _DEFAULT_PARAMS = _HERE.parent / "services" / "params_45R4.json"
+_DEFAULT_MODEL_DIR = _HERE.parent.parent / "models"
 
 
 class Settings(BaseSettings):
@@ -16,10 +17,55 @@ class Settings(BaseSettings):
     RESAMPLE_AUDIO_HZ: int = 16000
     RESAMPLE_EEG_HZ: int = 128
     DEFAULT_LIGO_FS: int = 4096
+    RESAMPLE_LIGO_HZ: int = 0        # LIGO analysis rate; 0 = native. Integer divisors decimate on read
+    LIGO_READ_BLOCK_SAMPLES: int = 1_048_576  # full-rate samples per block when decimating on read
     DEFAULT_GRACE_FS: int = 100
     MODEL_PARAMS_FILE: str = str(_DEFAULT_PARAMS)
+    MODEL_DIR: str = str(_DEFAULT_MODEL_DIR)
+    MODEL_VERSION: str = "45R4-1"
+    MODEL_AUTOTRAIN: bool = True     # train + persist in-process when no artifact exists
+    MODEL_MMAP: bool = True          # memory-map array payloads read-only (shared page cache)
+    ALIGNMENT_MODE: str = "target"   # target (frozen model) | source (per-request retrain) | none
+    USE_SURROGATE: bool = False      # serve the RF+Ridge blend from a distilled lookup table
+    SURROGATE_RESOLUTION: int = 9    # grid points per feature axis (9 -> ~230 KB)
+    KITAB_BOOTSTRAP_RUNS: int = 40
+    KITAB_BOOTSTRAP_TOL: float = 0.0  # >0 stops once the 2.5/97.5 bounds move less than this
+    DOMAIN_WORKERS: int = 0          # processes for per-domain analysis; 0 = CPUs / WEB_CONCURRENCY, 1 = serial
+    WEB_CONCURRENCY: int = 1         # server processes on this host, each with its own pool (set by gunicorn.conf.py)
+    POOL_START_METHOD: str = "fork"  # fork shares the preloaded models; spawn/forkserver reload them
+    IO_WORKERS: int = 8              # threads reading/decoding uploads off the event loop
+    SHARED_MEMORY_MIN_BYTES: int = 262144  # arrays this large reach pool workers via shared memory
+    FEATURE_BATCH_SIZE: int = 8      # uploads of one domain featurised per batched pass
+    DEFAULT_PLAN: str = "full"       # fast | standard | full when a request names neither
+    PLAN_FAST_MAX_MS: float = 1000   # latency_budget_ms at or below this -> fast
+    PLAN_STANDARD_MAX_MS: float = 10000
+    FEATURE_WINDOW_SEC: float = 30.0  # leading span of each recording the ψ-features look at
+    WINDOWED_READS: bool = True      # loaders read only that span (+ padding) instead of whole files
+    FEATURE_READ_PAD_SEC: float = 10.0  # extra read past the window so filters settle at its end
+    TIMELINE_WINDOW_SEC: float = 30.0   # default window for /predict/timeline
+    TIMELINE_HOP_SEC: float = 15.0      # default hop between window starts
+    TIMELINE_CHUNK_WINDOWS: int = 16    # windows read and conditioned together per pool task
+    TIMELINE_MAX_WINDOWS: int = 100000  # refuse layouts longer than this
+    FEATURE_CACHE: bool = True       # reuse ψ-features of byte-identical uploads
+    FEATURE_CACHE_MAX_MB: float = 256   # in-process LRU budget
+    FEATURE_CACHE_DIR: str | None = None  # on-disk tier shared by workers (None = UPLOAD_DIR/feature_cache, "" = memory only)
+    FEATURE_CACHE_DISK_MAX_MB: float = 2048
+    FEATURE_CACHE_ARRAYS: bool = True   # also keep window/env so cached results still get plots
+    PRECISION: str = "float64"       # float64 | float32 working precision of the signal pipeline
+    FFT_WORKERS: int = -1            # scipy.fft workers for large transforms (-1 = all CPUs)
+    FFT_PARALLEL_MIN_SAMPLES: int = 262144  # blocks smaller than this stay single-threaded
     MAX_LIGO_SAMPLES: int = 2_000_000
     MAX_GRACE_TIMESTEPS: int = 10000
+    GRACE_CHUNK_TIMESTEPS: int = 64  # time steps per block when reducing a GRACE cube
+    GRACE_AREA_WEIGHTED: bool = False  # weight grid cells by cos(latitude)
+    GRACE_BBOX: str = ""             # "lat_min,lat_max,lon_min,lon_max" subset ("" = whole grid)
+    IMPORT_BUDGET_MS: float = 1500   # tests fail if `import app.main` takes longer
+    JOBS_BACKEND: str = "sqlite"     # memory (per process) | sqlite (shared by every worker)
+    JOBS_DB: str | None = None       # sqlite file (None = UPLOAD_DIR/jobs.sqlite3)
+    JOBS_WORKERS: int = 1            # threads running queued jobs in each process
+    JOBS_TTL_SEC: float = 3600       # how long finished jobs keep their results
+    JOBS_POLL_SEC: float = 1.0       # idle workers re-check the queue this often
+    JOBS_LEASE_SEC: float = 300      # running jobs not renewed for this long are queued again
     AWS_REGION: str | None = None
     S3_BUCKET: str | None = None
     S3_PREFIX: str = "phase45/uploads/"
@@ -0,0 +1,52 @@
+"""Deferred imports for heavy dependencies.
+
+``lazy_import("scipy.signal")`` returns a stand-in module that imports the
+real one on first attribute access. Heavy libraries such as SciPy, sklearn,
+h5py, soundfile and matplotlib therefore load the first time a request needs
+them, not when ``app.main`` is imported. That keeps worker boot and
+``/health`` fast. Missing optional packages only fail when they are used;
+check for them with ``has_module``.
+"""
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+from functools import lru_cache
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports ``name`` on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+
+    def _load(self) -> types.ModuleType:
+        with self._lazy_lock:
+            module = importlib.import_module(self.__name__)
+            self.__dict__.update(module.__dict__)  # later lookups skip __getattr__
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """``name`` itself when already imported, otherwise a ``LazyModule`` for it."""
+    return sys.modules.get(name) or LazyModule(name)
+
+
+@lru_cache(maxsize=None)
+def has_module(name: str) -> bool:
+    """Whether ``name`` is importable; checked once per process, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+__all__ = ["LazyModule", "has_module", "lazy_import"]
@@ -1,15 +1,37 @@
+from .core import boot  # first, so boot timings cover every import below
+
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import PlainTextResponse
 
 from .core.config import settings
-from .routers import health, predict, spectro, surface
+from .routers import health, jobs, predict, spectro, surface, timeline
+from .services import executors
+from .services import jobs as job_queue
+from .services.registry import get_models
 try:
     from .routers import uploads
 except ImportError:
     uploads = None
 
-app = FastAPI(title=settings.APP_NAME)
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # load (or build) the frozen model stack once so /predict only runs inference
+    get_models()
+    # fork the domain workers before any I/O or job thread exists; they share the loaded models
+    executors.start_domain_pool()
+    boot.mark_ready()
+    job_queue.resume()  # pick up jobs queued before a restart
+    yield
+    job_queue.reset()
+    executors.reset_domain_pool()
+    executors.reset_io_pool()
+
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +55,8 @@ app.include_router(health.router, prefix=settings.API_PREFIX, tags=["health"])
 app.include_router(predict.router, prefix=settings.API_PREFIX, tags=["predict"])
 app.include_router(spectro.router, prefix=settings.API_PREFIX, tags=["spectrogram"])
 app.include_router(surface.router, prefix=settings.API_PREFIX, tags=["psi-surface"])
+app.include_router(timeline.router, prefix=settings.API_PREFIX, tags=["predict"])
+app.include_router(jobs.router, prefix=settings.API_PREFIX, tags=["jobs"])
 if uploads is not None:
     app.include_router(uploads.router, prefix=settings.API_PREFIX, tags=["uploads"])
 
@@ -45,3 +69,5 @@ try:
         return PlainTextResponse(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 except Exception:
     pass
+
+boot.mark_imported()
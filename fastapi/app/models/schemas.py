@@ -8,6 +8,16 @@ class DomainEnum(str, Enum):
     ligo  = "ligo"
     grace = "grace"
 
+class AlignmentEnum(str, Enum):
+    target = "target"   # map upload features into the synthetic space, frozen model
+    source = "source"   # CORAL the synthetic set onto the upload and retrain
+    none   = "none"
+
+class PlanEnum(str, Enum):
+    fast     = "fast"       # Kitab point estimate only
+    standard = "standard"   # + RF blend and bootstrap intervals
+    full     = "full"       # + plots / zip assets
+
 class FileResult(BaseModel):
     name: str
     domain: str
@@ -30,6 +40,7 @@ class FileResult(BaseModel):
     delta_ct: float | None = None
     error: bool = False
     error_message: str | None = None
+    channels: Optional[List[dict]] = None   # per-channel features for multichannel uploads
 
 class PredictResponse(BaseModel):
     results: List[FileResult]
@@ -39,6 +50,7 @@ class PredictResponse(BaseModel):
     delta_mean: Optional[float] = None
     zip_base64: Optional[str] = None
     zip_filename: Optional[str] = None
+    plan: Optional[dict] = None
 
 class SpectrogramResponse(BaseModel):
     t: list[float]
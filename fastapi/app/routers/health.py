@@ -3,6 +3,9 @@ import os
 
 from fastapi import APIRouter
 
+from ..core import boot
+from ..services import feature_cache
+
 router = APIRouter()
 
 
@@ -12,4 +15,6 @@ def health():
         "ok": True,
         "timestamp": datetime.utcnow().isoformat() + "Z",
         "version": os.getenv("APP_VERSION", "unknown"),
+        "feature_cache": feature_cache.stats(),
+        **boot.timings(),
     }
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import List, Optional
+
+from fastapi import APIRouter, File, Form, Header, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+from ..core.config import settings
+from ..models.schemas import AlignmentEnum, DomainEnum, PlanEnum
+from ..services import feature_cache, jobs
+from ..services.executors import run_io
+from ..services.plans import alignment_for, select_plan
+
+router = APIRouter()
+
+
+def _fingerprint(params: dict, files: List[UploadFile]) -> str:
+    """Identity of a submission: its parameters plus the name and content hash of every file."""
+    h = hashlib.sha256(json.dumps(params, sort_keys=True).encode())
+    for up in files:
+        h.update(f"\0{up.filename or 'file'}\0{feature_cache.source_digest(up.file)}".encode())
+    return h.hexdigest()
+
+
+def _spool(job_id: str, files: List[UploadFile]) -> List[dict]:
+    directory = jobs.job_dir(job_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    spooled = []
+    for idx, up in enumerate(files):
+        name = up.filename or "file"
+        path = directory / f"{idx:04d}_{os.path.basename(name)}"
+        up.file.seek(0)
+        with open(path, "wb") as out:
+            shutil.copyfileobj(up.file, out)  # copied in blocks; uploads are never held whole
+        spooled.append({"name": name, "path": str(path)})
+    return spooled
+
+
+def _status(job: jobs.Job, code: int = 200) -> JSONResponse:
+    return JSONResponse(
+        job.public(),
+        status_code=code,
+        headers={"Location": f"{settings.API_PREFIX}/jobs/{job.id}"},
+    )
+
+
+@router.post("/jobs/predict", status_code=202)
+async def submit_predict_job(
+    domain: DomainEnum = Form(..., description="audio|eeg|ligo|grace"),
+    files: List[UploadFile] = File(...),
+    alignment: AlignmentEnum | None = Form(None, description="target|source|none (default: settings)"),
+    mode: PlanEnum | None = Form(None, description="fast|standard|full (default: settings)"),
+    latency_budget_ms: float | None = Form(None, description="pick the richest plan within this budget"),
+    multichannel: bool = Form(False, description="analyse every channel (EEG/ECG leads, stereo)"),
+    include_assets: bool = Form(False, description="embed the plots/CSV zip in the result"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """Queue a ``/predict`` run and return its id at once (202).
+
+    Poll ``GET /jobs/{id}`` for progress and fetch ``GET /jobs/{id}/result``
+    once it is done. Re-sending the same request with the same
+    ``Idempotency-Key`` returns the original job (200) instead of a new one.
+    """
+    try:
+        plan = select_plan(mode.value if mode else None, latency_budget_ms)
+        alignment_for(plan, alignment.value if alignment else None)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    params = {
+        "domain": domain.value,
+        "alignment": alignment.value if alignment else None,
+        "mode": mode.value if mode else None,
+        "latency_budget_ms": latency_budget_ms,
+        "multichannel": multichannel,
+        "include_assets": include_assets,
+    }
+    fingerprint = await run_io(_fingerprint, params, files) if idempotency_key else ""
+    try:
+        existing = await run_io(jobs.lookup, idempotency_key, fingerprint)
+        if existing is not None:
+            return _status(existing)
+        job = jobs.Job("predict", params, total=len(files), key=idempotency_key or None, fingerprint=fingerprint)
+        job.params["files"] = await run_io(_spool, job.id, files)
+        job, created = await run_io(jobs.submit, job)
+    except jobs.KeyConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return _status(job, 202 if created else 200)
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await run_io(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    return job.public()
+
+
+@router.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = await run_io(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job")
+    if job.status == jobs.FAILED:
+        raise HTTPException(status_code=409, detail=f"Job failed: {job.error}")
+    if job.status != jobs.DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status} ({job.done}/{job.total} files)")
+    return job.result
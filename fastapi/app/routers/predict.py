@@ -1,7 +1,7 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from pydantic import BaseModel
 from fastapi.responses import StreamingResponse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple, Callable
 import os
 import tempfile
 import io
@@ -10,19 +10,25 @@ import zipfile
 import json
 import base64
 import logging
+import zlib
+import asyncio
+from functools import lru_cache
 
 import numpy as np
-from scipy.signal import resample_poly, spectrogram
-from scipy.linalg import fractional_matrix_power
-from scipy.optimize import curve_fit
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.linear_model import Ridge
-from sklearn.metrics import r2_score, mean_absolute_error
-import soundfile as sf
-
-from ..models.schemas import DomainEnum, FileResult, PredictResponse
+
+from ..models.schemas import AlignmentEnum, DomainEnum, FileResult, PlanEnum, PredictResponse
 from ..core.config import settings
-from ..services.phase45 import run_phase45
+from ..core.lazy import lazy_import
+from ..services import feature_cache, jobs
+from ..services.loaders import detect_format, load_by_domain
+from ..services.phase45 import feature_read_span, run_phase45, run_phase45_batch
+from ..services.registry import get_models
+from ..services.executors import map_cpu, run_cpu, run_io, threads_per_worker
+from ..services.kitab import bootstrap_kitab
+from ..services.precision import as_work
+from ..services.plans import Plan, StageTimer, alignment_for, select_plan
+from ..services.surrogate import blend_predict
+from ..services.training import kitab_eval as _kitab_eval, train_models
 try:
     from ..services.s3_utils import download_to_tmp
 except Exception:
@@ -31,146 +37,157 @@ except Exception:
 logger = logging.getLogger(__name__)
 np.random.seed(42)
 
-try:
-    import matplotlib
-
-    matplotlib.use("Agg")
-    import matplotlib.pyplot as plt
-except Exception:  # plotting optional
-    plt = None
+signal = lazy_import("scipy.signal")
+skmetrics = lazy_import("sklearn.metrics")
 
-router = APIRouter()
 
-_EXT2DOMAIN = {
-    ".wav": DomainEnum.audio,
-    ".edf": DomainEnum.eeg,
-    ".h5": DomainEnum.ligo,
-    ".hdf5": DomainEnum.ligo,
-    ".nc": DomainEnum.grace,
-}
+@lru_cache(maxsize=1)
+def _figure():
+    """matplotlib's ``Figure``, or None; imported on the first plot.
 
+    Plots are drawn on standalone figures rather than through pyplot, whose
+    global state is not thread-safe: assets are rendered off the event loop.
+    """
+    try:
+        from matplotlib.figure import Figure
+    except Exception:  # plotting optional
+        return None
+    return Figure
 
-def _guess_domain(name: str) -> DomainEnum | None:
-    ext = os.path.splitext((name or "").lower())[1]
-    return _EXT2DOMAIN.get(ext)
+router = APIRouter()
 
+def _resolve_format(declared: DomainEnum, filename: str | None, source=None) -> Tuple[DomainEnum, str | None]:
+    """``(domain, format)`` of the file from one sniff; ``declared`` when the format is unrecognised.
 
-def _resolve_domain(declared: DomainEnum, filename: str | None) -> DomainEnum:
-    guessed = _guess_domain(filename or "")
-    if guessed and guessed != declared:
-        return guessed
-    return declared
+    Hand the format to ``load_by_domain(fmt=...)`` / ``run_phase45`` so the file is not sniffed again.
+    """
+    spec = detect_format(source, filename)
+    if spec is None:
+        return declared, None
+    if spec.domain in DomainEnum.__members__ and spec.domain != declared.value:
+        return DomainEnum(spec.domain), spec.fmt
+    return declared, spec.fmt
 
 
-async def _collect_samples(domain: DomainEnum, files: List[UploadFile]):
-    samples = []
-    for up in files:
-        raw = await up.read()
-        name = up.filename or "file"
-        _, ext = os.path.splitext(name)
-        tmp = tempfile.NamedTemporaryFile(delete=False, dir=settings.UPLOAD_DIR, suffix=ext or "")
-        try:
-            tmp.write(raw)
-            tmp.flush()
-            tmp.close()
-
-            # this why
-            actual_domain = _resolve_domain(domain, name)
-            sample = run_phase45(actual_domain.value, tmp.name)
-            sample["name"] = name
-            if isinstance(sample.get("features"), dict):
-                sample["features"]["name"] = name
-            sample.update({"ok": True})
-            samples.append(sample)
-        except Exception as exc:  # capture per-file errors so frontend can surface them
-            logger.exception("phase45 processing failed for %s", name)
-            samples.append(
-                {
-                    "ok": False,
-                    "name": name + " (error)",
-                    "domain": _resolve_domain(domain, name).value,
-                    "fs": 0.0,
-                    "features": {},
-                    "vector": None,
-                    "window": None,
-                    "env": None,
-                    "error_message": str(exc),
-                }
-            )
-        finally:
-            try:
-                os.remove(tmp.name)
-            except Exception:
-                pass
-            try:
-                up.file.seek(0)
-            except Exception:
-                pass
-    return samples
-
+def _error_sample(name: str, domain: str, exc: Exception) -> Dict[str, Any]:
+    return {
+        "ok": False,
+        "name": name + " (error)",
+        "domain": domain,
+        "fs": 0.0,
+        "features": {},
+        "vector": None,
+        "window": None,
+        "env": None,
+        "error_message": str(exc),
+    }
 
-def _synthetic_data(n: int = 1500):
-    g = np.random.uniform(0, 3, n)
-    A0 = np.random.rand(n)
-    nse = np.random.rand(n)
-    b = np.random.rand(n)
-    lam = np.random.uniform(0, 2, n)
-    X = np.vstack([g, A0, nse, b, lam]).T
-    y = (
-        2.1 * np.exp(-1.48 * g)
-        + 0.80 * A0
-        - 1.21 * nse
-        + 0.50 * b
-        + 0.026 * lam
-        + 8.15
-        + np.random.normal(0, 0.04, n)
-    )
-    return X, y
 
+def _ok_sample(sample: Dict[str, Any], name: str) -> Dict[str, Any]:
+    sample["name"] = name
+    if isinstance(sample.get("features"), dict):
+        sample["features"]["name"] = name
+    sample.update({"ok": True})
+    return sample
 
-def _coral(Xs: np.ndarray, Xt: np.ndarray) -> np.ndarray:
-    if Xt.shape[0] < 2:
-        return Xs
-    Cs = np.cov(Xs, rowvar=False) + np.eye(Xs.shape[1]) * 1e-3
-    Ct = np.cov(Xt, rowvar=False) + np.eye(Xt.shape[1]) * 1e-3
-    As = fractional_matrix_power(Cs, -0.5)
-    At = fractional_matrix_power(Ct, 0.5)
-    aligned = (Xs - Xs.mean(axis=0)) @ As @ At + Xt.mean(axis=0)
-    return np.real_if_close(aligned, tol=1000).astype(float)
 
+def _read_upload(domain: DomainEnum, name: str, source, multichannel: bool):
+    """``(domain, cache key, sample, loaded)`` for one upload; runs on the I/O pool.
 
-def _kitab_eval(params, X):
-    X = np.atleast_2d(X)
-    g, A0, n, b, lam = X.T
-    A, alpha, B, C, D, E, F = params
-    return A * np.exp(-alpha * g) + B * A0 + C * n + D * b + E * lam + F
+    ``source`` is the upload's file object or a spooled path. ``sample`` is set
+    when the upload needs no featurising: a cache hit, or the error row of a
+    file that could not be read. Otherwise ``loaded`` holds its ``(sig, fs, meta)``.
+    """
+    actual_domain = domain
+    try:
+        actual_domain, fmt = _resolve_format(domain, name, source)
+        # byte-identical re-uploads skip loading and feature extraction
+        key = None
+        if settings.FEATURE_CACHE:
+            key = feature_cache.cache_key(feature_cache.source_digest(source), actual_domain.value, multichannel)
+            cached = feature_cache.get(key, actual_domain.value)
+            if cached is not None:
+                return actual_domain.value, key, _ok_sample(cached, name), None
+        # read straight from the upload's spooled file; no temp-file round trip
+        loaded = load_by_domain(
+            actual_domain.value, source, multichannel=multichannel, name=name, fmt=fmt, **feature_read_span()
+        )
+        return actual_domain.value, key, None, loaded
+    except Exception as exc:  # capture per-file errors so frontend can surface them
+        logger.exception("phase45 processing failed for %s", name)
+        return actual_domain.value, None, _error_sample(name, actual_domain.value, exc), None
+    finally:
+        if hasattr(source, "seek"):
+            try:
+                source.seek(0)
+            except Exception:
+                pass
 
 
-def _fit_kitab(X: np.ndarray, y: np.ndarray):
-    def model(_, A, alpha, B, C, D, E, F):
-        return _kitab_eval((A, alpha, B, C, D, E, F), X)
+async def _collect_samples(
+    domain: DomainEnum,
+    files: List[Tuple[str, Any]],
+    multichannel: bool = False,
+    progress: Callable[[int], None] | None = None,
+):
+    """Samples for ``(name, file object or path)`` pairs, in order; ``progress(done)`` as files finish."""
+    samples: List[Dict[str, Any] | None] = [None] * len(files)
+    done = 0
+
+    def settle(pos: int, sample: Dict[str, Any]) -> None:
+        nonlocal done
+        samples[pos] = sample
+        done += 1
+        if progress is not None:
+            progress(done)
+
+    # uploads are read side by side on the I/O pool and grouped by domain; a
+    # domain's group goes to one batched pass (phase45.run_phase45_batch) on the
+    # process pool (or a thread) as soon as it holds FEATURE_BATCH_SIZE files and
+    # again at the end, so featurising overlaps with reading the later uploads
+    size = max(1, int(settings.FEATURE_BATCH_SIZE))
+    reads = [asyncio.ensure_future(run_io(_read_upload, domain, name, source, multichannel)) for name, source in files]
+    pending: Dict[str, Tuple[List[Tuple[int, str, str | None]], list]] = {}
+    running: List[Tuple[str, List[Tuple[int, str, str | None]], asyncio.Future]] = []
+
+    def flush(dom: str) -> None:
+        items, loaded = pending.pop(dom)
+        running.append((dom, items, asyncio.ensure_future(run_cpu(run_phase45_batch, dom, loaded))))
 
-    p0 = np.array([2.1, 1.48, 0.8, -1.2, 0.5, 0.02, 8.15], dtype=float)
     try:
-        popt, _ = curve_fit(model, np.zeros(len(X)), y, p0=p0, maxfev=12000)
-        return popt
-    except Exception:
-        return p0
-
-
-def _train_models(X_real: np.ndarray):
-    Xs, ys = _synthetic_data(1500)
-    if len(X_real):
-        Xs = _coral(Xs, X_real)
-    rf = RandomForestRegressor(
-        n_estimators=700, max_depth=18, random_state=42, n_jobs=-1
-    )
-    rf.fit(Xs, ys)
-    rf_syn = rf.predict(Xs)
-    lr = Ridge(alpha=0.1)
-    lr.fit(Xs, rf_syn)
-    kit = _fit_kitab(Xs, rf_syn)
-    return {"rf": rf, "lr": lr, "kit": kit}
+        for pos, ((name, _), read) in enumerate(zip(files, reads)):
+            dom, key, sample, loaded = await read
+            if sample is not None:
+                settle(pos, sample)
+                continue
+            items, batch_loaded = pending.setdefault(dom, ([], []))
+            items.append((pos, name, key))
+            batch_loaded.append(loaded)
+            if len(items) >= size:
+                flush(dom)
+        for dom in list(pending):
+            flush(dom)
+
+        for dom, items, task in running:
+            try:
+                results = await task
+            except Exception as exc:
+                results = [exc] * len(items)
+            for (pos, name, key), sample in zip(items, results):
+                if isinstance(sample, Exception):
+                    logger.error("phase45 processing failed for %s: %s", name, sample)
+                    settle(pos, _error_sample(name, dom, sample))
+                    continue
+                if key is not None:
+                    feature_cache.put(key, sample)
+                settle(pos, _ok_sample(sample, name))
+    finally:
+        # no-op once done; for a request that went away this drops reads and
+        # batches still queued, while one already running in a worker finishes
+        # and its result is discarded
+        for task in reads + [task for *_, task in running]:
+            task.cancel()
+    return samples
 
 
 def _bounded_r2(y_true: np.ndarray, y_pred: np.ndarray) -> float | None:
@@ -205,7 +222,7 @@ def _bounded_r2(y_true: np.ndarray, y_pred: np.ndarray) -> float | None:
 
     # Standard R² when we have enough samples
     if y_true.size >= 2 and y_pred.size >= 2:
-        raw = r2_score(y_true, y_pred)
+        raw = skmetrics.r2_score(y_true, y_pred)
         if not np.isnan(raw):
             return float(np.clip(raw, 0.0, 1.0))
         # Fall through to approximation if sklearn reports NaN (e.g. constant target)
@@ -238,41 +255,32 @@ def _calibrate_predictions(pred: np.ndarray, target: np.ndarray):
     return adjusted, slope, intercept
 
 
-def _bootstrap_kitab(X: np.ndarray, target: np.ndarray, runs: int = 40):
-    if len(X) < 2:
-        return None
-    preds = []
-    for _ in range(runs):
-        idx = np.random.choice(len(X), len(X), replace=True)
-        params = _fit_kitab(X[idx], target[idx])
-        preds.append(_kitab_eval(params, X))
-    return np.array(preds)
-
-
 def _safe_label(name: str) -> str:
     keep = [c if c.isalnum() else "_" for c in name]
     return "".join(keep)[:64] or "file"
 
 
 def _plot_timeseries(window, fs, ct_proxy, ct_rf, ct_kit, title, path):
-    if plt is None:
+    Figure = _figure()
+    if Figure is None:
         return
     t = np.arange(len(window)) / fs
-    plt.figure(figsize=(8, 3))
-    plt.plot(t, window, lw=0.8)
-    plt.axvline(ct_proxy, ls="--", c="b", label="ct_proxy")
-    plt.axvline(ct_rf, ls="--", c="r", label="RF ct")
-    plt.axvline(ct_kit, ls="--", c="g", label="Kitab ct")
-    plt.title(title)
-    plt.xlabel("Time [s]")
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(path, dpi=140)
-    plt.close()
+    fig = Figure(figsize=(8, 3))
+    ax = fig.subplots()
+    ax.plot(t, window, lw=0.8)
+    ax.axvline(ct_proxy, ls="--", c="b", label="ct_proxy")
+    ax.axvline(ct_rf, ls="--", c="r", label="RF ct")
+    ax.axvline(ct_kit, ls="--", c="g", label="Kitab ct")
+    ax.set_title(title)
+    ax.set_xlabel("Time [s]")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(path, dpi=140)
 
 
 def _plot_spectrogram(window, fs, ct_rf, ct_kit, title, path):
-    if plt is None:
+    Figure = _figure()
+    if Figure is None:
         return
     win = np.asarray(window, dtype=float)
     if win.size == 0:
@@ -282,19 +290,19 @@ def _plot_spectrogram(window, fs, ct_rf, ct_kit, title, path):
     if nper < 2:
         nper = win.size
     noverlap = max(0, min(nper // 2, nper - 1))
-    fz, tz, Sxx = spectrogram(win, fs=fs, nperseg=nper or 1, noverlap=noverlap)
+    fz, tz, Sxx = signal.spectrogram(win, fs=fs, nperseg=nper or 1, noverlap=noverlap)
     Sxx = 10 * np.log10(Sxx + 1e-12)
-    plt.figure(figsize=(8, 3))
-    plt.pcolormesh(tz, fz, Sxx, shading="gouraud")
-    plt.colorbar(label="Power [dB]")
-    plt.axvline(ct_rf, color="w", ls="--", lw=2)
-    plt.axvline(ct_kit, color="w", ls="--", lw=1)
-    plt.title(title)
-    plt.xlabel("Time [s]")
-    plt.ylabel("Hz")
-    plt.tight_layout()
-    plt.savefig(path, dpi=140)
-    plt.close()
+    fig = Figure(figsize=(8, 3))
+    ax = fig.subplots()
+    mesh = ax.pcolormesh(tz, fz, Sxx, shading="gouraud")
+    fig.colorbar(mesh, ax=ax, label="Power [dB]")
+    ax.axvline(ct_rf, color="w", ls="--", lw=2)
+    ax.axvline(ct_kit, color="w", ls="--", lw=1)
+    ax.set_title(title)
+    ax.set_xlabel("Time [s]")
+    ax.set_ylabel("Hz")
+    fig.tight_layout()
+    fig.savefig(path, dpi=140)
 
 
 def _generate_assets(rows, samples, metrics, per_domain):
@@ -302,7 +310,7 @@ def _generate_assets(rows, samples, metrics, per_domain):
     saved_files = []
 
     for idx, (row, sample) in enumerate(zip(rows, samples)):
-        if row.get("error") or sample.get("window") is None or plt is None:
+        if row.get("error") or sample.get("window") is None or _figure() is None:
             continue
         label = f"{idx:02d}_{_safe_label(row['name'])}"
         ts_path = os.path.join(tmpdir, f"{label}_timeseries.png")
@@ -383,9 +391,144 @@ def _generate_assets(rows, samples, metrics, per_domain):
     return zip_bytes
 
 
+def _resolve_alignment(alignment: AlignmentEnum | str | None) -> AlignmentEnum:
+    if alignment is None or alignment == "":
+        alignment = settings.ALIGNMENT_MODE
+    try:
+        return AlignmentEnum(alignment)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"unknown alignment mode: {alignment}")
+
+
+def _plan_alignment(plan: Plan, alignment: AlignmentEnum | str | None) -> AlignmentEnum:
+    """Alignment actually used under ``plan`` (400 for an explicit source outside plan=full)."""
+    requested = alignment.value if isinstance(alignment, AlignmentEnum) else (alignment or None)
+    try:
+        return _resolve_alignment(alignment_for(plan, requested))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def _models_for(X: np.ndarray, alignment: AlignmentEnum, n_jobs: int | None = None):
+    """Return the model stack for one domain and the feature rows it should score."""
+    bundle = get_models()
+    if alignment == AlignmentEnum.source:
+        # legacy path: re-colour the synthetic set toward this upload and refit
+        model = train_models(
+            X,
+            seed=bundle.get("seed", 42),
+            aligner=bundle.get("aligner"),
+            n_jobs=n_jobs or -1,
+        )
+        return model, X
+    if alignment == AlignmentEnum.target and bundle.get("aligner") is not None:
+        aligner = bundle["aligner"].spawn().partial_fit(X)
+        return bundle, aligner.transform_target(X)
+    return bundle, X
+
+
+def _blend_ct(model, X: np.ndarray) -> np.ndarray:
+    surrogate = model.get("surrogate")
+    if surrogate is not None:
+        return surrogate.predict(X)
+    return blend_predict(model, X)
+
+
+def _domain_seed(dom: str) -> int:
+    return zlib.crc32(dom.encode("utf-8")) ^ 42
+
+
+def _analyze_domain(
+    dom: str,
+    X: np.ndarray,
+    y: np.ndarray,
+    alignment: AlignmentEnum,
+    plan: Plan,
+    n_jobs: int | None = None,
+) -> Dict[str, Any]:
+    """Train/predict/bootstrap/calibrate one domain; safe to run in a worker process."""
+    timer = StageTimer()
+    rng = np.random.RandomState(_domain_seed(dom))
+    with timer.stage("align"):
+        model, X = _models_for(X, alignment, n_jobs=n_jobs)
+    rf_ct = None
+    if plan.blend:
+        with timer.stage("blend"):
+            rf_ct = _blend_ct(model, X)
+    with timer.stage("kitab"):
+        kitab_base = _kitab_eval(model["kit"], X)
+    boot = None
+    if plan.bootstrap:
+        with timer.stage("bootstrap"):
+            boot = bootstrap_kitab(
+                X,
+                rf_ct,
+                runs=settings.KITAB_BOOTSTRAP_RUNS,
+                tol=plan.bootstrap_tol or settings.KITAB_BOOTSTRAP_TOL,
+                rng=rng,
+            )
+    kitab_lo = kitab_hi = None
+    if boot is not None:
+        kitab_mean = boot.mean(axis=0)
+        kitab_lo = np.percentile(boot, 2.5, axis=0)
+        kitab_hi = np.percentile(boot, 97.5, axis=0)
+    else:
+        kitab_mean = kitab_base
+        if plan.bootstrap:
+            kitab_lo = kitab_base
+            kitab_hi = kitab_base
+
+    # calibrate predictions toward observed ct_proxy for this upload
+    with timer.stage("calibrate"):
+        kitab_cal, slope_adj, intercept_adj = _calibrate_predictions(kitab_mean, y)
+    kitab_mean = kitab_cal
+    if rf_ct is not None:
+        rf_ct = slope_adj * rf_ct + intercept_adj
+    if kitab_lo is not None:
+        kitab_lo = slope_adj * kitab_lo + intercept_adj
+        kitab_hi = slope_adj * kitab_hi + intercept_adj
+
+    residuals = np.abs(kitab_mean - y)
+    n_samples = len(y)
+    metrics_dom = {
+        "r2": _bounded_r2(y, kitab_mean),
+        "mae": float(skmetrics.mean_absolute_error(y, kitab_mean)) if n_samples >= 1 else None,
+        "delta_mean": float(np.mean(residuals)) if len(residuals) else None,
+    }
+    return {
+        "y": y,
+        "rf_ct": rf_ct,
+        "kitab_ct": kitab_mean,
+        "kitab_lo": kitab_lo,
+        "kitab_hi": kitab_hi,
+        "delta": residuals,
+        "metrics": metrics_dom,
+        "stage_ms": timer.as_dict(),
+    }
+
+
+def _run_domain_units(jobs) -> List[Dict[str, Any]]:
+    """Run per-domain units, in parallel when it pays off; results keep ``jobs`` order."""
+    if len(jobs) > 1 and any(plan.blend or plan.bootstrap for *_, plan in jobs):
+        return map_cpu(_analyze_domain, [(*job, threads_per_worker()) for job in jobs])
+    return [_analyze_domain(*job) for job in jobs]
+
+
+def _pick(values, idx: int) -> float | None:
+    return None if values is None else float(values[idx])
+
+
 def _analyze_samples(
-    samples, include_assets: bool, requested_domain: DomainEnum | None = None
+    samples,
+    include_assets: bool,
+    requested_domain: DomainEnum | None = None,
+    alignment: AlignmentEnum | str | None = None,
+    plan: Plan | None = None,
+    timer: StageTimer | None = None,
 ):
+    plan = plan or select_plan()
+    alignment = _plan_alignment(plan, alignment)
+    timer = timer or StageTimer()
     csv_rows: List[Dict[str, Any]] = []
     results: List[FileResult] = []
     rows_for_assets: List[Dict[str, Any]] = []
@@ -401,48 +544,27 @@ def _analyze_samples(
     domain_payloads: Dict[str, Dict[str, Any]] = {}
     global_targets: List[np.ndarray] = []
     global_predictions: List[np.ndarray] = []
+    jobs = []
     for dom, idxs in domain_indices.items():
         X = np.vstack([samples[i]["vector"] for i in idxs])
         y = np.array(
             [samples[i]["features"].get("ct_proxy", 0.0) for i in idxs], dtype=float
         )
-        model = _train_models(X)
-        rf_raw = model["rf"].predict(X)
-        lr_raw = model["lr"].predict(X)
-        rf_ct = 0.8 * rf_raw + 0.2 * lr_raw
-        kitab_base = _kitab_eval(model["kit"], X)
-        boot = _bootstrap_kitab(X, rf_ct)
-        if boot is not None:
-            kitab_mean = boot.mean(axis=0)
-            kitab_lo = np.percentile(boot, 2.5, axis=0)
-            kitab_hi = np.percentile(boot, 97.5, axis=0)
-        else:
-            kitab_mean = kitab_base
-            kitab_lo = kitab_base
-            kitab_hi = kitab_base
-
-        # calibrate predictions toward observed ct_proxy for this upload
-        kitab_cal, slope_adj, intercept_adj = _calibrate_predictions(kitab_mean, y)
-        kitab_mean = kitab_cal
-        rf_ct = slope_adj * rf_ct + intercept_adj
-        kitab_lo = slope_adj * kitab_lo + intercept_adj
-        kitab_hi = slope_adj * kitab_hi + intercept_adj
-
-        residuals = np.abs(kitab_mean - y)
-        n_samples = len(y)
-        metrics_dom = {
-            "r2": _bounded_r2(y, kitab_mean),
-            "mae": float(mean_absolute_error(y, kitab_mean)) if n_samples >= 1 else None,
-            "delta_mean": float(np.mean(residuals)) if len(residuals) else None,
-        }
+        jobs.append((dom, X, y, alignment, plan))
+    for (dom, *_), unit in zip(jobs, _run_domain_units(jobs)):
+        idxs = domain_indices[dom]
+        for stage, ms in unit.pop("stage_ms").items():
+            timer.add(stage, ms)
+        rf_ct, kitab_mean, y = unit["rf_ct"], unit["kitab_ct"], unit["y"]
+        metrics_dom = unit["metrics"]
         fs_vals = [float(samples[i]["fs"]) for i in idxs]
         domain_payloads[dom] = {
             "index_map": {idx: pos for pos, idx in enumerate(idxs)},
             "rf_ct": rf_ct,
             "kitab_ct": kitab_mean,
-            "kitab_lo": kitab_lo,
-            "kitab_hi": kitab_hi,
-            "delta": residuals,
+            "kitab_lo": unit["kitab_lo"],
+            "kitab_hi": unit["kitab_hi"],
+            "delta": unit["delta"],
             "metrics": metrics_dom,
             "fs": fs_vals,
         }
@@ -478,7 +600,7 @@ def _analyze_samples(
             residuals_all = np.abs(pred_all - y_all)
             combined_metrics = {
                 "r2": r2_all,
-                "mae": float(mean_absolute_error(y_all, pred_all)) if len(y_all) else None,
+                "mae": float(skmetrics.mean_absolute_error(y_all, pred_all)) if len(y_all) else None,
                 "delta_mean": float(np.mean(residuals_all)) if len(residuals_all) else None,
             }
 
@@ -569,10 +691,10 @@ def _analyze_samples(
             "domain": sample["domain"],
             "fs": sample["fs"],
             "ct_proxy": float(feat.get("ct_proxy", 0.0)),
-            "rf_ct": float(dom_payload["rf_ct"][vidx]),
+            "rf_ct": _pick(dom_payload["rf_ct"], vidx),
             "kitab_ct": float(dom_payload["kitab_ct"][vidx]),
-            "kitab_lo": float(dom_payload["kitab_lo"][vidx]),
-            "kitab_hi": float(dom_payload["kitab_hi"][vidx]),
+            "kitab_lo": _pick(dom_payload["kitab_lo"], vidx),
+            "kitab_hi": _pick(dom_payload["kitab_hi"], vidx),
             "delta_ct": float(dom_payload["delta"][vidx]),
             "gamma": float(feat.get("gamma", 0.0)),
             "beta": float(feat.get("beta", 0.0)),
@@ -609,11 +731,13 @@ def _analyze_samples(
                 kitab_lo=row_payload["kitab_lo"],
                 kitab_hi=row_payload["kitab_hi"],
                 delta_ct=row_payload["delta_ct"],
+                channels=sample.get("channels"),
             )
         )
 
-    if include_assets:
-        zip_bytes = _generate_assets(rows_for_assets, samples, metrics, per_domain)
+    if include_assets and plan.assets:
+        with timer.stage("assets"):
+            zip_bytes = _generate_assets(rows_for_assets, samples, metrics, per_domain)
 
     per_domain.sort(key=lambda entry: entry["type"])
 
@@ -624,20 +748,40 @@ def _analyze_samples(
         "csv_rows": csv_rows,
         "zip_bytes": zip_bytes,
         "zip_filename": "phase45_results.zip",
+        "plan": plan,
+        "alignment": alignment,
+        "timer": timer,
     }
 
 
-async def _analyze_request(domain: DomainEnum, files: List[UploadFile], include_assets: bool):
-    samples = await _collect_samples(domain, files)
-    return _analyze_samples(samples, include_assets=include_assets, requested_domain=domain)
+def _resolve_plan(mode: PlanEnum | str | None, latency_budget_ms: float | None) -> Plan:
+    if isinstance(mode, PlanEnum):
+        mode = mode.value
+    try:
+        return select_plan(mode or None, latency_budget_ms)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
 
-@router.post("/predict", response_model=PredictResponse)
-async def predict(
-    domain: DomainEnum = Form(..., description="audio|eeg|ligo|grace"),
-    files: List[UploadFile] = File(...),
-):
-    analysis = await _analyze_request(domain, files, include_assets=True)
+def _plan_payload(analysis, latency_budget_ms: float | None = None) -> Dict[str, Any]:
+    timer: StageTimer = analysis["timer"]
+    return {
+        "mode": analysis["plan"].name,
+        "alignment": analysis["alignment"].value,
+        "latency_budget_ms": latency_budget_ms,
+        "stages": timer.stages(),
+        "total_ms": round(timer.total_ms, 3),
+    }
+
+
+def _timing_headers(analysis) -> Dict[str, str]:
+    return {
+        "Server-Timing": analysis["timer"].server_timing(),
+        "X-Phase45-Plan": analysis["plan"].name,
+    }
+
+
+def _predict_response(analysis, latency_budget_ms: float | None = None) -> PredictResponse:
     zip_b64 = None
     if analysis["zip_bytes"] is not None:
         zip_b64 = base64.b64encode(analysis["zip_bytes"]).decode("utf-8")
@@ -650,22 +794,88 @@ async def predict(
         per_domain=analysis["per_domain"],
         zip_base64=zip_b64,
         zip_filename=analysis["zip_filename"] if zip_b64 else None,
+        plan=_plan_payload(analysis, latency_budget_ms),
+    )
+
+
+async def _analyze_request(
+    domain: DomainEnum,
+    files: List[UploadFile],
+    include_assets: bool,
+    alignment: AlignmentEnum | None = None,
+    mode: PlanEnum | None = None,
+    latency_budget_ms: float | None = None,
+    multichannel: bool = False,
+):
+    plan = _resolve_plan(mode, latency_budget_ms)
+    alignment = _plan_alignment(plan, alignment)  # rejected before any file is read
+    timer = StageTimer()
+    with timer.stage("features"):
+        sources = [(up.filename or "file", up.file) for up in files]
+        samples = await _collect_samples(domain, sources, multichannel=multichannel)
+    # model work fans out to the process pool and plots use standalone figures,
+    # so the orchestration runs on a thread and keeps the event loop free
+    return await run_io(
+        _analyze_samples,
+        samples,
+        include_assets=include_assets,
+        requested_domain=domain,
+        alignment=alignment,
+        plan=plan,
+        timer=timer,
+    )
+
+
+@router.post("/predict", response_model=PredictResponse)
+async def predict(
+    domain: DomainEnum = Form(..., description="audio|eeg|ligo|grace"),
+    files: List[UploadFile] = File(...),
+    alignment: AlignmentEnum | None = Form(None, description="target|source|none (default: settings)"),
+    mode: PlanEnum | None = Form(None, description="fast|standard|full (default: settings)"),
+    latency_budget_ms: float | None = Form(None, description="pick the richest plan within this budget"),
+    multichannel: bool = Form(False, description="analyse every channel (EEG/ECG leads, stereo)"),
+):
+    analysis = await _analyze_request(
+        domain,
+        files,
+        alignment=alignment,
+        mode=mode,
+        latency_budget_ms=latency_budget_ms,
+        multichannel=multichannel,
+        include_assets=True,
     )
+    return _predict_response(analysis, latency_budget_ms)
 
 
 @router.post("/predict/csv")
 async def predict_csv(
     domain: DomainEnum = Form(..., description="audio|eeg|ligo|grace"),
     files: List[UploadFile] = File(...),
+    alignment: AlignmentEnum | None = Form(None, description="target|source|none (default: settings)"),
+    mode: PlanEnum | None = Form(None, description="fast|standard|full (default: settings)"),
+    latency_budget_ms: float | None = Form(None, description="pick the richest plan within this budget"),
+    multichannel: bool = Form(False, description="analyse every channel (EEG/ECG leads, stereo)"),
 ):
-    analysis = await _analyze_request(domain, files, include_assets=False)
+    analysis = await _analyze_request(
+        domain,
+        files,
+        alignment=alignment,
+        mode=mode,
+        latency_budget_ms=latency_budget_ms,
+        multichannel=multichannel,
+        include_assets=False,
+    )
     rows = analysis["csv_rows"]
+    headers = {
+        "Content-Disposition": 'attachment; filename="phase45_results.csv"',
+        **_timing_headers(analysis),
+    }
     if not rows:
         empty = "name,domain,fs\n"
         return StreamingResponse(
             io.BytesIO(empty.encode("utf-8")),
             media_type="text/csv",
-            headers={"Content-Disposition": 'attachment; filename="phase45_results.csv"'},
+            headers=headers,
         )
     fieldnames = [
         "name",
@@ -698,13 +908,17 @@ async def predict_csv(
     return StreamingResponse(
         io.BytesIO(data),
         media_type="text/csv",
-        headers={"Content-Disposition": 'attachment; filename="phase45_results.csv"'},
+        headers=headers,
     )
 
 
 class PredictFromS3Input(BaseModel):
     domain: DomainEnum
     keys: list[str]
+    alignment: AlignmentEnum | None = None
+    mode: PlanEnum | None = None
+    latency_budget_ms: float | None = None
+    multichannel: bool = False
 
 
 @router.post("/predict_from_s3", response_model=PredictResponse)
@@ -715,16 +929,21 @@ def predict_from_s3(payload: PredictFromS3Input):
         raise HTTPException(status_code=501, detail="S3 bucket not configured")
     if not payload.keys:
         raise HTTPException(status_code=400, detail="keys required")
+    plan = _resolve_plan(payload.mode, payload.latency_budget_ms)
+    alignment = _plan_alignment(plan, payload.alignment)
+    timer = StageTimer()
 
     samples = []
     temp_paths = []
     try:
         for key in payload.keys:
-            path, name = download_to_tmp(key)
+            with timer.stage("download"):
+                path, name = download_to_tmp(key)
             temp_paths.append(path)
-            domain = _resolve_domain(payload.domain, name)
+            domain, fmt = _resolve_format(payload.domain, name, path)
             try:
-                sample = run_phase45(domain.value, path)
+                with timer.stage("features"):
+                    sample = run_phase45(domain.value, path, multichannel=payload.multichannel, fmt=fmt)
                 sample["name"] = name
                 sample["domain"] = domain.value
                 sample["ok"] = True
@@ -732,33 +951,18 @@ def predict_from_s3(payload: PredictFromS3Input):
                     sample["features"]["name"] = name
             except Exception as exc:
                 logger.exception("phase45 processing failed for %s", name)
-                sample = {
-                    "ok": False,
-                    "name": name + " (error)",
-                    "domain": domain.value,
-                    "fs": 0.0,
-                    "features": {},
-                    "vector": None,
-                    "window": None,
-                    "env": None,
-                    "error_message": str(exc),
-                }
+                sample = _error_sample(name, domain.value, exc)
             samples.append(sample)
 
-        analysis = _analyze_samples(samples, include_assets=True, requested_domain=payload.domain)
-        zip_b64 = None
-        if analysis["zip_bytes"] is not None:
-            zip_b64 = base64.b64encode(analysis["zip_bytes"]).decode("utf-8")
-        metrics = analysis["metrics"]
-        return PredictResponse(
-            results=analysis["results"],
-            r2=metrics["r2"],
-            mae=metrics["mae"],
-            delta_mean=metrics["delta_mean"],
-            per_domain=analysis["per_domain"],
-            zip_base64=zip_b64,
-            zip_filename=analysis["zip_filename"] if zip_b64 else None,
+        analysis = _analyze_samples(
+            samples,
+            include_assets=True,
+            requested_domain=payload.domain,
+            alignment=alignment,
+            plan=plan,
+            timer=timer,
         )
+        return _predict_response(analysis, payload.latency_budget_ms)
     finally:
         for path in temp_paths:
             try:
@@ -772,27 +976,15 @@ async def predict_spectrogram(
     domain: DomainEnum = Form(..., description="audio|eeg|ligo|grace"),
     file: UploadFile = File(...),
 ):
-    raw = await file.read()
     name = file.filename or "file"
-    _, ext = os.path.splitext(name)
-    temp = tempfile.NamedTemporaryFile(delete=False, dir=settings.UPLOAD_DIR, suffix=ext or "")
-    temp.write(raw)
-    temp.flush()
-    temp.close()
-    from ..services.loaders import load_by_domain
+    domain, fmt = await run_io(_resolve_format, domain, name, file.file)  # sniffed once; the file is decoded once
+    sig, fs, _ = await run_io(load_by_domain, domain.value, file.file, name=name, fmt=fmt)
+    return await run_cpu(_spectrogram_payload, sig, fs, domain, name)
 
-    try:
-        sig, fs, _ = load_by_domain(domain.value, temp.name)
-    except Exception:
-        guessed = _guess_domain(name) or domain
-        sig, fs, _ = load_by_domain(guessed.value, temp.name)
-    finally:
-        try:
-            os.remove(temp.name)
-        except OSError:
-            pass
 
-    sig = np.asarray(sig, dtype=float).squeeze()
+def _spectrogram_payload(sig: np.ndarray, fs: float, domain: DomainEnum, name: str) -> Dict[str, Any]:
+    """Downsampled dB spectrogram of ``sig``; runs on the domain process pool."""
+    sig = as_work(sig).squeeze()
     if sig.size == 0:
         return {"t": [], "f": [], "sxx_db": [], "ct": 0.0, "meta": {"fs": fs, "name": name}}
     target = {
@@ -802,7 +994,7 @@ async def predict_spectrogram(
         DomainEnum.grace: 64,
     }.get(domain, min(int(fs), 1024))
     if int(fs) > target > 0:
-        sig = resample_poly(sig, target, int(fs))
+        sig = signal.resample_poly(sig, target, int(fs))
         fs = float(target)
     else:
         fs = float(fs)
@@ -811,7 +1003,7 @@ async def predict_spectrogram(
     if nperseg < 2:
         nperseg = max(1, len(sig))
     noverlap = max(0, min(nperseg // 2, nperseg - 1))
-    f, t, Sxx = spectrogram(sig, fs=fs, nperseg=nperseg or 1, noverlap=noverlap)
+    f, t, Sxx = signal.spectrogram(sig, fs=fs, nperseg=nperseg or 1, noverlap=noverlap)
     Sxx = np.maximum(Sxx, 1e-18)
     max_bins = 256
     f_step = max(1, int(np.ceil(len(f) / max_bins)))
@@ -829,15 +1021,55 @@ async def predict_spectrogram(
 async def predict_zip(
     domain: DomainEnum = Form(..., description="audio|eeg|ligo|grace"),
     files: List[UploadFile] = File(...),
+    alignment: AlignmentEnum | None = Form(None, description="target|source|none (default: settings)"),
+    mode: PlanEnum | None = Form(None, description="fast|standard|full (default: settings)"),
+    latency_budget_ms: float | None = Form(None, description="pick the richest plan within this budget"),
+    multichannel: bool = Form(False, description="analyse every channel (EEG/ECG leads, stereo)"),
 ):
-    analysis = await _analyze_request(domain, files, include_assets=True)
+    analysis = await _analyze_request(
+        domain,
+        files,
+        alignment=alignment,
+        mode=mode,
+        latency_budget_ms=latency_budget_ms,
+        multichannel=multichannel,
+        include_assets=True,
+    )
     zip_bytes = analysis["zip_bytes"] or b""
-    return zipfile_stream(zip_bytes, analysis["zip_filename"])
+    return zipfile_stream(zip_bytes, analysis["zip_filename"], _timing_headers(analysis))
 
 
-def zipfile_stream(data: bytes, filename: str):
+def zipfile_stream(data: bytes, filename: str, headers: Dict[str, str] | None = None):
     return StreamingResponse(
         io.BytesIO(data),
         media_type="application/zip",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', **(headers or {})},
     )
+
+
+def _job_samples(domain: DomainEnum, files: List[Dict[str, str]], multichannel: bool, progress) -> List[Dict[str, Any]]:
+    """Samples for a job's spooled files, in order; ``progress(done)`` as files finish."""
+    # the job thread has no event loop of its own; run the /predict read-and-batch pipeline on one
+    sources = [(f["name"], f["path"]) for f in files]
+    return asyncio.run(_collect_samples(domain, sources, multichannel=multichannel, progress=progress))
+
+
+def _run_predict_job(job: jobs.Job, progress) -> Dict[str, Any]:
+    """``/jobs/predict`` handler: the ``/predict`` response for the spooled files."""
+    p = job.params
+    domain = DomainEnum(p["domain"])
+    timer = StageTimer()
+    with timer.stage("features"):
+        samples = _job_samples(domain, p["files"], bool(p.get("multichannel")), progress)
+    analysis = _analyze_samples(
+        samples,
+        include_assets=bool(p.get("include_assets")),
+        requested_domain=domain,
+        alignment=p.get("alignment"),
+        plan=_resolve_plan(p.get("mode"), p.get("latency_budget_ms")),
+        timer=timer,
+    )
+    return _predict_response(analysis, p.get("latency_budget_ms")).model_dump(mode="json")
+
+
+jobs.register_handler("predict", _run_predict_job)
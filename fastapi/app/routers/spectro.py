@@ -1,45 +1,36 @@
 from fastapi import APIRouter, UploadFile, File, Form
 from io import BytesIO
 import numpy as np
-import soundfile as sf
-from scipy.signal import resample_poly, spectrogram
 
 from ..models.schemas import DomainEnum, SpectrogramResponse
 from ..core.config import settings
+from ..core.lazy import lazy_import
+from ..services.executors import run_cpu, run_io
+from ..services.precision import as_work
 
 router = APIRouter()
+signal = lazy_import("scipy.signal")
 
 @router.post("/spectrogram_json", response_model=SpectrogramResponse)
 async def spectrogram_json(
     domain: DomainEnum = Form(...),
     file: UploadFile = File(...),
 ):
-    raw = await file.read()
-
-    # Save and load via loaders to support all domains
-    import os, tempfile
-    from ..services.loaders import load_by_domain
+    # Load via loaders to support all domains, reading the upload in place
+    from ..services.loaders import detect_format, load_by_domain
 
     name = file.filename or "file"
-    _, ext = os.path.splitext(name)
-    temp = tempfile.NamedTemporaryFile(delete=False, dir=settings.UPLOAD_DIR, suffix=ext or "")
-    temp.write(raw); temp.flush(); temp.close()
-    try:
-        sig, fs, _ = load_by_domain(domain.value, temp.name)
-    except Exception:
-        # fallback by extension
-        ext_l = (os.path.splitext(name.lower())[1])
-        if ext_l == ".wav": dom2 = DomainEnum.audio
-        elif ext_l == ".edf": dom2 = DomainEnum.eeg
-        elif ext_l in (".hdf5", ".h5"): dom2 = DomainEnum.ligo
-        elif ext_l == ".nc": dom2 = DomainEnum.grace
-        else: dom2 = domain
-        sig, fs, _ = load_by_domain(dom2.value, temp.name)
-    finally:
-        try: os.remove(temp.name)
-        except Exception: pass
+    # the file's signature picks the loader, so a wrong declaration costs no extra decode
+    spec = await run_io(detect_format, file.file, name)
+    if spec is not None and spec.domain in DomainEnum.__members__:
+        domain = DomainEnum(spec.domain)
+    sig, fs, _ = await run_io(load_by_domain, domain.value, file.file, name=name, fmt=spec.fmt if spec else None)
+    return await run_cpu(_spectrogram, sig, fs, domain, name)
+
 
-    sig = np.asarray(sig, dtype=float)
+def _spectrogram(sig: np.ndarray, fs: float, domain: DomainEnum, name: str) -> SpectrogramResponse:
+    """Runs on the domain process pool, off the event loop."""
+    sig = as_work(sig)
     # domain-specific targets
     target = {
         DomainEnum.audio: int(getattr(settings, "RESAMPLE_AUDIO_HZ", 16000)),
@@ -48,12 +39,12 @@ async def spectrogram_json(
         DomainEnum.grace: 64,
     }.get(domain, min(int(fs), 1024))
     if int(fs) > target and target > 0:
-        sig = resample_poly(sig, target, int(fs)); fs = float(target)
+        sig = signal.resample_poly(sig, target, int(fs)); fs = float(target)
     else:
         fs = float(fs)
 
     nperseg = max(64, min(1024, len(sig)//8 or 64))
-    f, t, Sxx = spectrogram(sig, fs=fs, nperseg=nperseg, noverlap=nperseg//2)
+    f, t, Sxx = signal.spectrogram(sig, fs=fs, nperseg=nperseg, noverlap=nperseg//2)
     Sxx = np.maximum(Sxx, 1e-18)
     max_bins = 256
     f_step = max(1, int(np.ceil(len(f)/max_bins)))
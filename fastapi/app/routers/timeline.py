@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
+
+from ..models.schemas import DomainEnum
+from ..core.config import settings
+from ..services import timeline
+from ..services.executors import run_io
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _spool(file: UploadFile) -> str:
+    """Copy the upload to a temp file under ``UPLOAD_DIR`` (the loaders window it by path)."""
+    _, ext = os.path.splitext(file.filename or "file")
+    temp = tempfile.NamedTemporaryFile(delete=False, dir=settings.UPLOAD_DIR, suffix=ext or "")
+    with temp:
+        shutil.copyfileobj(file.file, temp)  # copied in blocks; the recording is never held in memory
+    return temp.name
+
+
+@router.post("/predict/timeline")
+async def predict_timeline(
+    domain: DomainEnum = Form(...),
+    file: UploadFile = File(...),
+    window_sec: Optional[float] = Form(None),
+    hop_sec: Optional[float] = Form(None),
+):
+    """Sliding-window ψ-features over the whole recording, streamed as NDJSON.
+
+    The first line describes the layout, then one line per window follows as
+    soon as it is computed, then ``{"done": true, "windows": n}``. A failure
+    mid-stream is reported as an ``{"error": ...}`` line.
+    """
+    path = await run_io(_spool, file)
+    try:
+        layout = await run_io(timeline.plan, domain.value, path, window_sec, hop_sec)
+    except Exception as exc:
+        _remove(path)
+        raise HTTPException(status_code=400, detail=str(exc))
+    layout["name"] = file.filename or layout.get("name")
+
+    def lines():
+        try:
+            for item in timeline.iter_timeline(domain.value, path, layout):
+                yield json.dumps(item) + "\n"
+        except Exception as exc:
+            logger.exception("timeline failed for %s", layout["name"])
+            yield json.dumps({"error": str(exc)}) + "\n"
+        finally:
+            _remove(path)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -0,0 +1,99 @@
+"""CORAL (correlation alignment) with cached source statistics.
+
+The source (synthetic training) side is whitened once at construction.
+Target statistics can be accumulated over any number of batches with
+``partial_fit``; aligning is then a single ``(n, d) @ (d, d)`` product.
+Alignment runs in either direction: ``transform_source`` re-colours the
+training set towards the target (requires refitting the models), while
+``transform_target`` maps target rows into the source space so a frozen
+model can consume them unchanged.
+Matrix square roots use a symmetric eigendecomposition, so results are
+always real for the SPD covariances CORAL works with.
+"""
+import copy
+
+import numpy as np
+
+_EPS = 1e-3
+
+
+def sym_power(C: np.ndarray, p: float) -> np.ndarray:
+    """``C ** p`` for a symmetric positive-definite matrix via ``eigh``."""
+    w, V = np.linalg.eigh((C + C.T) * 0.5)
+    w = np.clip(w, np.finfo(float).tiny, None)
+    return (V * w**p) @ V.T
+
+
+class CoralAligner:
+    def __init__(self, Xs: np.ndarray, eps: float = _EPS):
+        Xs = np.asarray(Xs, dtype=float)
+        self.eps = float(eps)
+        self.dim = Xs.shape[1]
+        self.source = Xs
+        self.mean_s = Xs.mean(axis=0)
+        self.cov_s = np.cov(Xs, rowvar=False) + np.eye(self.dim) * self.eps
+        self.isqrt_s = sym_power(self.cov_s, -0.5)
+        self.sqrt_s = sym_power(self.cov_s, 0.5)
+        self._white_s = (Xs - self.mean_s) @ self.isqrt_s
+        self.reset()
+
+    def spawn(self) -> "CoralAligner":
+        """Fresh target accumulator sharing this instance's cached source statistics."""
+        return copy.copy(self).reset()
+
+    # --- target statistics -------------------------------------------------
+    def reset(self) -> "CoralAligner":
+        self.n_t = 0
+        self.mean_t = np.zeros(self.dim)
+        self._m2_t = np.zeros((self.dim, self.dim))
+        return self
+
+    def partial_fit(self, Xt: np.ndarray) -> "CoralAligner":
+        """Fold a batch of target rows into the running mean/co-moment (Chan et al.)."""
+        Xt = np.atleast_2d(np.asarray(Xt, dtype=float))
+        m = Xt.shape[0]
+        if m == 0:
+            return self
+        mean_b = Xt.mean(axis=0)
+        centered = Xt - mean_b
+        m2_b = centered.T @ centered
+        n = self.n_t
+        total = n + m
+        delta = mean_b - self.mean_t
+        self.mean_t = self.mean_t + delta * (m / total)
+        self._m2_t = self._m2_t + m2_b + np.outer(delta, delta) * (n * m / total)
+        self.n_t = total
+        return self
+
+    def fit_target(self, Xt: np.ndarray) -> "CoralAligner":
+        return self.reset().partial_fit(Xt)
+
+    @property
+    def cov_t(self) -> np.ndarray:
+        if self.n_t < 2:
+            return np.eye(self.dim) * self.eps
+        return self._m2_t / (self.n_t - 1) + np.eye(self.dim) * self.eps
+
+    # --- transforms -------------------------------------------------------
+    def transform_source(self) -> np.ndarray:
+        """Source rows re-coloured with the accumulated target covariance."""
+        if self.n_t < 2:
+            return self.source
+        return self._white_s @ sym_power(self.cov_t, 0.5) + self.mean_t
+
+    def transform_target(self, Xt: np.ndarray) -> np.ndarray:
+        """Map target rows into the source feature space (inverse CORAL)."""
+        Xt = np.atleast_2d(np.asarray(Xt, dtype=float))
+        if self.n_t < 2:
+            return Xt
+        return (Xt - self.mean_t) @ sym_power(self.cov_t, -0.5) @ self.sqrt_s + self.mean_s
+
+
+def coral(Xs: np.ndarray, Xt: np.ndarray, aligner: CoralAligner | None = None) -> np.ndarray:
+    if Xt.shape[0] < 2:
+        return Xs
+    aligner = aligner.spawn() if aligner is not None else CoralAligner(Xs)
+    return aligner.partial_fit(Xt).transform_source()
+
+
+__all__ = ["CoralAligner", "coral", "sym_power"]
@@ -0,0 +1,287 @@
+"""Executors behind the async endpoints.
+
+CPU-bound work (feature extraction, model fitting, spectrograms) goes to the
+domain process pool through ``run_cpu``; blocking I/O (reading and decoding
+uploads, waiting on other pools) goes to a bounded thread pool through
+``run_io``. Either way the event loop stays free, so one long upload no
+longer stalls every other request, ``/health`` included. NumPy arrays in
+``run_cpu`` arguments are copied once into shared memory and attached by the
+worker, instead of being pickled through the pool's pipe.
+
+The pool is started by ``start_domain_pool`` during app startup, before any
+other thread exists, so forked workers never inherit a lock held mid-update
+by an I/O or job thread. A pool created later on demand (after a broken pool
+was reset, say) uses ``forkserver`` instead of ``fork`` while threads run.
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing as mp
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, List, Sequence, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_domain_pool: ProcessPoolExecutor | None = None
+_io_pool: ThreadPoolExecutor | None = None
+
+
+def _cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        return os.cpu_count() or 1
+
+
+def _cpu_share() -> int:
+    """CPUs for this server process: every gunicorn worker forks a pool of its own."""
+    return max(1, _cpu_count() // max(1, int(settings.WEB_CONCURRENCY or 1)))
+
+
+def domain_pool_size() -> int:
+    workers = int(settings.DOMAIN_WORKERS or 0)
+    return workers if workers > 0 else _cpu_share()
+
+
+def threads_per_worker() -> int:
+    """Threads each pool worker may use so workers x threads stays within this process's CPU share."""
+    return max(1, _cpu_share() // domain_pool_size())
+
+
+def _init_domain_worker(threads: int) -> None:
+    # cap native thread pools (BLAS/OpenMP) and the forest's joblib threads
+    try:
+        from threadpoolctl import threadpool_limits
+
+        threadpool_limits(threads)
+    except Exception:
+        pass
+    from .registry import get_models
+
+    bundle = get_models()  # inherited under fork; loaded from disk otherwise
+    if bundle.get("rf") is not None:
+        bundle["rf"].n_jobs = threads
+
+
+def _new_domain_pool(method: str) -> ProcessPoolExecutor:
+    # workers inherit the running tracker, so blocks they attach stay owned by this process
+    resource_tracker.ensure_running()
+    pool = ProcessPoolExecutor(
+        max_workers=domain_pool_size(),
+        mp_context=mp.get_context(method),
+        initializer=_init_domain_worker,
+        initargs=(threads_per_worker(),),
+    )
+    logger.info("domain pool started with %d %s workers", domain_pool_size(), method)
+    return pool
+
+
+def start_domain_pool() -> ProcessPoolExecutor | None:
+    """Create the domain pool and launch its workers now; call before starting any threads."""
+    global _domain_pool
+    if domain_pool_size() <= 1:
+        return None
+    with _lock:
+        if _domain_pool is None:
+            _domain_pool = _new_domain_pool(settings.POOL_START_METHOD)
+        pool = _domain_pool
+    pool.submit(os.getpid).result()  # a fork pool forks every worker on its first task
+    return pool
+
+
+def domain_pool() -> ProcessPoolExecutor | None:
+    """Process pool for per-domain model work, or None when running serially."""
+    global _domain_pool
+    if domain_pool_size() <= 1:
+        return None
+    if _domain_pool is not None:
+        return _domain_pool
+    with _lock:
+        if _domain_pool is None:
+            method = settings.POOL_START_METHOD
+            if method == "fork" and threading.active_count() > 1:
+                # forking now could copy a lock another thread holds; start clean instead
+                method = "forkserver"
+            _domain_pool = _new_domain_pool(method)
+    return _domain_pool
+
+
+def reset_domain_pool() -> None:
+    global _domain_pool
+    with _lock:
+        pool, _domain_pool = _domain_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def io_pool() -> ThreadPoolExecutor:
+    """Thread pool for blocking I/O; ``IO_WORKERS`` threads."""
+    global _io_pool
+    if _io_pool is not None:
+        return _io_pool
+    with _lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(max_workers=max(1, int(settings.IO_WORKERS)), thread_name_prefix="phase45-io")
+    return _io_pool
+
+
+def reset_io_pool() -> None:
+    global _io_pool
+    with _lock:
+        pool, _io_pool = _io_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """Picklable handle to an array held in a shared-memory block."""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def _walk(obj: Any, kind: type, fn: Callable[[Any], Any]) -> Any:
+    """``obj`` with every ``kind`` leaf inside dicts, lists and tuples replaced by ``fn(leaf)``."""
+    if isinstance(obj, kind):
+        return fn(obj)
+    if isinstance(obj, dict):
+        return {k: _walk(v, kind, fn) for k, v in obj.items()}
+    if type(obj) in (list, tuple):
+        return type(obj)(_walk(v, kind, fn) for v in obj)
+    return obj
+
+
+def _share(obj: Any, blocks: List[SharedMemory]) -> Any:
+    """Move large arrays in ``obj`` into new shared-memory blocks, appended to ``blocks``."""
+    min_bytes = int(settings.SHARED_MEMORY_MIN_BYTES)
+
+    def put(arr: np.ndarray):
+        if arr.dtype.hasobject or arr.nbytes < min_bytes:
+            return arr
+        shm = SharedMemory(create=True, size=max(1, arr.nbytes))
+        blocks.append(shm)
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        return SharedArray(shm.name, arr.shape, arr.dtype.str)
+
+    return _walk(obj, np.ndarray, put)
+
+
+def _call_shared(fn: Callable, args: tuple, kwargs: dict) -> Any:
+    """Worker side of ``run_cpu``: attach shared arrays, call ``fn``, detach."""
+    blocks: List[SharedMemory] = []
+    views: List[np.ndarray] = []
+
+    def attach(handle: SharedArray) -> np.ndarray:
+        if sys.version_info >= (3, 13):
+            shm = SharedMemory(name=handle.name, track=False)
+        else:
+            # registers again with the tracker this worker shares with the parent
+            # (see _new_domain_pool); that is a no-op there, and unregistering here
+            # would drop the parent's entry before it unlinks the block
+            shm = SharedMemory(name=handle.name)
+        blocks.append(shm)
+        views.append(np.ndarray(handle.shape, dtype=handle.dtype, buffer=shm.buf))
+        return views[-1]
+
+    try:
+        args, kwargs = _walk((args, kwargs), SharedArray, attach)
+        # results must not point into blocks the parent is about to unlink
+        return _walk(
+            fn(*args, **kwargs), np.ndarray, lambda a: a.copy() if any(np.may_share_memory(a, v) for v in views) else a
+        )
+    finally:
+        del args, kwargs, views[:]
+        for shm in blocks:
+            try:
+                shm.close()
+            except BufferError:  # something kept a view; the mapping goes when it is collected
+                pass
+
+
+async def run_io(fn: Callable, *args, **kwargs) -> Any:
+    """Run blocking ``fn`` on the I/O thread pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_pool(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_cpu(fn: Callable, *args, **kwargs) -> Any:
+    """Run CPU-bound ``fn`` on the domain process pool (a thread when serial).
+
+    ``fn`` must be importable by the workers (a module-level function).
+    Arrays of at least ``SHARED_MEMORY_MIN_BYTES`` in the arguments are passed
+    through shared memory; results come back pickled. A broken pool is reset
+    and the call retried on a thread.
+    """
+    pool = domain_pool()
+    if pool is not None:
+        loop = asyncio.get_running_loop()
+        blocks: List[SharedMemory] = []
+        try:
+            shared_args, shared_kwargs = _share((args, kwargs), blocks)
+            return await loop.run_in_executor(pool, _call_shared, fn, shared_args, shared_kwargs)
+        except BrokenProcessPool:
+            logger.exception("domain pool failed; running %s on a thread", getattr(fn, "__name__", fn))
+            reset_domain_pool()
+        finally:
+            _release(blocks)
+    return await run_io(fn, *args, **kwargs)
+
+
+def map_cpu(fn: Callable, calls: Sequence[tuple]) -> List[Any]:
+    """Blocking ``run_cpu`` for code already off the event loop: ``fn(*args)`` for each call.
+
+    The calls run side by side on the domain pool, with arrays passed through
+    shared memory as in ``run_cpu``; results keep the order of ``calls``. With
+    no pool, or once it breaks (it is reset), they run one by one in this thread.
+    """
+    pool = domain_pool()
+    if pool is not None:
+        blocks: List[SharedMemory] = []
+        futures = []
+        try:
+            for args in calls:
+                futures.append(pool.submit(_call_shared, fn, *_share((tuple(args), {}), blocks)))
+            return [f.result() for f in futures]
+        except BrokenProcessPool:
+            logger.exception("domain pool failed; running %s in this thread", getattr(fn, "__name__", fn))
+            reset_domain_pool()
+        finally:
+            for f in futures:
+                f.cancel()  # after an error, drop calls that have not started
+            _release(blocks)
+    return [fn(*args) for args in calls]
+
+
+def _release(blocks: List[SharedMemory]) -> None:
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+
+
+__all__ = [
+    "SharedArray",
+    "domain_pool",
+    "domain_pool_size",
+    "io_pool",
+    "map_cpu",
+    "reset_domain_pool",
+    "reset_io_pool",
+    "run_cpu",
+    "run_io",
+    "start_domain_pool",
+    "threads_per_worker",
+]
@@ -0,0 +1,303 @@
+"""Content-addressed cache of per-file ψ-features.
+
+Entries are keyed by the SHA-256 of the uploaded bytes, the domain, the
+``multichannel`` flag and a pipeline fingerprint. The fingerprint hashes the
+feature-pipeline sources and every setting that changes their output, so
+editing either one invalidates old entries. A hit returns the stored
+``features``, ``vector``, ``fs`` and per-channel rows (plus ``window``/``env``
+when ``FEATURE_CACHE_ARRAYS`` is on) without loading or analysing the file.
+
+There are two tiers: an in-process LRU bounded by ``FEATURE_CACHE_MAX_MB``, and
+``.npz`` files under ``FEATURE_CACHE_DIR`` (``UPLOAD_DIR/feature_cache`` by
+default) that every worker process shares. Disk entries are written then
+renamed, so readers never see a partial file.
+
+Counters are per process. Lookups made inside domain-pool workers (timeline
+spans, batch jobs) are counted there and do not show up in ``/health``.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# modules whose code determines the cached values
+_PIPELINE_MODULES = ("features", "filters", "loaders", "phase45", "precision", "smoothing", "spectral")
+# settings that change loader or feature output
+_PIPELINE_SETTINGS = (
+    "RESAMPLE_AUDIO_HZ",
+    "RESAMPLE_EEG_HZ",
+    "DEFAULT_LIGO_FS",
+    "RESAMPLE_LIGO_HZ",
+    "DEFAULT_GRACE_FS",
+    "FEATURE_WINDOW_SEC",
+    "WINDOWED_READS",
+    "FEATURE_READ_PAD_SEC",
+    "PRECISION",
+    "MAX_LIGO_SAMPLES",
+    "MAX_GRACE_TIMESTEPS",
+    "GRACE_AREA_WEIGHTED",
+    "GRACE_BBOX",
+)
+_ARRAYS = ("vector", "window", "env")
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()  # key -> (entry, bytes)
+_memory_bytes = 0
+_counters = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+# estimated bytes on disk: synced by each directory scan, then advanced by our own writes
+_disk_bytes: Optional[int] = None
+_writes_since_scan = 0
+_RESCAN_EVERY = 256  # other workers write too; rescan now and then to account for them
+
+
+@lru_cache(maxsize=1)
+def _source_fingerprint() -> str:
+    h = hashlib.sha256()
+    here = Path(__file__).resolve().parent
+    for mod in _PIPELINE_MODULES:
+        h.update((here / f"{mod}.py").read_bytes())
+    return h.hexdigest()
+
+
+def pipeline_version() -> str:
+    """Fingerprint of the pipeline sources plus the output-relevant settings."""
+    cfg = json.dumps({k: getattr(settings, k, None) for k in _PIPELINE_SETTINGS}, sort_keys=True)
+    return hashlib.sha256((_source_fingerprint() + cfg).encode()).hexdigest()[:16]
+
+
+def _hash_file(f) -> str:
+    h = hashlib.sha256()
+    for block in iter(lambda: f.read(1 << 20), b""):
+        h.update(block)
+    return h.hexdigest()
+
+
+def source_digest(source) -> str:
+    """SHA-256 of a path, bytes-like buffer or file object (rewound afterwards)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return _hash_file(f)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    source.seek(0)
+    try:
+        return _hash_file(source)
+    finally:
+        source.seek(0)
+
+
+def cache_key(digest: str, domain: str, multichannel: bool = False) -> str:
+    return f"{digest}-{domain}-{'mc' if multichannel else 'mono'}-{pipeline_version()}"
+
+
+def _entry(sample: Dict[str, Any]) -> Dict[str, Any]:
+    entry = {
+        "fs": float(sample["fs"]),
+        "features": dict(sample.get("features") or {}),
+        "channels": sample.get("channels"),
+        "vector": np.array(sample["vector"], dtype=np.float64),
+    }
+    if settings.FEATURE_CACHE_ARRAYS:
+        for k in ("window", "env"):
+            if sample.get(k) is not None:
+                entry[k] = np.array(sample[k])  # own copy: windows are often views of a longer signal
+    for k in _ARRAYS:
+        if k in entry:
+            entry[k].setflags(write=False)  # shared by every hit
+    return entry
+
+
+def _nbytes(entry: Dict[str, Any]) -> int:
+    meta = len(json.dumps([entry["features"], entry["channels"]], default=float))
+    return meta + sum(entry[k].nbytes for k in _ARRAYS if k in entry)
+
+
+def _sample(entry: Dict[str, Any], domain: str) -> Dict[str, Any]:
+    features = dict(entry["features"])
+    return {
+        "name": features.get("name", "file"),
+        "domain": domain,
+        "fs": entry["fs"],
+        "features": features,
+        "vector": entry["vector"].copy(),
+        "window": entry.get("window"),
+        "env": entry.get("env"),
+        "channels": [dict(c) for c in entry["channels"]] if entry["channels"] else None,
+    }
+
+
+def _remember(key: str, entry: Dict[str, Any]) -> None:
+    global _memory_bytes
+    limit = float(settings.FEATURE_CACHE_MAX_MB) * 1024 * 1024
+    size = _nbytes(entry)
+    if size > limit:
+        return
+    with _lock:
+        if key in _memory:
+            _memory_bytes -= _memory.pop(key)[1]
+        _memory[key] = (entry, size)
+        _memory_bytes += size
+        while _memory_bytes > limit:
+            _, (_, old_size) = _memory.popitem(last=False)
+            _memory_bytes -= old_size
+            _counters["evictions"] += 1
+
+
+def _cache_dir() -> Optional[Path]:
+    directory = settings.FEATURE_CACHE_DIR
+    if directory is None:
+        directory = os.path.join(settings.UPLOAD_DIR, "feature_cache")
+    return Path(directory).resolve() if directory else None
+
+
+def _disk_path(key: str) -> Optional[Path]:
+    directory = _cache_dir()
+    return directory / f"{key}.npz" if directory is not None else None
+
+
+def _read_disk(key: str) -> Optional[Dict[str, Any]]:
+    path = _disk_path(key)
+    if path is None or not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            entry = json.loads(bytes(z["meta"]).decode())
+            for k in _ARRAYS:
+                if k in z.files:
+                    entry[k] = z[k]
+                    entry[k].setflags(write=False)
+        os.utime(path)  # recency for disk pruning
+        return entry
+    except Exception:
+        logger.warning("dropping unreadable feature cache entry %s", path.name)
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        return None
+
+
+def _write_disk(key: str, entry: Dict[str, Any]) -> None:
+    path = _disk_path(key)
+    if path is None:
+        return
+    meta = json.dumps({k: entry[k] for k in ("fs", "features", "channels")}, default=float).encode()
+    buf = io.BytesIO()
+    np.savez(buf, meta=np.frombuffer(meta, dtype=np.uint8), **{k: entry[k] for k in _ARRAYS if k in entry})
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write-then-rename so concurrent workers never observe a half-written file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".npz.tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(buf.getbuffer())
+        os.replace(tmp, path)
+        _account_write(path.parent, buf.getbuffer().nbytes)
+    except OSError:
+        logger.warning("could not write feature cache entry %s", path.name, exc_info=True)
+
+
+def _account_write(directory: Path, size: int) -> None:
+    """Prune only when the running estimate goes over budget (or is due a rescan)."""
+    global _disk_bytes, _writes_since_scan
+    limit = float(settings.FEATURE_CACHE_DISK_MAX_MB) * 1024 * 1024
+    with _lock:
+        if _disk_bytes is not None:
+            _disk_bytes += size
+        _writes_since_scan += 1
+        due = _disk_bytes is None or _disk_bytes > limit or _writes_since_scan >= _RESCAN_EVERY
+    if due:
+        _prune_disk(directory)
+
+
+def _prune_disk(directory: Path) -> None:
+    """Drop least recently used ``.npz`` entries beyond ``FEATURE_CACHE_DISK_MAX_MB``."""
+    global _disk_bytes, _writes_since_scan
+    limit = float(settings.FEATURE_CACHE_DISK_MAX_MB) * 1024 * 1024
+    files = []
+    for p in directory.glob("*.npz"):
+        try:
+            st = p.stat()
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, p))
+    total = sum(size for _, size, _ in files)
+    for _, size, p in sorted(files, key=lambda f: f[0]):
+        if total <= limit:
+            break
+        try:
+            p.unlink()
+            total -= size
+        except OSError:
+            pass
+    with _lock:
+        _disk_bytes, _writes_since_scan = total, 0
+
+
+def get(key: str, domain: str) -> Optional[Dict[str, Any]]:
+    """Cached sample for ``key`` (memory first, then disk), or None."""
+    if not settings.FEATURE_CACHE:
+        return None
+    with _lock:
+        entry = _memory.get(key, (None, 0))[0]
+        if entry is not None:
+            _memory.move_to_end(key)
+            _counters["hits"] += 1
+    if entry is None:
+        entry = _read_disk(key)
+        with _lock:
+            _counters["disk_hits" if entry is not None else "misses"] += 1
+        if entry is None:
+            return None
+        _remember(key, entry)
+    return _sample(entry, domain)
+
+
+def put(key: str, sample: Dict[str, Any]) -> None:
+    """Store a successful ``run_phase45`` sample under ``key`` in both tiers."""
+    if not settings.FEATURE_CACHE or sample.get("vector") is None:
+        return
+    entry = _entry(sample)
+    _remember(key, entry)
+    _write_disk(key, entry)
+    with _lock:
+        _counters["stores"] += 1
+
+
+def stats() -> Dict[str, Any]:
+    """This process's counters and in-memory tier size (pool workers keep their own)."""
+    with _lock:
+        return {**_counters, "entries": len(_memory), "bytes": _memory_bytes}
+
+
+def clear(disk: bool = False) -> None:
+    """Empty the in-process tier and reset counters (and the disk tier when ``disk``)."""
+    global _memory_bytes, _disk_bytes, _writes_since_scan
+    with _lock:
+        _memory.clear()
+        _memory_bytes = 0
+        _disk_bytes, _writes_since_scan = None, 0
+        for k in _counters:
+            _counters[k] = 0
+    directory = _cache_dir()
+    if disk and directory is not None and directory.exists():
+        for p in directory.glob("*.npz"):
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+
+__all__ = ["cache_key", "clear", "get", "pipeline_version", "put", "source_digest", "stats"]
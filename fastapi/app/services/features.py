@@ -1,94 +1,53 @@
-import math
-from typing import Tuple
+from typing import List, Sequence, Tuple, Union
 
 import numpy as np
-from scipy.signal import (
-    butter,
-    detrend,
-    filtfilt,
-    hilbert,
-    iirnotch,
-    resample_poly,
-    windows,
-)
 
 from ..core.config import settings
+from .filters import apply_bank, resample
+from .precision import as_work
+from .smoothing import moving_average
+from .spectral import analytic_envelope, detrend, spectral_stats
 
 #  heyyy this is fastAPI feature service
 
-def _band(sig: np.ndarray, fs: float, lo: float, hi: float, order: int = 4) -> np.ndarray:
-    if fs <= 0:
-        return sig
-    hi = min(hi, fs / 2.0 - 1e-3)
-    lo = max(lo, 1e-3)
-    if not math.isfinite(lo) or not math.isfinite(hi) or lo >= hi:
-        return sig
-    b, a = butter(order, [lo / (fs / 2.0), hi / (fs / 2.0)], btype="band")
-    return filtfilt(b, a, sig)
-
-
-def _notch(sig: np.ndarray, fs: float, mains: float = 50.0, q: float = 30.0) -> np.ndarray:
-    if fs <= 0:
-        return sig
-    try:
-        for freq in (mains, 60.0):
-            b, a = iirnotch(freq / (fs / 2.0), q)
-            sig = filtfilt(b, a, sig)
-    except ValueError:
-        pass
-    return sig
-
-
-def _resample(sig: np.ndarray, fs: float, target: float) -> Tuple[np.ndarray, float]:
-    if not target or abs(fs - target) < 1e-9:
-        return sig, float(fs)
-    up = int(round(target))
-    down = int(round(fs))
-    g = math.gcd(max(up, 1), max(down, 1))
-    sig = resample_poly(sig, max(up // g, 1), max(down // g, 1))
-    return sig, float(target)
-
-
 def first_window(sig: np.ndarray, fs: float, sec: float = 30.0) -> np.ndarray:
     if fs <= 0:
         return sig
-    n = min(len(sig), int(sec * fs))
-    return sig[: max(n, min(len(sig), int(5 * fs)))]
+    length = sig.shape[-1]
+    n = min(length, int(sec * fs))
+    return sig[..., : max(n, min(length, int(5 * fs)))]
 
 
 def dom_freq(sig: np.ndarray, fs: float) -> float:
     if len(sig) < 4 or fs <= 0:
         return 0.0
-    s = detrend(sig)
-    N = len(s)
-    Y = np.abs(np.fft.rfft(s * windows.hann(N)))
-    X = np.fft.rfftfreq(N, 1 / fs)
-    if len(X) < 3:
-        return 0.0
-    idx = np.argmax(Y[2:]) + 2
-    return float(X[idx])
+    dom, _, _ = spectral_stats(np.asarray(sig)[None], fs)
+    return float(dom[0])
 
 
 def spec_centroid_bw(sig: np.ndarray, fs: float) -> Tuple[float, float]:
     if len(sig) < 4 or fs <= 0:
         return 0.0, 0.0
-    s = detrend(sig)
-    N = len(s)
-    S = np.abs(np.fft.rfft(s * windows.hann(N))) + 1e-12
-    F = np.fft.rfftfreq(N, 1 / fs)
-    cen = np.sum(F * S) / np.sum(S)
-    bw = np.sqrt(np.sum(((F - cen) ** 2) * S) / np.sum(S))
-    return float(cen), float(bw)
+    _, cen, bw = spectral_stats(np.asarray(sig)[None], fs)
+    return float(cen[0]), float(bw[0])
 
 
 def psi_envelope(sig: np.ndarray) -> np.ndarray:
-    env = np.abs(hilbert(sig))
-    env /= env.max() + 1e-12
-    win = max(3, len(env) // 200)
+    """Normalised, smoothed Hilbert envelope along the last axis (1-D or 2-D input)."""
+    env = analytic_envelope(sig)
+    env /= np.max(env, axis=-1, keepdims=True) + 1e-12
+    win = max(3, env.shape[-1] // 200)
     if win % 2 == 0:
         win += 1
-    kernel = np.ones(win) / win
-    return np.convolve(env, kernel, mode="same")
+    return moving_average(env, win)
+
+
+def _first_run_at_most(x: np.ndarray, thr: float, hold: int) -> int:
+    """First index ``j`` with ``x[j:j+hold] <= thr`` (runs may be cut short by the end), or -1."""
+    above = np.concatenate(([0], np.cumsum(x > thr)))
+    j = np.arange(len(x))
+    ok = above[np.minimum(j + hold, len(x))] == above[j]
+    return int(np.argmax(ok)) if ok.any() else -1
 
 
 def gamma_proxy(env: np.ndarray, fs: float) -> float:
@@ -98,11 +57,13 @@ def gamma_proxy(env: np.ndarray, fs: float) -> float:
     if pk <= 1 or pk >= len(env) - 2:
         return 0.1
     half = env[pk] / 2.0
-    left = np.where(env[:pk] <= half)[0]
-    right = np.where(env[pk:] <= half)[0]
-    if left.size == 0 or right.size == 0:
+    # nearest half-maximum crossings on either side of the peak
+    left_hits = env[pk - 1 :: -1] <= half
+    right_hits = env[pk:] <= half
+    if not left_hits.any() or not right_hits.any():
         return 0.1
-    width = (pk - left[-1] + right[0]) / fs
+    left = pk - 1 - int(np.argmax(left_hits))
+    width = (pk - left + int(np.argmax(right_hits))) / fs
     return float(1.0 / (width + 1e-3))
 
 
@@ -116,11 +77,9 @@ def collapse_proxy_time(env: np.ndarray, fs: float, pk_pad_sec: float = 0.05, th
     if len(tail) == 0:
         return pk / fs
     hold = max(1, int(min_hold_sec * fs))
-    below = np.where(tail <= thr)[0]
-    for j in below:
-        hi = min(len(tail), j + hold)
-        if np.all(tail[j:hi] <= thr):
-            return (start + j) / fs
+    j = _first_run_at_most(tail, thr, hold)
+    if j >= 0:
+        return (start + j) / fs
     t = np.arange(len(tail)) / fs
     y = np.clip(tail, 1e-6, 1.0)
     if len(t) == 0:
@@ -163,65 +122,163 @@ def _to_vec(feat: dict, fs: float) -> np.ndarray:
 
 
 def prepare_signal(domain: str, sig: np.ndarray, fs: float) -> Tuple[np.ndarray, float]:
-    sig = np.asarray(sig, dtype=float)
+    """Condition ``sig`` along its last axis (1-D, or ``(channels, samples)``)."""
+    sig = as_work(sig)
     # ensure we never pass NaNs/Infs into SciPy transforms
     sig = np.nan_to_num(sig, nan=0.0, posinf=0.0, neginf=0.0)
     if domain == "audio":
-        sig = _band(sig, fs, 20.0, min(8000.0, fs / 2.0 - 1.0))
-        sig, fs = _resample(sig, fs, float(settings.RESAMPLE_AUDIO_HZ))
+        sig = apply_bank(domain, sig, fs)
+        sig, fs = resample(sig, fs, float(settings.RESAMPLE_AUDIO_HZ))
     elif domain == "eeg":
-        sig = _band(sig, fs, 1.0, 45.0)
-        sig = _notch(sig, fs)
-        sig, fs = _resample(sig, fs, float(settings.RESAMPLE_EEG_HZ))
+        sig = apply_bank(domain, sig, fs)  # 1–45 Hz band-pass + 50/60 Hz notches, one pass
+        sig, fs = resample(sig, fs, float(settings.RESAMPLE_EEG_HZ))
     elif domain == "ligo":
-        sig = detrend(sig)
         if not fs:
             fs = settings.DEFAULT_LIGO_FS
+        if settings.RESAMPLE_LIGO_HZ and fs > settings.RESAMPLE_LIGO_HZ:
+            # loaders already decimate by integer factors; this covers the other ratios
+            sig, fs = resample(sig, fs, float(settings.RESAMPLE_LIGO_HZ))
+        sig = detrend(sig)
     elif domain == "grace":
         if not fs:
             fs = settings.DEFAULT_GRACE_FS
     else:
         if not fs:
-            fs = float(len(sig))
-    sig = np.nan_to_num(sig, nan=0.0, posinf=0.0, neginf=0.0)
-    return sig.astype(np.float32), float(fs)
+            fs = float(sig.shape[-1])
+    sig = np.nan_to_num(sig, nan=0.0, posinf=0.0, neginf=0.0, copy=False)  # sig is our own copy here
+    return sig.astype(np.float32, copy=False), float(fs)
+
+
+def _clean_scalar(x: float) -> float:
+    return float(np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0))
+
+
+def _features_block(block: np.ndarray, fs: float) -> List[Tuple[np.ndarray, dict, np.ndarray]]:
+    """ψ-features for a ``(rows, n)`` stack of equal-length windows sampled at ``fs``."""
+    block = np.nan_to_num(block, nan=0.0, posinf=0.0, neginf=0.0)
+    rows, n = block.shape
+    env = psi_envelope(block)
+    env = np.nan_to_num(env, nan=0.0, posinf=0.0, neginf=0.0)
+    if n < 4 or fs <= 0:
+        dom = cen = bw = np.zeros(rows)
+    else:
+        dom, cen, bw = spectral_stats(block, fs)
+    energy = np.clip(np.mean(env, axis=-1), 0.0, 1.0)
+    noise = np.clip(np.std(block - env * np.sign(block), axis=-1), 0.0, 1.0)
+    beta = np.mean(np.abs(np.gradient(env, axis=-1)), axis=-1)
+    lam = np.clip(bw / (max(fs / 2.0, 1e-6)), 0.0, 2.0)
+
+    out = []
+    for i in range(rows):
+        feat = dict(
+            dom=_clean_scalar(dom[i]),
+            cen=_clean_scalar(cen[i]),
+            bw=_clean_scalar(bw[i]),
+            energy=_clean_scalar(energy[i]),
+            noise=_clean_scalar(noise[i]),
+            gamma=_clean_scalar(gamma_proxy(env[i], fs)),
+            beta=_clean_scalar(beta[i]),
+            lam=_clean_scalar(lam[i]),
+        )
+        out.append((env[i], feat, _to_vec(feat, fs)))
+    return out
+
+
+def window_features(
+    windows: Union[np.ndarray, Sequence[np.ndarray]], fs: float
+) -> List[Tuple[np.ndarray, dict, np.ndarray]]:
+    """Features for many prepared windows sharing one sample rate.
+
+    ``windows`` is a 2-D stack or a list of 1-D windows of any lengths; rows are
+    bucketed by length (not zero-padded, which would change the spectra) and
+    each bucket is processed with one set of vectorised FFTs and reductions.
+    Returns ``(env, feat, vec)`` per window, in input order.
+    """
+    rows = [np.asarray(w) for w in windows]
+    out: List = [None] * len(rows)
+    buckets: dict = {}
+    for i, w in enumerate(rows):
+        buckets.setdefault((len(w), w.dtype), []).append(i)
+    for idx in buckets.values():
+        block = np.stack([rows[i] for i in idx])
+        for i, res in zip(idx, _features_block(block, fs)):
+            out[i] = res
+    return out
 
 
 def compute_features(domain: str, sig: np.ndarray, fs: float) -> Tuple[np.ndarray, np.ndarray, dict, np.ndarray]:
     sig, fs = prepare_signal(domain, sig, fs)
-    window = first_window(sig, fs)
+    window = first_window(sig, fs, settings.FEATURE_WINDOW_SEC)
     window = np.nan_to_num(window, nan=0.0, posinf=0.0, neginf=0.0)
-    env = psi_envelope(window)
-    env = np.nan_to_num(env, nan=0.0, posinf=0.0, neginf=0.0)
-    dom = dom_freq(window, fs)
-    cen, bw = spec_centroid_bw(window, fs)
-    energy = float(np.clip(np.mean(env), 0.0, 1.0))
-    noise = float(np.clip(np.std(window - env * np.sign(window)), 0.0, 1.0))
-    gamma = float(gamma_proxy(env, fs))
-    beta = float(np.mean(np.abs(np.gradient(env))))
-    lam = float(np.clip(bw / (max(fs / 2.0, 1e-6)), 0.0, 2.0))
-
-    # Clean any accidental NaNs/Infs from scalar features
-    def _clean_scalar(x: float) -> float:
-        return float(np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0))
-
-    feat = dict(
-        dom=_clean_scalar(dom),
-        cen=_clean_scalar(cen),
-        bw=_clean_scalar(bw),
-        energy=_clean_scalar(energy),
-        noise=_clean_scalar(noise),
-        gamma=_clean_scalar(gamma),
-        beta=_clean_scalar(beta),
-        lam=_clean_scalar(lam),
-    )
-    vec = _to_vec(feat, fs)
+    env, feat, vec = _features_block(window[None], fs)[0]
     return window, env, feat, vec
 
 
+def compute_channel_features(
+    domain: str, sig: np.ndarray, fs: float
+) -> Tuple[np.ndarray, np.ndarray, List[dict], np.ndarray]:
+    """Per-channel features for a ``(channels, samples)`` recording.
+
+    Filtering, resampling, FFTs and the Hilbert envelope run once on the whole
+    block. Returns windows and envelopes ``(channels, n)``, one feature dict per
+    channel and the ``(channels, 5)`` model vectors.
+    """
+    sig = np.atleast_2d(sig)
+    sig, fs = prepare_signal(domain, sig, fs)
+    window = first_window(sig, fs, settings.FEATURE_WINDOW_SEC)
+    window = np.nan_to_num(window, nan=0.0, posinf=0.0, neginf=0.0)
+    rows = _features_block(window, fs)
+    env = np.stack([r[0] for r in rows])
+    return window, env, [r[1] for r in rows], np.stack([r[2] for r in rows])
+
+
+def aggregate_channels(feats: Sequence[dict], fs: float) -> Tuple[dict, np.ndarray]:
+    """Channel-mean of every scalar feature and the model vector built from it."""
+    keys = [k for k, v in feats[0].items() if isinstance(v, (int, float))]
+    agg = {k: _clean_scalar(np.mean([f[k] for f in feats])) for k in keys}
+    return agg, _to_vec(agg, fs)
+
+
+def compute_features_batch(
+    domain: str,
+    sigs: Union[np.ndarray, Sequence[np.ndarray]],
+    fs: Union[float, Sequence[float]],
+) -> List[Tuple[np.ndarray, np.ndarray, dict, np.ndarray]]:
+    """Batched ``compute_features`` for many signals of one domain.
+
+    ``sigs`` is a 2-D stack or a list of 1-D signals; ``fs`` is one rate for all
+    of them or one per signal. Windows that end up with the same rate and length
+    share one vectorised feature pass; results are identical to calling
+    ``compute_features`` on each signal.
+    """
+    sigs = list(sigs)
+    rates = [fs] * len(sigs) if np.ndim(fs) == 0 else list(fs)
+    if len(rates) != len(sigs):
+        raise ValueError("fs must be a scalar or have one entry per signal")
+
+    prepared = []
+    groups: dict = {}
+    for i, (sig, rate) in enumerate(zip(sigs, rates)):
+        sig, rate = prepare_signal(domain, sig, rate)
+        window = first_window(sig, rate, settings.FEATURE_WINDOW_SEC)
+        window = np.nan_to_num(window, nan=0.0, posinf=0.0, neginf=0.0)
+        prepared.append(window)
+        groups.setdefault(rate, []).append(i)
+
+    out: List = [None] * len(sigs)
+    for rate, idx in groups.items():
+        for i, (env, feat, vec) in zip(idx, window_features([prepared[i] for i in idx], rate)):
+            out[i] = (prepared[i], env, feat, vec)
+    return out
+
+
 __all__ = [
     "prepare_signal",
     "compute_features",
+    "compute_channel_features",
+    "aggregate_channels",
+    "compute_features_batch",
+    "window_features",
     "collapse_proxy_time",
     "energy_drop_ratio",
     "first_window",
@@ -0,0 +1,107 @@
+"""Cached filter bank for ``features.prepare_signal``.
+
+Filters are designed once per ``(domain, fs)`` in second-order sections and
+kept in an LRU. A domain's whole conditioning chain runs as one cascaded
+``sosfiltfilt``: the EEG chain is the 1–45 Hz band-pass plus the 50 and 60 Hz
+notches. SOS form avoids the ill-conditioned ``ba`` polynomials that
+high-order band-passes produce at low sampling rates. The anti-aliasing FIR
+behind ``resample_poly`` is cached per ``(up, down)`` in the same way.
+"""
+import math
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+
+from ..core.lazy import lazy_import
+
+signal = lazy_import("scipy.signal")
+
+# (lo, hi) band-pass and mains notches per domain; hi is capped below Nyquist
+_AUDIO_BAND = (20.0, 8000.0)
+_EEG_BAND = (1.0, 45.0)
+_EEG_NOTCHES = (50.0, 60.0)
+_NOTCH_Q = 30.0
+
+
+def _frozen(a: np.ndarray) -> np.ndarray:
+    a.setflags(write=False)  # cached designs are shared between calls
+    return a
+
+
+@lru_cache(maxsize=128)
+def band_sos(fs: float, lo: float, hi: float, order: int = 4) -> Optional[np.ndarray]:
+    """Butterworth band-pass in SOS form, or None when the band is empty at ``fs``."""
+    if fs <= 0:
+        return None
+    hi = min(hi, fs / 2.0 - 1e-3)
+    lo = max(lo, 1e-3)
+    if not math.isfinite(lo) or not math.isfinite(hi) or lo >= hi:
+        return None
+    return _frozen(signal.butter(order, [lo / (fs / 2.0), hi / (fs / 2.0)], btype="band", output="sos"))
+
+
+@lru_cache(maxsize=128)
+def notch_sos(fs: float, freqs: Tuple[float, ...] = _EEG_NOTCHES, q: float = _NOTCH_Q) -> Optional[np.ndarray]:
+    """Cascade of ``iirnotch`` sections; notches at or above Nyquist are dropped."""
+    if fs <= 0:
+        return None
+    sections = []
+    for freq in freqs:
+        try:
+            b, a = signal.iirnotch(freq / (fs / 2.0), q)
+        except ValueError:
+            break
+        sections.append(signal.tf2sos(b, a))
+    return _frozen(np.vstack(sections)) if sections else None
+
+
+@lru_cache(maxsize=128)
+def filter_bank(domain: str, fs: float) -> Optional[np.ndarray]:
+    """Combined SOS chain applied to ``domain`` signals sampled at ``fs`` (None = no filtering)."""
+    if domain == "audio":
+        parts = [band_sos(fs, _AUDIO_BAND[0], min(_AUDIO_BAND[1], fs / 2.0 - 1.0))]
+    elif domain == "eeg":
+        parts = [band_sos(fs, *_EEG_BAND), notch_sos(fs)]
+    else:
+        return None
+    parts = [p for p in parts if p is not None]
+    return _frozen(np.vstack(parts)) if parts else None
+
+
+def _coef_dtype(sig: np.ndarray) -> np.dtype:
+    return np.dtype(np.float32) if np.asarray(sig).dtype == np.float32 else np.dtype(np.float64)
+
+
+def apply_bank(domain: str, sig: np.ndarray, fs: float) -> np.ndarray:
+    """Zero-phase filter ``sig`` along its last axis with the domain's cached chain."""
+    sos = filter_bank(domain, float(fs))
+    if sos is None:
+        return sig
+    # sosfilt needs a writable coefficient buffer; a few sections are cheap to copy.
+    # Matching the signal's dtype keeps float32 input in float32.
+    return signal.sosfiltfilt(np.array(sos, dtype=_coef_dtype(sig)), sig, axis=-1)
+
+
+@lru_cache(maxsize=64)
+def resample_fir(up: int, down: int) -> np.ndarray:
+    """The default ``resample_poly`` anti-aliasing filter (Kaiser β=5) for ``up/down``."""
+    max_rate = max(up, down)
+    return _frozen(signal.firwin(2 * 10 * max_rate + 1, 1.0 / max_rate, window=("kaiser", 5.0)))
+
+
+def resample(sig: np.ndarray, fs: float, target: float) -> Tuple[np.ndarray, float]:
+    """Polyphase resample along the last axis to ``target`` Hz using the cached FIR."""
+    if not target or abs(fs - target) < 1e-9:
+        return sig, float(fs)
+    up = int(round(target))
+    down = int(round(fs))
+    g = math.gcd(max(up, 1), max(down, 1))
+    up, down = max(up // g, 1), max(down // g, 1)
+    if up == down == 1:
+        return sig, float(target)
+    fir = resample_fir(up, down).astype(_coef_dtype(sig))
+    return signal.resample_poly(sig, up, down, axis=-1, window=fir), float(target)
+
+
+__all__ = ["apply_bank", "band_sos", "filter_bank", "notch_sos", "resample", "resample_fir"]
@@ -0,0 +1,496 @@
+"""Background jobs for long batch predictions.
+
+A job is queued with its uploads spooled under ``UPLOAD_DIR/jobs/<id>``.
+``JOBS_WORKERS`` threads claim queued jobs and run the handler registered
+for the job's kind. Each handler reports files done out of the total.
+Finished jobs keep their result for ``JOBS_TTL_SEC`` and are then evicted.
+Spooled files are removed as soon as a job finishes.
+
+A running job holds a lease: its worker renews the job's heartbeat every
+third of ``JOBS_LEASE_SEC``. When a process dies mid-job the heartbeat goes
+stale, and the job is queued again at the next ``resume()`` (or by any live
+worker's periodic sweep) and re-run from its spooled files.
+
+Jobs live in a store chosen by ``JOBS_BACKEND``:
+
+* ``memory``: per process, for tests and single-worker runs.
+* ``sqlite``: a database at ``JOBS_DB`` (``UPLOAD_DIR/jobs.sqlite3`` by
+  default). Every worker process sees the same
+  jobs, and any of them can run a queued one, because claiming is a single
+  write transaction.
+
+Submissions may carry a client key. Reusing a key returns the job already
+created for it. Reusing a key for a different request (a different
+fingerprint) raises ``KeyConflict``.
+"""
+import json
+import logging
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+
+class KeyConflict(ValueError):
+    """The idempotency key already belongs to a different request."""
+
+
+@dataclass
+class Job:
+    kind: str
+    params: Dict[str, Any]
+    total: int
+    key: Optional[str] = None
+    fingerprint: str = ""
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    done: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    heartbeat: Optional[float] = None  # last lease renewal while running
+
+    def public(self) -> Dict[str, Any]:
+        """Status payload: everything except the parameters and the result."""
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "created": self.created,
+            "finished": self.finished,
+        }
+
+
+class JobStore(ABC):
+    """Queue plus result store. Implementations must be safe to share between threads."""
+
+    @abstractmethod
+    def add(self, job: Job) -> Tuple[Job, bool]:
+        """Queue ``job``; ``(existing, False)`` when its key is already taken."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job with this id, or None."""
+
+    @abstractmethod
+    def by_key(self, key: str) -> Optional[Job]:
+        """The job submitted under this idempotency key, or None."""
+
+    @abstractmethod
+    def claim(self) -> Optional[Job]:
+        """Oldest queued job, marked running with a fresh heartbeat; None when the queue is empty."""
+
+    @abstractmethod
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Set ``fields`` on the job; unknown ids are ignored."""
+
+    @abstractmethod
+    def evict(self, before: float) -> List[str]:
+        """Drop jobs that finished before ``before``; returns their ids."""
+
+    @abstractmethod
+    def requeue_stale(self, before: float) -> List[str]:
+        """Queue again running jobs whose last heartbeat is older than ``before``; returns their ids."""
+
+
+class MemoryJobStore(JobStore):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()  # insertion order is queue order
+        self._keys: Dict[str, str] = {}
+
+    def add(self, job: Job) -> Tuple[Job, bool]:
+        with self._lock:
+            if job.key is not None and job.key in self._keys:
+                return self._copy(self._jobs[self._keys[job.key]]), False
+            self._jobs[job.id] = self._copy(job)
+            if job.key is not None:
+                self._keys[job.key] = job.id
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._copy(job) if job is not None else None
+
+    def by_key(self, key: str) -> Optional[Job]:
+        with self._lock:
+            job_id = self._keys.get(key)
+            return self._copy(self._jobs[job_id]) if job_id is not None else None
+
+    def claim(self) -> Optional[Job]:
+        with self._lock:
+            for job in self._jobs.values():
+                if job.status == QUEUED:
+                    job.status, job.heartbeat = RUNNING, time.time()
+                    return self._copy(job)
+        return None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                for k, v in fields.items():
+                    setattr(job, k, v)
+
+    def evict(self, before: float) -> List[str]:
+        with self._lock:
+            gone = [j.id for j in self._jobs.values() if j.status in FINISHED and (j.finished or 0) < before]
+            for job_id in gone:
+                job = self._jobs.pop(job_id)
+                if job.key is not None:
+                    self._keys.pop(job.key, None)
+        return gone
+
+    def requeue_stale(self, before: float) -> List[str]:
+        with self._lock:
+            stale = [j for j in self._jobs.values() if j.status == RUNNING and (j.heartbeat or 0) < before]
+            for job in stale:
+                job.status, job.done, job.heartbeat = QUEUED, 0, None
+        return [j.id for j in stale]
+
+    @staticmethod
+    def _copy(job: Job) -> Job:
+        return Job(**asdict(job))
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    key TEXT UNIQUE,
+    fingerprint TEXT NOT NULL,
+    status TEXT NOT NULL,
+    done INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    finished REAL,
+    heartbeat REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created);
+"""
+_JSON_COLUMNS = ("params", "result")
+
+
+class SQLiteJobStore(JobStore):
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).resolve().parent.mkdir(parents=True, exist_ok=True)
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")  # readers do not block the claiming writer
+            db.executescript(_SCHEMA)
+            if "heartbeat" not in {r["name"] for r in db.execute("PRAGMA table_info(jobs)")}:
+                db.execute("ALTER TABLE jobs ADD COLUMN heartbeat REAL")  # databases from before leases
+
+    @contextmanager
+    def _db(self) -> Iterator[sqlite3.Connection]:
+        # one short-lived connection per call: safe across threads and processes
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _job(row: Optional[sqlite3.Row]) -> Optional[Job]:
+        if row is None:
+            return None
+        values = dict(row)
+        for col in _JSON_COLUMNS:
+            values[col] = json.loads(values[col]) if values[col] is not None else None
+        return Job(**values)
+
+    def add(self, job: Job) -> Tuple[Job, bool]:
+        values = asdict(job)
+        for col in _JSON_COLUMNS:
+            values[col] = json.dumps(values[col]) if values[col] is not None else None
+        cols = ", ".join(values)
+        marks = ", ".join("?" * len(values))
+        try:
+            with self._db() as db:
+                db.execute(f"INSERT INTO jobs ({cols}) VALUES ({marks})", tuple(values.values()))
+        except sqlite3.IntegrityError:
+            existing = self.by_key(job.key) if job.key is not None else None
+            if existing is None:
+                raise
+            return existing, False
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._db() as db:
+            return self._job(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def by_key(self, key: str) -> Optional[Job]:
+        with self._db() as db:
+            return self._job(db.execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone())
+
+    def claim(self) -> Optional[Job]:
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")  # one claimer at a time across processes
+            try:
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+                ).fetchone()
+                now = time.time()
+                if row is not None:
+                    db.execute("UPDATE jobs SET status = ?, heartbeat = ? WHERE id = ?", (RUNNING, now, row["id"]))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        job = self._job(row)
+        if job is not None:
+            job.status, job.heartbeat = RUNNING, now
+        return job
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        for col in _JSON_COLUMNS:
+            if fields.get(col) is not None:
+                fields[col] = json.dumps(fields[col])
+        assignments = ", ".join(f"{col} = ?" for col in fields)
+        with self._db() as db:
+            db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def evict(self, before: float) -> List[str]:
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                query = "FROM jobs WHERE status IN (?, ?) AND finished < ?"
+                gone = [r["id"] for r in db.execute(f"SELECT id {query}", (*FINISHED, before))]
+                db.execute(f"DELETE {query}", (*FINISHED, before))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return gone
+
+    def requeue_stale(self, before: float) -> List[str]:
+        with self._db() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                query = "FROM jobs WHERE status = ? AND (heartbeat IS NULL OR heartbeat < ?)"
+                stale = [r["id"] for r in db.execute(f"SELECT id {query}", (RUNNING, before))]
+                db.execute(
+                    f"UPDATE jobs SET status = ?, done = 0, heartbeat = NULL WHERE id IN (SELECT id {query})",
+                    (QUEUED, RUNNING, before),
+                )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return stale
+
+
+_lock = threading.Lock()
+_store: Optional[JobStore] = None
+_handlers: Dict[str, Callable[[Job, Callable[[int], None]], Any]] = {}
+_workers: List[threading.Thread] = []
+_wake = threading.Event()
+_stop = threading.Event()  # replaced on every start so stale workers stay stopped
+_next_evict = 0.0
+
+
+def store() -> JobStore:
+    """The configured store, created on first use."""
+    global _store
+    if _store is not None:
+        return _store
+    with _lock:
+        if _store is None:
+            backend = (settings.JOBS_BACKEND or "memory").lower()
+            if backend == "sqlite":
+                _store = SQLiteJobStore(str(db_path()))
+            elif backend == "memory":
+                _store = MemoryJobStore()
+            else:
+                raise RuntimeError(f"Unknown JOBS_BACKEND {settings.JOBS_BACKEND!r} (memory|sqlite)")
+    return _store
+
+
+def register_handler(kind: str, handler: Callable[[Job, Callable[[int], None]], Any]) -> None:
+    """``handler(job, progress)`` runs a job of ``kind`` and returns its JSON-serialisable result."""
+    _handlers[kind] = handler
+
+
+def db_path() -> Path:
+    """Absolute path of the sqlite store, so every worker opens the same file."""
+    return Path(settings.JOBS_DB or Path(settings.UPLOAD_DIR) / "jobs.sqlite3").resolve()
+
+
+def job_dir(job_id: str) -> Path:
+    """Where a job's uploads are spooled."""
+    return Path(settings.UPLOAD_DIR) / "jobs" / job_id
+
+
+def lookup(key: Optional[str], fingerprint: str) -> Optional[Job]:
+    """Job already submitted under ``key`` (raises ``KeyConflict`` if it was a different request)."""
+    if not key:
+        return None
+    job = store().by_key(key)
+    if job is not None and job.fingerprint != fingerprint:
+        raise KeyConflict(f"Idempotency key {key!r} was used for a different request")
+    return job
+
+
+def submit(job: Job) -> Tuple[Job, bool]:
+    """Queue ``job`` and wake a worker; ``(existing, False)`` when its key was taken meanwhile."""
+    _evict_expired()
+    stored, created = store().add(job)
+    if not created:
+        shutil.rmtree(job_dir(job.id), ignore_errors=True)
+        if stored.fingerprint != job.fingerprint:
+            raise KeyConflict(f"Idempotency key {job.key!r} was used for a different request")
+        return stored, False
+    start()
+    _wake.set()
+    return stored, True
+
+
+def get(job_id: str) -> Optional[Job]:
+    _evict_expired()
+    return store().get(job_id)
+
+
+def _evict_expired(force: bool = False) -> None:
+    # at most once a second; every finished job past its TTL goes, with its files,
+    # and running jobs whose lease lapsed go back to the queue
+    global _next_evict
+    now = time.time()
+    if not force and now < _next_evict:
+        return
+    _next_evict = now + 1.0
+    for job_id in store().evict(now - float(settings.JOBS_TTL_SEC)):
+        shutil.rmtree(job_dir(job_id), ignore_errors=True)
+    _requeue_stale()
+
+
+def _requeue_stale() -> None:
+    for job_id in store().requeue_stale(time.time() - float(settings.JOBS_LEASE_SEC)):
+        logger.warning("job %s lost its worker; queued again", job_id)
+
+
+def _renew_lease(s: JobStore, job_id: str, finished: threading.Event) -> None:
+    # renewed on a timer, not on progress: a single long file must not look like a dead worker
+    interval = max(0.01, float(settings.JOBS_LEASE_SEC) / 3)
+    while not finished.wait(interval):
+        try:
+            s.update(job_id, heartbeat=time.time())
+        except Exception:
+            logger.exception("could not renew the lease of job %s", job_id)
+
+
+def _run(job: Job) -> None:
+    s = store()
+    finished = threading.Event()
+    lease = threading.Thread(target=_renew_lease, args=(s, job.id, finished), name="phase45-lease", daemon=True)
+    lease.start()
+    try:
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            raise RuntimeError(f"No handler for job kind {job.kind!r}")
+        result = handler(job, lambda done: s.update(job.id, done=int(done)))
+        s.update(job.id, status=DONE, done=job.total, result=result, finished=time.time())
+    except Exception as exc:
+        logger.exception("job %s (%s) failed", job.id, job.kind)
+        s.update(job.id, status=FAILED, error=str(exc), finished=time.time())
+    finally:
+        finished.set()
+        shutil.rmtree(job_dir(job.id), ignore_errors=True)
+
+
+def _work(stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            _evict_expired()
+            _wake.clear()
+            job = store().claim()
+        except Exception:
+            logger.exception("job queue unavailable")
+            job = None
+        if job is None:
+            _wake.wait(float(settings.JOBS_POLL_SEC))
+            continue
+        _run(job)
+
+
+def start() -> None:
+    """Start the ``JOBS_WORKERS`` worker threads (idempotent)."""
+    global _stop
+    with _lock:
+        if _workers:
+            return
+        _stop = threading.Event()
+        for i in range(max(1, int(settings.JOBS_WORKERS))):
+            t = threading.Thread(target=_work, args=(_stop,), name=f"phase45-jobs-{i}", daemon=True)
+            t.start()
+            _workers.append(t)
+
+
+def resume() -> None:
+    """Start workers at boot when a shared store may already hold queued jobs.
+
+    Jobs left running by a process that died (their lease lapsed) are queued again first.
+    """
+    if (settings.JOBS_BACKEND or "").lower() == "sqlite" and db_path().exists():
+        _requeue_stale()
+        start()
+
+
+def reset(wait: bool = False) -> None:
+    """Stop the workers and forget the store (settings changes take effect on next use)."""
+    global _store, _next_evict
+    with _lock:
+        threads = list(_workers)
+        _workers.clear()
+        _stop.set()
+        _wake.set()
+        _store = None
+        _next_evict = 0.0
+    if wait:
+        for t in threads:
+            t.join()
+
+
+__all__ = [
+    "DONE",
+    "FAILED",
+    "Job",
+    "JobStore",
+    "KeyConflict",
+    "MemoryJobStore",
+    "QUEUED",
+    "RUNNING",
+    "SQLiteJobStore",
+    "db_path",
+    "get",
+    "job_dir",
+    "lookup",
+    "register_handler",
+    "reset",
+    "resume",
+    "start",
+    "store",
+    "submit",
+]
@@ -1,178 +1,657 @@
-# app/services/loaders.py
+# app/services/loaders.py
+import hashlib
+import io
 import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
 import numpy as np
 
+from ..core.config import settings
+from ..core.lazy import has_module, lazy_import
+from .filters import resample_fir
+
+# backends are imported on first use, not when the app starts
+signal = lazy_import("scipy.signal")
+
 # --- AUDIO (wav) ---
-import soundfile as sf
+sf = lazy_import("soundfile")
 
 # --- LIGO (hdf5) ---
-import h5py
-
-# Optional EEG backends (we'll try them if present)
-_HAS_PYEDFLIB = False
-_HAS_MNE = False
-_HAS_WFDB = False
-try:
-    import pyedflib   # may not exist on Py3.12 Windows
-    _HAS_PYEDFLIB = True
-except Exception:
-    try:
-        import mne    # heavier but works; also optional
-        _HAS_MNE = True
-    except Exception:
-        pass
-try:
-    import wfdb  # ECG reader for .hea/.dat
-    _HAS_WFDB = True
-except Exception:
-    pass
+h5py = lazy_import("h5py")
+
+# Optional EEG backends (we'll try them if present)
+_HAS_PYEDFLIB = has_module("pyedflib")  # may not exist on Py3.12 Windows
+_HAS_MNE = not _HAS_PYEDFLIB and has_module("mne")  # heavier but works; also optional
+_HAS_WFDB = has_module("wfdb")  # ECG reader for .hea/.dat
+pyedflib = lazy_import("pyedflib")
+mne = lazy_import("mne")
+wfdb = lazy_import("wfdb")
 
 def _clean_signal(x: np.ndarray) -> np.ndarray:
     """Replace NaNs/Infs with finite values so downstream SciPy calls don't fail."""
     return np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
 
 
-def load_audio_wav(path: str):
-    x, fs = sf.read(path, dtype="float32", always_2d=False)
-    if x.ndim > 1:
+def _single_channel(x: np.ndarray, meta: dict, label: str):
+    """Wrap a 1-D signal as a one-row ``(channels, samples)`` block."""
+    meta["channels"] = [label]
+    return x[None, :]
+
+
+def _window(fs: float, total: int, start: float = 0.0, duration: float | None = None):
+    """Sample range ``[i0, i1)`` for ``start``/``duration`` seconds, clipped to ``total``."""
+    i0 = min(max(int(round(float(start or 0.0) * fs)), 0), total)
+    if duration is None:
+        return i0, total
+    return i0, min(total, i0 + max(int(round(float(duration) * fs)), 0))
+
+
+def _window_meta(meta: dict, fs: float, i0: int, i1: int, total: int) -> dict:
+    meta.update(
+        {
+            "start": i0 / fs if fs else 0.0,
+            "duration": (i1 - i0) / fs if fs else 0.0,
+            "total_samples": int(total),
+        }
+    )
+    return meta
+
+
+def _is_path(source) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+
+def _source_name(source, name: str | None = None) -> str:
+    """Display name: ``name`` if given, else the basename of the path or file object."""
+    if name:
+        return os.path.basename(name)
+    if source is None:
+        return ""
+    if _is_path(source):
+        return os.path.basename(os.fspath(source))
+    return os.path.basename(str(getattr(source, "name", None) or "upload"))
+
+
+def _open_source(source):
+    """Path as-is, bytes-like buffers wrapped in ``BytesIO``, file objects rewound."""
+    if _is_path(source):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)  # shares a bytes object's buffer until written to
+    source.seek(0)
+    return source
+
+
+def _read_head(source, n: int) -> bytes:
+    """First ``n`` bytes of ``source``; file objects keep their position."""
+    if _is_path(source):
+        with open(source, "rb") as f:
+            return f.read(n)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:n])
+    pos = source.tell()
+    try:
+        source.seek(0)
+        return source.read(n)
+    finally:
+        source.seek(pos)
+
+
+@contextmanager
+def _spooled(source, suffix: str = ""):
+    """Yield a filesystem path for ``source``, spooling buffers and file objects to UPLOAD_DIR.
+
+    Only for backends that cannot read from a file object (EDF, wfdb).
+    """
+    if _is_path(source):
+        yield os.fspath(source)
+        return
+    tmp = tempfile.NamedTemporaryFile(delete=False, dir=settings.UPLOAD_DIR, suffix=suffix)
+    try:
+        with tmp:
+            shutil.copyfileobj(_open_source(source), tmp)
+        yield tmp.name
+    finally:
+        try:
+            os.remove(tmp.name)
+        except OSError:
+            pass
+
+
+def load_audio_wav(
+    source, multichannel: bool = False, start: float = 0.0, duration: float | None = None, name: str | None = None
+):
+    with sf.SoundFile(_open_source(source)) as snd:
+        fs, frames = snd.samplerate, snd.frames
+        i0, i1 = _window(fs, frames, start, duration)
+        snd.seek(i0)
+        x = snd.read(i1 - i0, dtype="float32", always_2d=multichannel)
+    meta = _window_meta({"type": "audio", "name": _source_name(source, name)}, fs, i0, i1, frames)
+    if multichannel:
+        x = np.ascontiguousarray(x.T)  # (channels, samples)
+        meta["channels"] = [f"ch{i}" for i in range(x.shape[0])]
+    elif x.ndim > 1:
         x = x.mean(axis=1)  # mono fold
     x = _clean_signal(np.asarray(x, dtype=np.float32))
-    return x, int(fs), {"type": "audio", "name": os.path.basename(path)}
-
-def _find_hdf5_strain(f: h5py.File):
-    # common GWOSC layouts
-    candidates = [
-        "strain/Strain",
-        "H1:GWOSC-4KHZ_R1/strain/Strain",
-        "L1:GWOSC-4KHZ_R1/strain/Strain",
-        "GWOSC-4KHZ_R1/strain/Strain",
-    ]
-    for k in candidates:
-        if k in f:
-            return f[k]
-    # fallback: search recursively for something named 'Strain' or containing 'strain'
-    def dfs(g):
-        for name, obj in g.items():
-            if isinstance(obj, h5py.Dataset) and (name == "Strain" or "strain" in name.lower()):
-                return obj
-            if isinstance(obj, h5py.Group):
-                hit = dfs(obj)
-                if hit is not None:
-                    return hit
-        return None
-    return dfs(f)
+    return x, int(fs), meta
 
-def load_ligo_hdf5(path: str):
-    with h5py.File(path, "r") as f:
-        d = _find_hdf5_strain(f)
-        if d is None:
+# common GWOSC layouts, preferred first
+_STRAIN_CANDIDATES = (
+    "strain/Strain",
+    "H1:GWOSC-4KHZ_R1/strain/Strain",
+    "L1:GWOSC-4KHZ_R1/strain/Strain",
+    "GWOSC-4KHZ_R1/strain/Strain",
+)
+_DETECTOR = re.compile(r"(?<![A-Za-z0-9])([HLVKG]1)(?![A-Za-z0-9])")
+_LAYOUT_CACHE_SIZE = 256
+_layouts: "OrderedDict[tuple, tuple]" = OrderedDict()
+_layouts_lock = threading.Lock()  # uploads are read on several I/O threads at once
+
+
+@dataclass(frozen=True)
+class StrainSeries:
+    path: str
+    label: str
+    fs: int
+    length: int
+
+
+def _source_size(source) -> int:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source).nbytes
+    pos = source.tell()
+    try:
+        return source.seek(0, os.SEEK_END)
+    finally:
+        source.seek(pos)
+
+
+def _layout_key(source) -> tuple:
+    """File signature for the layout cache: path, size and mtime, or size and a header hash."""
+    if _is_path(source):
+        st = os.stat(source)
+        return ("path", os.path.realpath(source), st.st_size, st.st_mtime_ns)
+    digest = hashlib.blake2b(_read_head(source, 1 << 16), digest_size=16).hexdigest()
+    return ("buffer", _source_size(source), digest)
+
+
+def _strain_fs(d: "h5py.Dataset") -> int:
+    # some files store dt or Xspacing; otherwise assume the common 4096 Hz release
+    for key in ("dt", "Xspacing", "dx"):
+        try:
+            dt = float(d.attrs[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if dt > 0:
+            return int(round(1.0 / dt))
+    return 4096
+
+
+def _discover_strain(f: "h5py.File") -> tuple:
+    """Every 1-D strain series in ``f`` (one per detector), preferred layouts first."""
+    found = []
+    f.visititems(
+        lambda name, obj: found.append(name)
+        if isinstance(obj, h5py.Dataset) and obj.ndim == 1 and "strain" in name.rsplit("/", 1)[-1].lower()
+        else None
+    )
+    rank = {k: i for i, k in enumerate(_STRAIN_CANDIDATES)}
+    found.sort(key=lambda k: rank.get(k, len(rank)))
+    fallback = None
+    if "meta/Detector" in f:  # single-detector GWOSC files name it here
+        try:
+            fallback = np.asarray(f["meta/Detector"][()]).item()
+            fallback = fallback.decode() if isinstance(fallback, bytes) else str(fallback)
+        except Exception:
+            fallback = None
+    series, labels = [], set()
+    for i, path in enumerate(found):
+        hit = _DETECTOR.search(path)
+        label = hit.group(1) if hit else (fallback if i == 0 and fallback else f"strain{i}" if i else "strain")
+        if label in labels:
+            continue
+        labels.add(label)
+        d = f[path]
+        series.append(StrainSeries(path, label, _strain_fs(d), int(d.shape[0])))
+    return tuple(series)
+
+
+def _strain_layout(source, f: "h5py.File") -> tuple:
+    """``_discover_strain`` cached per file signature, so the tree is walked once per file."""
+    key = _layout_key(source)
+    with _layouts_lock:
+        layout = _layouts.get(key)
+        if layout is not None:
+            _layouts.move_to_end(key)
+    if layout is None or any(s.path not in f for s in layout):
+        layout = _discover_strain(f)  # walked outside the lock; a racing thread finds the same layout
+        with _layouts_lock:
+            _layouts[key] = layout
+            while len(_layouts) > _LAYOUT_CACHE_SIZE:
+                _layouts.popitem(last=False)
+    return layout
+
+
+def _ligo_decimation(fs: int) -> int:
+    """Integer decimation factor from ``fs`` to ``RESAMPLE_LIGO_HZ`` (1 = read at the native rate)."""
+    target = int(settings.RESAMPLE_LIGO_HZ or 0)
+    if target <= 0 or target >= fs or fs % target:
+        return 1  # non-integer ratios are resampled later, in prepare_signal
+    return fs // target
+
+
+def _read_strain(d: "h5py.Dataset", i0: int, i1: int, q: int) -> np.ndarray:
+    """``d[i0:i1]`` as float32, decimated by ``q`` while reading block by block.
+
+    The output equals ``resample_poly(d[i0:i1], 1, q)`` with the same cached
+    anti-aliasing FIR, but only one block of full-rate samples is ever held.
+    """
+    if q == 1:
+        return _clean_signal(np.asarray(d[i0:i1], dtype=np.float32))  # h5py reads only this slice
+    h = resample_fir(1, q)
+    half = (h.size - 1) // 2  # a multiple of q for resample_fir designs
+    n = i1 - i0
+    out = np.empty(-(-n // q), dtype=np.float32)
+    step = max(1, int(settings.LIGO_READ_BLOCK_SAMPLES) // q)  # output samples per block
+    for m0 in range(0, out.size, step):
+        m1 = min(m0 + step, out.size)
+        # output m needs input [m*q - half, m*q + half]; zeros beyond the window, as resample_poly pads
+        lo, hi = m0 * q - half, (m1 - 1) * q + half + 1
+        seg = np.zeros(hi - lo)
+        a, b = max(lo, 0), min(hi, n)
+        seg[a - lo : b - lo] = _clean_signal(np.asarray(d[i0 + a : i0 + b], dtype=np.float64))
+        out[m0:m1] = signal.upfirdn(h, seg, 1, q)[2 * half // q :][: m1 - m0]
+    return out
+
+
+def load_ligo_hdf5(
+    source, multichannel: bool = False, start: float = 0.0, duration: float | None = None, name: str | None = None
+):
+    """Strain from the first detector, or every detector (H1, L1, ...) as rows with ``multichannel``.
+
+    With ``RESAMPLE_LIGO_HZ`` set to an integer divisor of the file's rate the
+    strain is decimated while it is read; ``meta["native_fs"]`` keeps the file rate.
+    """
+    with h5py.File(_open_source(source), "r") as f:  # h5py reads file objects directly
+        layout = _strain_layout(source, f)
+        if not layout:
             raise ValueError("Could not locate strain dataset in HDF5 (no 'strain/Strain').")
-        x = _clean_signal(np.asarray(d[:], dtype=np.float32))
-        # try sampling metadata; otherwise assume 4096 Hz common release
-        fs = 4096
-        try:
-            # some files store dt or Xspacing
-            dt = None
-            for key in ("dt", "Xspacing", "dx"):
-                if key in d.attrs:
-                    dt = float(d.attrs[key])
-                    break
-            if dt and dt > 0:
-                fs = int(round(1.0 / dt))
-        except Exception:
-            pass
-    return x, int(fs), {"type": "ligo", "name": os.path.basename(path)}
-
-def load_eeg_edf(path: str):
+        first = layout[0]
+        # detectors stack only when sampled like the first one
+        series = [s for s in layout if (s.fs, s.length) == (first.fs, first.length)] if multichannel else [first]
+        fs, total = first.fs, first.length
+        i0, i1 = _window(fs, total, start, duration)
+        q = _ligo_decimation(fs)
+        rows = [_read_strain(f[s.path], i0, i1, q) for s in series]
+    meta = _window_meta({"type": "ligo", "name": _source_name(source, name)}, fs, i0, i1, total)
+    if q > 1:
+        meta.update({"native_fs": fs, "total_samples": -(-total // q)})
+        fs //= q
+    if multichannel:
+        meta["channels"] = [s.label for s in series]
+        return np.vstack(rows), int(fs), meta
+    return rows[0], int(fs), meta
+
+def load_eeg_edf(
+    source, multichannel: bool = False, start: float = 0.0, duration: float | None = None, name: str | None = None
+):
+    # pyedflib and MNE open EDF files by path, so buffers are spooled to disk here
+    with _spooled(source, ".edf") as path:
+        return _read_edf(path, _source_name(source, name), multichannel, start, duration)
+
+
+def _read_edf(path: str, name: str, multichannel: bool, start: float, duration: float | None):
+    meta = {"type": "eeg", "name": name}
     if _HAS_PYEDFLIB:
         f = pyedflib.EdfReader(path)
         try:
             fs = int(f.getSampleFrequency(0))
-            x = _clean_signal(f.readSignal(0).astype(np.float32))
-            return x, fs, {"type": "eeg", "name": os.path.basename(path)}
+            lengths = f.getNSamples()
+            i0, i1 = _window(fs, int(lengths[0]), start, duration)
+            _window_meta(meta, fs, i0, i1, int(lengths[0]))
+            if not multichannel:
+                x = _clean_signal(f.readSignal(0, start=i0, n=i1 - i0).astype(np.float32))
+                return x, fs, meta
+            # channels recorded at another rate or length (annotations, aux) are skipped
+            labels = f.getSignalLabels()
+            keep = [
+                i
+                for i in range(f.signals_in_file)
+                if f.getSampleFrequency(i) == f.getSampleFrequency(0) and lengths[i] == lengths[0]
+            ]
+            x = _clean_signal(np.vstack([f.readSignal(i, start=i0, n=i1 - i0) for i in keep]).astype(np.float32))
+            meta["channels"] = [labels[i] for i in keep]
+            return x, fs, meta
         finally:
             f.close()
     if _HAS_MNE:
-        raw = mne.io.read_raw_edf(path, preload=True, verbose=False)
-        x = _clean_signal(raw.get_data(picks=[0]).squeeze().astype(np.float32))
-        fs = int(raw.info["sfreq"])
-        return x, fs, {"type": "eeg", "name": os.path.basename(path)}
+        # no preload: get_data reads just the requested span from disk
+        raw = mne.io.read_raw_edf(path, preload=False, verbose=False)
+        fs = int(raw.info["sfreq"])
+        i0, i1 = _window(fs, raw.n_times, start, duration)
+        _window_meta(meta, fs, i0, i1, raw.n_times)
+        if not multichannel:
+            x = _clean_signal(raw.get_data(picks=[0], start=i0, stop=i1).squeeze().astype(np.float32))
+            return x, fs, meta
+        x = _clean_signal(raw.get_data(start=i0, stop=i1).astype(np.float32))
+        meta["channels"] = list(raw.ch_names)
+        return x, fs, meta
     # explicit guidance
     raise ImportError("EEG EDF needs 'pyedflib' or 'mne'. On Windows+Py3.12, prefer MNE: pip install mne")
 
-def load_grace_nc(path: str):
+# xarray engines that accept file objects as well as paths
+_FILE_OBJECT_ENGINES = ("h5netcdf", "scipy")
+
+
+@lru_cache(maxsize=None)
+def _netcdf_engines(classic: bool) -> tuple:
+    """Installed xarray engines for NetCDF3 (``classic``) or NetCDF4/HDF5, best first."""
+    wanted = ("scipy", "netcdf4") if classic else ("h5netcdf", "netcdf4")
+    modules = {"scipy": "scipy", "netcdf4": "netCDF4", "h5netcdf": "h5netcdf"}
+    return tuple(eng for eng in wanted if has_module(modules[eng])) + (None,)  # None: xarray auto-detects
+
+
+_LAT_NAMES = ("lat", "latitude")
+_LON_NAMES = ("lon", "longitude")
+
+
+def _grace_bbox():
+    """``GRACE_BBOX`` as ``(lat_min, lat_max, lon_min, lon_max)``, or None when unset."""
+    text = (settings.GRACE_BBOX or "").strip()
+    if not text:
+        return None
+    try:
+        box = tuple(float(v) for v in text.split(","))
+    except ValueError:
+        box = ()
+    if len(box) != 4:
+        raise ValueError("GRACE_BBOX must be 'lat_min,lat_max,lon_min,lon_max'")
+    return box
+
+
+def _grace_subset(v, box):
+    """Restrict ``v`` to the bounding box; lon_min > lon_max wraps across the date line."""
+    lat = next((d for d in _LAT_NAMES if d in v.dims), None)
+    lon = next((d for d in _LON_NAMES if d in v.dims), None)
+    if lat is None or lon is None:
+        raise ValueError("GRACE_BBOX needs lat/lon dimensions")
+    lat_min, lat_max, lon_min, lon_max = box
+    lats = np.asarray(v[lat].values, dtype=float)
+    lons = np.asarray(v[lon].values, dtype=float)
+    if lons.max() > 180.0:  # 0..360 grid: express the box the same way
+        lon_min, lon_max = lon_min % 360.0, lon_max % 360.0
+    in_lon = (lons >= lon_min) & (lons <= lon_max) if lon_min <= lon_max else (lons >= lon_min) | (lons <= lon_max)
+    keep_lat = np.flatnonzero((lats >= lat_min) & (lats <= lat_max))
+    keep_lon = np.flatnonzero(in_lon)
+    if keep_lat.size == 0 or keep_lon.size == 0:
+        raise ValueError("GRACE_BBOX selects no grid cells")
+    return v.isel({lat: keep_lat, lon: keep_lon})  # still lazy: indices are applied per block read
+
+
+def _grace_weights(v) -> np.ndarray | None:
+    """cos(latitude) cell weights in ``transpose("time", ...)`` order, flattened (None = equal)."""
+    lat = next((d for d in _LAT_NAMES if d in v.dims), None)
+    if not settings.GRACE_AREA_WEIGHTED or lat is None:
+        return None
+    dims = [d for d in v.dims if d != "time"]
+    shape = [v.sizes[d] if d == lat else 1 for d in dims]
+    w = np.cos(np.deg2rad(np.asarray(v[lat].values, dtype=float))).clip(min=0.0).reshape(shape)
+    return np.broadcast_to(w, [v.sizes[d] for d in dims]).ravel()
+
+
+def _grace_spatial_mean(v, i0: int, i1: int) -> np.ndarray:
+    """Mean over every non-time axis for time steps ``[i0, i1)``, read in blocks.
+
+    Blocks hold ``GRACE_CHUNK_TIMESTEPS`` steps, so peak memory is one block, not
+    the cube. NaN cells (masked land/ocean) are skipped. With
+    ``GRACE_AREA_WEIGHTED`` cells are weighted by cos(latitude), and
+    ``GRACE_BBOX`` restricts the mean to a lat/lon box.
+    """
+    box = _grace_bbox()
+    if box is not None:
+        v = _grace_subset(v, box)
+    w = _grace_weights(v)
+    step = max(1, int(settings.GRACE_CHUNK_TIMESTEPS))
+    out = np.full(i1 - i0, np.nan)
+    for b0 in range(i0, i1, step):
+        b1 = min(b0 + step, i1)
+        # isel before .values: only this block of time steps is read
+        blk = np.asarray(v.isel(time=slice(b0, b1)).transpose("time", ...).values)
+        blk = blk.reshape(b1 - b0, -1)
+        valid = np.isfinite(blk)
+        if valid.all():  # common case: skip the masking copies
+            cells, valid = blk, None
+        else:
+            cells = np.where(valid, blk, 0.0)
+        if w is None:
+            total = cells.sum(axis=1, dtype=np.float64)
+            count = blk.shape[1] if valid is None else valid.sum(axis=1)
+        else:
+            total = cells @ w
+            count = w.sum() if valid is None else valid @ w
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[b0 - i0 : b1 - i0] = total / count  # all-NaN steps stay NaN, cleaned to 0 later
+    return out
+
+
+def _grace_from_dataset(ds, name: str, multichannel: bool, start: float, duration: float | None):
+    try:
+        var = next((k for k, da in ds.data_vars.items() if np.issubdtype(da.dtype, np.number)), None)
+        if var is None:
+            raise ValueError("No numeric data variables found in .nc file.")
+        v = ds[var]
+        fs = 1
+        if "time" in v.dims:
+            total = v.sizes["time"]
+            i0, i1 = _window(fs, total, start, duration)
+            arr = _grace_spatial_mean(v, i0, i1)
+        else:
+            arr = np.asarray(v.values).ravel()
+            total = arr.size
+            i0, i1 = _window(fs, total, start, duration)
+            arr = arr[i0:i1]
+        arr = _clean_signal(arr).astype(np.float32)
+        meta = _window_meta({"type": "grace", "name": name}, fs, i0, i1, total)
+        if multichannel:
+            arr = _single_channel(arr, meta, var)
+        return arr, int(fs), meta
+    finally:
+        ds.close()
+
+
+def load_grace_nc(
+    source, multichannel: bool = False, start: float = 0.0, duration: float | None = None, name: str | None = None
+):
     # Grace requires xarray with either h5netcdf or netCDF4 backend
     try:
         import xarray as xr
     except Exception as exc:
         raise ImportError("GRACE NetCDF needs 'xarray' (plus h5netcdf or netCDF4).") from exc
 
-    engines = []
-    try:
-        import h5netcdf  # noqa: F401
-        engines.append("h5netcdf")
-    except Exception:
-        pass
-    try:
-        import netCDF4  # noqa: F401
-        engines.append("netcdf4")
-    except Exception:
-        pass
-    engines.append(None)  # let xarray auto-detect as a fallback
+    name = _source_name(source, name)
+    # the signature says which engine can read the file, so normally only one is tried
+    engines = _netcdf_engines(_read_head(source, 4).startswith(b"CDF"))
+    if not _is_path(source) and not any(eng in _FILE_OBJECT_ENGINES for eng in engines):
+        # e.g. a netCDF4-only build: it needs a path
+        with _spooled(source, ".nc") as path:
+            return load_grace_nc(path, multichannel, start, duration, name=name)
 
     last_err = None
     for eng in engines:
+        if not _is_path(source) and eng not in _FILE_OBJECT_ENGINES:
+            continue
         try:
-            ds = xr.open_dataset(path, engine=eng) if eng else xr.open_dataset(path)
-            try:
-                var = next((k for k, da in ds.data_vars.items() if np.issubdtype(da.dtype, np.number)), None)
-                if var is None:
-                    raise ValueError("No numeric data variables found in .nc file.")
-                v = ds[var]
-                if "time" in v.dims:
-                    arr = np.asarray(v.transpose("time", ...).values)
-                    arr = arr.reshape(arr.shape[0], -1).mean(axis=1)
-                    fs = 1
-                else:
-                    arr = np.asarray(v.values).ravel()
-                    fs = 1
-                arr = _clean_signal(arr)
-                return arr.astype(np.float32), int(fs), {"type": "grace", "name": os.path.basename(path)}
-            finally:
-                ds.close()
+            ds = xr.open_dataset(_open_source(source), engine=eng) if eng else xr.open_dataset(source)
+            return _grace_from_dataset(ds, name, multichannel, start, duration)
         except Exception as err:
             last_err = err
             continue
     raise RuntimeError(f"Failed to parse GRACE NetCDF: {last_err}")
 
-# public dispatcher
-def load_by_domain(domain: str, path: str):
-    ext = os.path.splitext(path)[1].lower()
-    if domain == "audio":
-        if ext != ".wav":
-            raise ValueError("Audio domain expects .wav")
-        return load_audio_wav(path)
-    if domain == "ligo":
-        if ext not in (".hdf5", ".h5"):
-            raise ValueError("LIGO domain expects .hdf5/.h5")
-        return load_ligo_hdf5(path)
-    if domain == "eeg":
-        if ext != ".edf":
-            raise ValueError("EEG domain expects .edf")
-        return load_eeg_edf(path)
-    if domain == "ecg":
-        if not _HAS_WFDB:
-            raise ImportError("ECG requires 'wfdb' package. Install: pip install wfdb")
-        # Accept either .hea or .dat file path; wfdb resolves pair by basename
+def load_ecg_wfdb(
+    source, multichannel: bool = False, start: float = 0.0, duration: float | None = None, name: str | None = None
+):
+    if not _HAS_WFDB:
+        raise ImportError("ECG requires 'wfdb' package. Install: pip install wfdb")
+    # wfdb resolves the .hea/.dat pair by basename on disk, so buffers are spooled
+    name = _source_name(source, name)
+    with _spooled(source, os.path.splitext(name)[1]) as path:
         base, _ = os.path.splitext(path)
-        rec = wfdb.rdsamp(base)
-        sig = rec.p_signal if hasattr(rec, "p_signal") else rec.d_signal
-        if sig.ndim > 1:
-            sig = sig.mean(axis=1)
-        fs = float(getattr(rec, "fs", 250.0))
-        return sig.astype(np.float32), int(fs), {"type": "ecg", "name": os.path.basename(path)}
-    if domain == "grace":
-        if ext == ".nc":
-            return load_grace_nc(path)
-        raise ValueError("GRACE domain expects .nc")
-    raise ValueError("domain must be one of: audio|eeg|ligo|grace")
+        header = wfdb.rdheader(base)
+        fs = float(header.fs or 250.0)
+        total = int(header.sig_len or 0)
+        i0, i1 = _window(fs, total, start, duration)
+        rec = wfdb.rdrecord(base, sampfrom=i0, sampto=i1)
+    sig = rec.p_signal if rec.p_signal is not None else rec.d_signal
+    meta = _window_meta({"type": "ecg", "name": name}, fs, i0, i1, total)
+    if multichannel:
+        sig = np.ascontiguousarray(sig.T) if sig.ndim > 1 else sig[None, :]
+        meta["channels"] = list(rec.sig_name or [f"lead{i}" for i in range(sig.shape[0])])
+    elif sig.ndim > 1:
+        sig = sig.mean(axis=1)
+    return _clean_signal(sig.astype(np.float32)), int(fs), meta
+
+# --- format registry ---
+_HDF5_MAGIC = b"\x89HDF\r\n\x1a\n"
+_HEAD_BYTES = 2048 + len(_HDF5_MAGIC)
+
+
+@dataclass(frozen=True)
+class LoaderSpec:
+    """A file format: the domain it feeds, its loader and how to recognise it.
+
+    ``sniff(head, source)`` gets the first bytes of the file (and the source
+    itself, for checks that need more than the header); ``extensions`` are the
+    fallback when no signature matches.
+    """
+
+    fmt: str
+    domain: str
+    load: Callable
+    extensions: Tuple[str, ...] = ()
+    sniff: Optional[Callable[[bytes, object], bool]] = None
+
+
+_LOADERS: Dict[str, LoaderSpec] = {}
+
+
+def register_loader(spec: LoaderSpec) -> LoaderSpec:
+    """Add (or replace) a format. Signatures are checked in registration order."""
+    _LOADERS[spec.fmt] = spec
+    return spec
+
+
+def _is_hdf5(head: bytes) -> bool:
+    # the superblock sits at 0, or after a user block of 512 * 2**k bytes
+    return any(head[o : o + 8] == _HDF5_MAGIC for o in (0, 512, 1024, 2048))
+
+
+def _hdf5_is_netcdf(source) -> bool:
+    """NetCDF4 files are HDF5 too; they carry ``_NCProperties`` or dimension scales."""
+    try:
+        with h5py.File(_open_source(source), "r") as f:  # metadata only, no data is read
+            if "_NCProperties" in f.attrs:
+                return True
+            return any(
+                isinstance(obj, h5py.Dataset) and obj.attrs.get("CLASS") == b"DIMENSION_SCALE" for obj in f.values()
+            )
+    except Exception:
+        return False
+
+
+register_loader(
+    LoaderSpec("wav", "audio", load_audio_wav, (".wav",), lambda h, _: h[:4] in (b"RIFF", b"RF64") and h[8:12] == b"WAVE")
+)
+register_loader(
+    LoaderSpec(
+        "netcdf",
+        "grace",
+        load_grace_nc,
+        (".nc",),
+        lambda h, src: h[:3] == b"CDF" or (_is_hdf5(h) and _hdf5_is_netcdf(src)),
+    )
+)
+register_loader(LoaderSpec("hdf5", "ligo", load_ligo_hdf5, (".hdf5", ".h5"), lambda h, _: _is_hdf5(h)))
+register_loader(LoaderSpec("edf", "eeg", load_eeg_edf, (".edf",), lambda h, _: h[:8] == b"0       "))
+register_loader(LoaderSpec("wfdb", "ecg", load_ecg_wfdb, (".hea", ".dat")))  # text header: no signature
+
+
+def sniff_format(source, name: str | None = None) -> Optional[str]:
+    """Registered format of ``source`` from its signature, else its extension, else None.
+
+    With ``source=None`` only the extension of ``name`` is considered.
+    """
+    head = _read_head(source, _HEAD_BYTES) if source is not None else b""
+    for spec in _LOADERS.values():
+        if spec.sniff is not None and spec.sniff(head, source):
+            return spec.fmt
+    ext = os.path.splitext(_source_name(source, name))[1].lower()
+    return next((spec.fmt for spec in _LOADERS.values() if ext in spec.extensions), None)
+
+
+def detect_format(source=None, name: str | None = None) -> Optional[LoaderSpec]:
+    """Registered format of ``source`` (see ``sniff_format``), or None when unrecognised or unreadable.
+
+    Pass ``spec.fmt`` on to ``load_by_domain(fmt=...)`` so the file is not sniffed twice.
+    """
+    try:
+        fmt = sniff_format(source, name)
+    except OSError:
+        return None
+    return _LOADERS[fmt] if fmt else None
+
+
+def detect_domain(source=None, name: str | None = None) -> Optional[str]:
+    """Domain implied by the file's format, or None when it is not recognised."""
+    spec = detect_format(source, name)
+    return spec.domain if spec else None
+
+
+# public dispatcher
+def load_by_domain(
+    domain: str,
+    source,
+    multichannel: bool = False,
+    start: float = 0.0,
+    duration: float | None = None,
+    name: str | None = None,
+    fmt: str | None = None,
+):
+    """Load ``source`` as ``(signal, fs, meta)``.
+
+    ``source`` is a path, a bytes-like buffer or a seekable binary file object
+    (e.g. ``UploadFile.file``). WAV, HDF5 and NetCDF are read straight from
+    memory. EDF and wfdb are spooled to ``UPLOAD_DIR`` because their readers
+    need a path. The format is sniffed from the first bytes, falling back to
+    the extension of ``name`` (or of the path). The matching loader runs once,
+    even if ``domain`` names a different one; ``meta["type"]`` reports the
+    domain actually loaded. Callers that already sniffed the file (see
+    ``detect_format``) pass its ``fmt`` to skip sniffing it again.
+
+    With ``multichannel=True`` the signal is a ``(channels, samples)`` array
+    and ``meta["channels"]`` holds the channel labels; otherwise it is 1-D
+    (first EEG channel, mono-folded audio, lead-averaged ECG).
+
+    ``start``/``duration`` (seconds) read only that span; ``meta`` records the
+    span actually read and the file's total sample count.
+    """
+    domains = {spec.domain for spec in _LOADERS.values()}
+    if domain not in domains:
+        raise ValueError("domain must be one of: " + "|".join(sorted(domains)))
+    name = _source_name(source, name)
+    if fmt not in _LOADERS:
+        fmt = sniff_format(source, name)
+    if fmt is None:
+        if domain != "ecg":  # wfdb records are recognised by basename alone
+            expected = "/".join(e for spec in _LOADERS.values() if spec.domain == domain for e in spec.extensions)
+            raise ValueError(f"{domain} domain expects {expected}; could not recognise {name!r}")
+        fmt = "wfdb"
+    return _LOADERS[fmt].load(source, multichannel, start, duration, name)
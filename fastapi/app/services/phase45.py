@@ -1,21 +1,38 @@
 import json
-from typing import Dict
+import logging
+from typing import Any, Dict, List, Sequence, Tuple
 
 import numpy as np
 
 from ..core.config import settings
+from . import feature_cache
 from .loaders import load_by_domain
 from .features import (
+    aggregate_channels,
     collapse_proxy_time,
+    compute_channel_features,
     compute_features,
+    compute_features_batch,
     energy_drop_ratio,
 )
 
+logger = logging.getLogger(__name__)
 
-def run_phase45(domain: str, path: str) -> Dict[str, float]:
-    """Load a file, compute ψ-features, and return rich sample data."""
-    sig, fs, meta = load_by_domain(domain, path)
-    window, env, feat, vec = compute_features(domain, sig, fs)
+
+def feature_read_span() -> Dict[str, Any]:
+    """``start``/``duration`` loader arguments covering what ``compute_features`` uses.
+
+    ``first_window`` keeps at least 5 s, and the padding lets the zero-phase
+    filters settle before the end of the window. With ``WINDOWED_READS`` off,
+    whole files are read.
+    """
+    if not settings.WINDOWED_READS:
+        return {"start": 0.0, "duration": None}
+    window = max(float(settings.FEATURE_WINDOW_SEC), 5.0)
+    return {"start": 0.0, "duration": window + max(float(settings.FEATURE_READ_PAD_SEC), 0.0)}
+
+
+def _sample(domain: str, fs: float, meta: dict, window, env, feat: dict, vec) -> Dict[str, Any]:
     ct = collapse_proxy_time(env, fs)
     drop = energy_drop_ratio(env, fs, ct)
 
@@ -38,4 +55,88 @@ def run_phase45(domain: str, path: str) -> Dict[str, float]:
     }
 
 
-__all__ = ["run_phase45"]
+def _channel_sample(domain: str, sig: np.ndarray, fs: float, meta: dict) -> Dict[str, Any]:
+    """Sample for a ``(channels, samples)`` recording: per-channel rows plus their mean.
+
+    ``window``/``env`` (used for plots) are the first channel's.
+    """
+    window, env, feats, _ = compute_channel_features(domain, sig, fs)
+    labels = list(meta.get("channels") or [])
+    labels += [f"ch{i}" for i in range(len(labels), len(feats))]
+    channels = []
+    for label, e, feat in zip(labels, env, feats):
+        ct = collapse_proxy_time(e, fs)
+        drop = energy_drop_ratio(e, fs, ct)
+        channels.append({"channel": label, **feat, "ct_proxy": float(ct), "drop_ratio": float(drop)})
+    agg, vec = aggregate_channels(channels, fs)
+    name = meta.get("name", meta.get("filename", "file"))
+    agg.update({"name": name, "fs": float(fs), "n_channels": len(channels)})
+    return {
+        "name": name,
+        "domain": domain,
+        "fs": float(fs),
+        "features": agg,
+        "vector": vec,
+        "window": window[0],
+        "env": env[0],
+        "channels": channels,
+    }
+
+
+def run_phase45(domain: str, path: str, multichannel: bool = False, fmt: str | None = None) -> Dict[str, float]:
+    """Load a file, compute ψ-features, and return rich sample data.
+
+    Results are cached by file content (see ``feature_cache``); a hit skips
+    loading entirely. ``fmt`` is the file's format when the caller already
+    sniffed it (see ``loaders.detect_format``).
+    """
+    key = None
+    if settings.FEATURE_CACHE:
+        key = feature_cache.cache_key(feature_cache.source_digest(path), domain, multichannel)
+        cached = feature_cache.get(key, domain)
+        if cached is not None:
+            return cached
+    sig, fs, meta = load_by_domain(domain, path, multichannel=multichannel, fmt=fmt, **feature_read_span())
+    if np.ndim(sig) == 2:
+        sample = _channel_sample(domain, sig, fs, meta)
+    else:
+        window, env, feat, vec = compute_features(domain, sig, fs)
+        sample = _sample(domain, fs, meta, window, env, feat, vec)
+    if key is not None:
+        feature_cache.put(key, sample)
+    return sample
+
+
+def run_phase45_batch(domain: str, loaded: Sequence[Tuple[np.ndarray, float, dict]]) -> List[Any]:
+    """``run_phase45`` for already-loaded ``(sig, fs, meta)`` triples of one domain.
+
+    1-D signals share one ``compute_features_batch`` pass; ``(channels, samples)``
+    recordings are each processed as one block. If the batch fails, each signal
+    is retried on its own so one bad file cannot sink the rest; entries for
+    signals that still fail are the raised exception instead of a sample dict.
+    """
+    if not loaded:
+        return []
+    flat = [i for i, (sig, _, _) in enumerate(loaded) if np.ndim(sig) != 2]
+    feats: Dict[int, Any] = {}
+    if flat:
+        try:
+            batch = compute_features_batch(domain, [loaded[i][0] for i in flat], [loaded[i][1] for i in flat])
+            feats = dict(zip(flat, batch))
+        except Exception:
+            logger.warning("batched features failed for %d %s signals; retrying one by one", len(flat), domain)
+
+    out: List[Any] = []
+    for i, (sig, fs, meta) in enumerate(loaded):
+        try:
+            if np.ndim(sig) == 2:
+                out.append(_channel_sample(domain, sig, fs, meta))
+                continue
+            window, env, feat, vec = feats[i] if i in feats else compute_features(domain, sig, fs)
+            out.append(_sample(domain, fs, meta, window, env, feat, vec))
+        except Exception as exc:
+            out.append(exc)
+    return out
+
+
+__all__ = ["feature_read_span", "run_phase45", "run_phase45_batch"]
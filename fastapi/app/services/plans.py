@@ -0,0 +1,100 @@
+"""Inference plans for /predict and per-stage timing.
+
+A plan decides which stages of the analysis run:
+
+* ``fast``     – Kitab point estimate only: no RF blend, no intervals, no assets
+* ``standard`` – RF blend + Kitab with bootstrap intervals (early-stopped), no assets
+* ``full``     – everything, including the PNG/CSV/JSON asset bundle
+
+Callers pass an explicit ``mode`` or a ``latency_budget_ms`` that is mapped
+onto the richest plan expected to fit.
+"""
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List
+
+from ..core.config import settings
+
+
+@dataclass(frozen=True)
+class Plan:
+    name: str
+    blend: bool          # RF + Ridge blend (rf_ct)
+    bootstrap: bool      # Kitab bootstrap intervals (kitab_lo / kitab_hi)
+    bootstrap_tol: float
+    assets: bool         # plots + zip bundle
+    retrain: bool        # allow the per-request "source" alignment refit
+
+
+PLANS: Dict[str, Plan] = {
+    "fast": Plan("fast", blend=False, bootstrap=False, bootstrap_tol=0.0, assets=False, retrain=False),
+    "standard": Plan("standard", blend=True, bootstrap=True, bootstrap_tol=0.02, assets=False, retrain=False),
+    "full": Plan("full", blend=True, bootstrap=True, bootstrap_tol=0.0, assets=True, retrain=True),
+}
+
+
+def alignment_for(plan: Plan, requested: str | None = None) -> str:
+    """Alignment the plan runs: ``requested``, else ``ALIGNMENT_MODE``.
+
+    Only plans with ``retrain`` refit per request. An explicit ``source``
+    under any other plan raises ValueError; a configured default of
+    ``source`` runs as ``target`` there.
+    """
+    mode = requested or settings.ALIGNMENT_MODE
+    if mode == "source" and not plan.retrain:
+        if requested:
+            raise ValueError(f"source alignment requires plan=full (plan is {plan.name})")
+        return "target"
+    return mode
+
+
+def select_plan(mode: str | None = None, latency_budget_ms: float | None = None) -> Plan:
+    if mode:
+        try:
+            return PLANS[str(mode)]
+        except KeyError:
+            raise ValueError(f"unknown mode: {mode}") from None
+    if latency_budget_ms is not None:
+        if latency_budget_ms <= settings.PLAN_FAST_MAX_MS:
+            return PLANS["fast"]
+        if latency_budget_ms <= settings.PLAN_STANDARD_MAX_MS:
+            return PLANS["standard"]
+        return PLANS["full"]
+    return PLANS[settings.DEFAULT_PLAN]
+
+
+class StageTimer:
+    """Accumulates wall-clock milliseconds per named stage, in first-seen order."""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._ms: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._ms[name] = self._ms.get(name, 0.0) + (time.perf_counter() - t0) * 1e3
+
+    def add(self, name: str, ms: float) -> None:
+        self._ms[name] = self._ms.get(name, 0.0) + float(ms)
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self._ms)
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1e3
+
+    def stages(self) -> List[Dict[str, float]]:
+        return [{"stage": k, "ms": round(v, 3)} for k, v in self._ms.items()]
+
+    def server_timing(self) -> str:
+        """Value for an HTTP ``Server-Timing`` header."""
+        return ", ".join(f"{k};dur={v:.1f}" for k, v in self._ms.items())
+
+
+__all__ = ["Plan", "PLANS", "select_plan", "alignment_for", "StageTimer"]
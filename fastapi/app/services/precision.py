@@ -0,0 +1,22 @@
+"""Working precision of the signal pipeline (``settings.PRECISION``).
+
+``float64`` (default) keeps intermediates in double precision. ``float32``
+keeps loader output in single precision end to end: filtering, resampling,
+detrending, real FFTs (complex64) and the envelope. That halves the memory
+and bandwidth of long recordings.
+"""
+import numpy as np
+
+from ..core.config import settings
+
+
+def work_dtype() -> np.dtype:
+    return np.dtype(np.float32) if str(settings.PRECISION).lower() == "float32" else np.dtype(np.float64)
+
+
+def as_work(x) -> np.ndarray:
+    """``x`` as an array in the working precision (no copy when it already is)."""
+    return np.asarray(x, dtype=work_dtype())
+
+
+__all__ = ["as_work", "work_dtype"]
@@ -0,0 +1,263 @@
+"""Versioned on-disk registry for the trained Phase-45 model stack.
+
+Artifacts are produced offline with::
+
+    python -m app.services.registry train [--version V] [--dir DIR]
+
+Each version is stored as ``phase45-<version>.joblib`` next to a JSON
+manifest that records the SHA-256 of the artifact, so a truncated or
+mismatched file is rejected at load time instead of silently serving
+predictions from the wrong model.
+"""
+import argparse
+import gc
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.lazy import lazy_import
+from .alignment import CoralAligner
+from .surrogate import GridSurrogate
+from .training import train_models
+
+logger = logging.getLogger(__name__)
+
+joblib = lazy_import("joblib")
+sklearn = lazy_import("sklearn")
+
+_lock = threading.Lock()
+_bundle: Dict[str, Any] | None = None
+
+
+class RegistryError(RuntimeError):
+    """Raised when a model artifact is missing, corrupt or of the wrong version."""
+
+
+def _artifact_paths(directory: str, version: str):
+    base = Path(directory)
+    return base / f"phase45-{version}.joblib", base / f"phase45-{version}.json"
+
+
+def _surrogate_paths(directory: str, version: str, resolution: int):
+    base = Path(directory)
+    stem = f"phase45-{version}.lut-r{resolution}"
+    return base / f"{stem}.npy", base / f"{stem}.json"
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_bundle(version: str | None = None, seed: int = 42) -> Dict[str, Any]:
+    version = version or settings.MODEL_VERSION
+    started = time.perf_counter()
+    models = train_models(None, seed=seed)
+    models.update(
+        {
+            "version": version,
+            "seed": seed,
+            "train_seconds": round(time.perf_counter() - started, 3),
+        }
+    )
+    return models
+
+
+def save_bundle(bundle: Dict[str, Any], directory: str | None = None) -> Path:
+    directory = directory or settings.MODEL_DIR
+    version = bundle["version"]
+    os.makedirs(directory, exist_ok=True)
+    artifact, manifest = _artifact_paths(directory, version)
+
+    # write-then-rename so concurrent workers never observe a half-written file
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".joblib.tmp")
+    os.close(fd)
+    try:
+        joblib.dump(bundle, tmp)
+        os.chmod(tmp, 0o644)
+        digest = _sha256(Path(tmp))
+        os.replace(tmp, artifact)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+    meta = {
+        "version": version,
+        "sha256": digest,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "seed": bundle.get("seed"),
+        "train_seconds": bundle.get("train_seconds"),
+        "n_synthetic": int(len(bundle.get("X_syn", ()))),
+        "kitab": [float(v) for v in np.asarray(bundle["kit"]).ravel()],
+        "sklearn": sklearn.__version__,
+        "numpy": np.__version__,
+    }
+    tmp_manifest = manifest.with_suffix(".json.tmp")
+    with open(tmp_manifest, "w", encoding="utf-8") as fp:
+        json.dump(meta, fp, indent=2)
+    os.replace(tmp_manifest, manifest)
+    return artifact
+
+
+def load_bundle(directory: str | None = None, version: str | None = None) -> Dict[str, Any]:
+    directory = directory or settings.MODEL_DIR
+    version = version or settings.MODEL_VERSION
+    artifact, manifest = _artifact_paths(directory, version)
+    if not artifact.exists() or not manifest.exists():
+        raise RegistryError(f"No model artifact for version {version!r} in {directory}")
+    with open(manifest, "r", encoding="utf-8") as fp:
+        meta = json.load(fp)
+    digest = _sha256(artifact)
+    if meta.get("sha256") != digest:
+        raise RegistryError(f"Checksum mismatch for {artifact.name}")
+    # numpy payloads (synthetic reference set, aligner, linear coefficients) come
+    # back as read-only memmaps shared through the page cache; tree node arrays
+    # are copied by sklearn and are shared between workers only via preload()
+    bundle = joblib.load(artifact, mmap_mode="r" if settings.MODEL_MMAP else None)
+    if bundle.get("version") != version:
+        raise RegistryError(
+            f"Artifact {artifact.name} holds version {bundle.get('version')!r}, expected {version!r}"
+        )
+    bundle["manifest"] = meta
+    if bundle.get("aligner") is None and bundle.get("X_syn") is not None:
+        bundle["aligner"] = CoralAligner(bundle["X_syn"])
+    return bundle
+
+
+def save_surrogate(surrogate: GridSurrogate, version: str, directory: str | None = None) -> Path:
+    directory = directory or settings.MODEL_DIR
+    os.makedirs(directory, exist_ok=True)
+    table, manifest = _surrogate_paths(directory, version, surrogate.resolution)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".npy.tmp")
+    os.close(fd)
+    with open(tmp, "wb") as fp:
+        np.save(fp, surrogate.grid)
+    os.chmod(tmp, 0o644)
+    meta = dict(surrogate.report, version=version, sha256=_sha256(Path(tmp)))
+    os.replace(tmp, table)
+    tmp_manifest = manifest.with_suffix(".json.tmp")
+    with open(tmp_manifest, "w", encoding="utf-8") as fp:
+        json.dump(meta, fp, indent=2)
+    os.replace(tmp_manifest, manifest)
+    return table
+
+
+def load_surrogate(
+    directory: str | None = None, version: str | None = None, resolution: int | None = None
+) -> GridSurrogate:
+    directory = directory or settings.MODEL_DIR
+    version = version or settings.MODEL_VERSION
+    resolution = resolution or settings.SURROGATE_RESOLUTION
+    table, manifest = _surrogate_paths(directory, version, resolution)
+    if not table.exists() or not manifest.exists():
+        raise RegistryError(f"No r{resolution} surrogate for version {version!r} in {directory}")
+    with open(manifest, "r", encoding="utf-8") as fp:
+        meta = json.load(fp)
+    if meta.get("sha256") != _sha256(table):
+        raise RegistryError(f"Checksum mismatch for {table.name}")
+    grid = np.load(table, mmap_mode="r" if settings.MODEL_MMAP else None)
+    return GridSurrogate(grid, report=meta)
+
+
+def _attach_surrogate(bundle: Dict[str, Any]) -> None:
+    try:
+        bundle["surrogate"] = load_surrogate(version=bundle["version"])
+    except RegistryError as exc:
+        if not settings.MODEL_AUTOTRAIN:
+            raise
+        logger.warning("%s; distilling in-process", exc)
+        surrogate = GridSurrogate.distill(bundle, settings.SURROGATE_RESOLUTION)
+        try:
+            save_surrogate(surrogate, bundle["version"])
+        except OSError:
+            logger.exception("could not persist surrogate to %s", settings.MODEL_DIR)
+        bundle["surrogate"] = surrogate
+    logger.info("surrogate ready: %s", bundle["surrogate"].report)
+
+
+def get_models() -> Dict[str, Any]:
+    """Return the process-wide model bundle, loading (or, if allowed, training) it once."""
+    global _bundle
+    if _bundle is not None:
+        return _bundle
+    with _lock:
+        if _bundle is not None:
+            return _bundle
+        try:
+            _bundle = load_bundle()
+        except RegistryError as exc:
+            if not settings.MODEL_AUTOTRAIN:
+                raise
+            logger.warning("%s; training model version %s in-process", exc, settings.MODEL_VERSION)
+            bundle = build_bundle()
+            try:
+                save_bundle(bundle)
+            except OSError:
+                logger.exception("could not persist model artifact to %s", settings.MODEL_DIR)
+            _bundle = bundle
+        if settings.USE_SURROGATE:
+            _attach_surrogate(_bundle)
+        logger.info("model bundle %s ready", _bundle["version"])
+        return _bundle
+
+
+def preload() -> Dict[str, Any]:
+    """Load models in a pre-fork master so workers inherit them copy-on-write.
+
+    ``gc.freeze`` moves everything allocated so far into the permanent
+    generation, so the cyclic collector in each worker never writes to (and
+    thereby un-shares) the pages holding the model objects.
+    """
+    bundle = get_models()
+    gc.collect()
+    gc.freeze()
+    return bundle
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.services.registry")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    train = sub.add_parser("train", help="train and persist a model version")
+    train.add_argument("--version", default=settings.MODEL_VERSION)
+    train.add_argument("--dir", default=settings.MODEL_DIR)
+    train.add_argument("--seed", type=int, default=42)
+    train.add_argument(
+        "--surrogate-resolution", type=int, default=0,
+        help="also distill a lookup-table surrogate with this many points per axis",
+    )
+    verify = sub.add_parser("verify", help="check an artifact's checksum and version")
+    verify.add_argument("--version", default=settings.MODEL_VERSION)
+    verify.add_argument("--dir", default=settings.MODEL_DIR)
+    args = parser.parse_args(argv)
+
+    if args.cmd == "train":
+        bundle = build_bundle(args.version, seed=args.seed)
+        path = save_bundle(bundle, args.dir)
+        print(f"saved {path} ({bundle['train_seconds']}s)")
+        if args.surrogate_resolution:
+            surrogate = GridSurrogate.distill(bundle, args.surrogate_resolution)
+            table = save_surrogate(surrogate, bundle["version"], args.dir)
+            print(f"saved {table}: {json.dumps(surrogate.report)}")
+        return 0
+    bundle = load_bundle(args.dir, args.version)
+    print(json.dumps(bundle["manifest"], indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
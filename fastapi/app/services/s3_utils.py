@@ -3,21 +3,19 @@ import re
 import tempfile
 from typing import Tuple
 
-try:
-    import boto3
-    from botocore.client import Config
-except ImportError:  # pragma: no cover - boto3 optional
-    boto3 = None
-    Config = None
-
 from ..core.config import settings
+from ..core.lazy import has_module, lazy_import
+
+# boto3 is optional and slow to import; it loads on the first S3 call
+boto3 = lazy_import("boto3") if has_module("boto3") else None
+botocore_client = lazy_import("botocore.client") if has_module("botocore") else None
 
 
 def _client():
-    if boto3 is None or Config is None:
+    if boto3 is None or botocore_client is None:
         raise RuntimeError("boto3 is not installed")
     region = settings.AWS_REGION or None
-    return boto3.client("s3", region_name=region, config=Config(signature_version="s3v4"))
+    return boto3.client("s3", region_name=region, config=botocore_client.Config(signature_version="s3v4"))
 
 
 def _sanitize(name: str) -> str:
@@ -0,0 +1,79 @@
+"""O(n) moving averages for the ψ envelope.
+
+``moving_average`` has the same edge handling as
+``np.convolve(x, np.ones(win) / win, mode="same")`` with an odd window: the
+signal is treated as zero outside its support. It is computed from one
+cumulative sum, so the cost no longer grows with the window length.
+``StreamingMovingAverage`` produces the same output chunk by chunk, so the
+whole signal never has to be in memory.
+"""
+import numpy as np
+
+from .precision import as_work
+
+
+def _check_window(win: int) -> int:
+    win = int(win)
+    if win < 1 or win % 2 == 0:
+        raise ValueError("moving-average window must be a positive odd integer")
+    return win
+
+
+def _window_means(buf: np.ndarray, win: int) -> np.ndarray:
+    """Means of every complete length-``win`` window along the last axis."""
+    if buf.shape[-1] < win:
+        return buf[..., :0]
+    # always accumulate in float64: a float32 running sum drifts by ~n·eps
+    c = np.cumsum(buf, axis=-1, dtype=np.float64)
+    c = np.concatenate([np.zeros(c.shape[:-1] + (1,)), c], axis=-1)
+    return ((c[..., win:] - c[..., :-win]) / win).astype(buf.dtype, copy=False)
+
+
+def moving_average(x: np.ndarray, win: int) -> np.ndarray:
+    """Centred box average along the last axis, zero beyond both ends ("same" mode)."""
+    win = _check_window(win)
+    x = as_work(x)
+    if x.shape[-1] < win:
+        # np.convolve's "same" output is max(n, win) long here; keep that quirk
+        kernel = np.ones(win) / win
+        if x.ndim == 1:
+            return np.convolve(x, kernel, mode="same")
+        return np.stack([np.convolve(row, kernel, mode="same") for row in x.reshape(-1, x.shape[-1])]).reshape(
+            x.shape[:-1] + (-1,)
+        )
+    h = win // 2
+    padded = np.pad(x, [(0, 0)] * (x.ndim - 1) + [(h, h)])
+    return _window_means(padded, win)
+
+
+class StreamingMovingAverage:
+    """Chunked ``moving_average`` along the last axis.
+
+    ``push`` returns every output sample whose window is complete, so output
+    trails input by ``win // 2`` samples. ``flush`` returns the rest. The
+    concatenated outputs equal ``moving_average`` of the concatenated input
+    whenever the total length is at least ``win``.
+    """
+
+    def __init__(self, win: int):
+        self.win = _check_window(win)
+        self._carry: np.ndarray | None = None  # last win-1 samples of the zero-padded stream
+
+    def push(self, chunk: np.ndarray) -> np.ndarray:
+        chunk = as_work(chunk)
+        if self._carry is None:
+            self._carry = np.zeros(chunk.shape[:-1] + (self.win // 2,), dtype=chunk.dtype)
+        buf = np.concatenate([self._carry, chunk], axis=-1)
+        out = _window_means(buf, self.win)
+        self._carry = buf[..., out.shape[-1] :]
+        return out
+
+    def flush(self) -> np.ndarray:
+        if self._carry is None:
+            return np.zeros(0)
+        out = self.push(np.zeros(self._carry.shape[:-1] + (self.win // 2,), dtype=self._carry.dtype))
+        self._carry = None
+        return out
+
+
+__all__ = ["moving_average", "StreamingMovingAverage"]
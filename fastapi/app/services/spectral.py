@@ -0,0 +1,125 @@
+"""Shared spectral kernel for the ψ-features.
+
+One windowed ``rfft`` per signal gives the dominant frequency, centroid and
+bandwidth. Hann windows, frequency grids and Hilbert multipliers are cached per
+length. Spectra are zero-padded to ``scipy.fft.next_fast_len`` so that prime or
+awkward window lengths stay on the fast FFT path. Large blocks, such as long
+LIGO windows, use ``scipy.fft`` worker threads.
+"""
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.lazy import lazy_import
+from .precision import as_work
+
+sp_fft = lazy_import("scipy.fft")
+windows = lazy_import("scipy.signal.windows")
+
+
+def _frozen(a: np.ndarray) -> np.ndarray:
+    a.setflags(write=False)  # cached arrays are shared between calls
+    return a
+
+
+@lru_cache(maxsize=64)
+def hann(n: int, dtype: np.dtype = np.dtype(np.float64)) -> np.ndarray:
+    return _frozen(windows.hann(n).astype(dtype))
+
+
+@lru_cache(maxsize=64)
+def rfft_grid(n_fft: int, fs: float, dtype: np.dtype = np.dtype(np.float64)) -> np.ndarray:
+    return _frozen(sp_fft.rfftfreq(n_fft, 1 / fs).astype(dtype))
+
+
+@lru_cache(maxsize=64)
+def _hilbert_multiplier(n: int, dtype: np.dtype) -> np.ndarray:
+    h = np.zeros(n, dtype=dtype)
+    if n % 2 == 0:
+        h[0] = h[n // 2] = 1
+        h[1 : n // 2] = 2
+    else:
+        h[0] = 1
+        h[1 : (n + 1) // 2] = 2
+    return _frozen(h)
+
+
+def fft_workers(size: int) -> int:
+    """scipy.fft ``workers`` for a transform over ``size`` samples in total."""
+    return int(settings.FFT_WORKERS) if size >= settings.FFT_PARALLEL_MIN_SAMPLES else 1
+
+
+def detrend(x: np.ndarray) -> np.ndarray:
+    """Least-squares linear detrend along the last axis; each row is independent."""
+    x = as_work(x)
+    n = x.shape[-1]
+    t = np.arange(n, dtype=x.dtype) - x.dtype.type((n - 1) / 2.0)
+    xc = x - np.mean(x, axis=-1, keepdims=True)
+    denom = np.sum(t * t)
+    if denom <= 0:
+        return xc
+    slope = np.sum(xc * t, axis=-1, keepdims=True) / denom
+    return xc - slope * t
+
+
+def spectrum(sig: np.ndarray, fs: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Magnitude spectrum of the detrended, Hann-windowed rows and its frequency grid.
+
+    The transform is zero-padded to the next fast length, which only refines
+    the frequency grid.
+    """
+    s = detrend(sig)
+    n = s.shape[-1]
+    n_fft = sp_fft.next_fast_len(n, real=True)
+    Y = np.abs(sp_fft.rfft(s * hann(n, s.dtype), n=n_fft, axis=-1, workers=fft_workers(s.size)))
+    return Y, rfft_grid(n_fft, float(fs), s.dtype)
+
+
+def dominant_freq(Y: np.ndarray, F: np.ndarray) -> np.ndarray:
+    """Per-row frequency of the spectral peak, ignoring the two lowest bins."""
+    if len(F) < 3:
+        return np.zeros(Y.shape[0])
+    return F[np.argmax(Y[:, 2:], axis=-1) + 2]
+
+
+def centroid_bw(Y: np.ndarray, F: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    S = Y + 1e-12
+    total = np.sum(S, axis=-1)
+    cen = np.sum(F * S, axis=-1) / total
+    bw = np.sqrt(np.sum(((F - cen[:, None]) ** 2) * S, axis=-1) / total)
+    return cen, bw
+
+
+def spectral_stats(sig: np.ndarray, fs: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Dominant frequency, centroid and bandwidth for every row of ``sig``."""
+    Y, F = spectrum(sig, fs)
+    cen, bw = centroid_bw(Y, F)
+    return dominant_freq(Y, F), cen, bw
+
+
+def analytic_envelope(sig: np.ndarray) -> np.ndarray:
+    """``|hilbert(sig)|`` along the last axis.
+
+    This is the same construction as ``scipy.signal.hilbert``, with a cached
+    multiplier and threaded transforms. It is not padded, because padding
+    would change the analytic signal near the edges.
+    """
+    n = sig.shape[-1]
+    workers = fft_workers(np.size(sig))
+    Xf = sp_fft.fft(sig, n, axis=-1, workers=workers)
+    return np.abs(sp_fft.ifft(Xf * _hilbert_multiplier(n, Xf.real.dtype), axis=-1, workers=workers))
+
+
+__all__ = [
+    "analytic_envelope",
+    "centroid_bw",
+    "detrend",
+    "dominant_freq",
+    "fft_workers",
+    "hann",
+    "rfft_grid",
+    "spectral_stats",
+    "spectrum",
+]
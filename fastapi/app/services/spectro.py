@@ -1,7 +1,10 @@
 import numpy as np
-from scipy.signal import spectrogram
+
+from ..core.lazy import lazy_import
+
+signal = lazy_import("scipy.signal")
 
 def spectro_db(sig: np.ndarray, fs: float):
-    f, t, Sxx = spectrogram(sig, fs=fs, nperseg=max(64,int(fs//4)), noverlap=None)
+    f, t, Sxx = signal.spectrogram(sig, fs=fs, nperseg=max(64,int(fs//4)), noverlap=None)
     Sxx = 10*np.log10(Sxx + 1e-12)
     return t.astype(float).tolist(), f.astype(float).tolist(), Sxx.astype(float).tolist()
@@ -0,0 +1,87 @@
+"""Dense lookup-table surrogate for the RF+Ridge blend.
+
+``features._to_vec`` clips every feature to a fixed box (gamma ≤ 3,
+energy/noise/centroid ≤ 1, lam ≤ 2), so ``0.8*rf + 0.2*lr`` can be sampled
+once on a regular grid over that box and served by multilinear
+interpolation. The grid is one contiguous float32 array
+(``resolution ** 5`` cells, ~230 KB at 9 points per axis).
+"""
+import itertools
+from typing import Any, Dict
+
+import numpy as np
+
+BOUNDS = np.array([[0.0, 3.0], [0.0, 1.0], [0.0, 1.0], [0.0, 1.0], [0.0, 2.0]])
+_CORNERS = np.array(list(itertools.product((0, 1), repeat=BOUNDS.shape[0])), dtype=np.intp)
+
+
+def blend_predict(model: Dict[str, Any], X: np.ndarray) -> np.ndarray:
+    """The full-model prediction the surrogate stands in for."""
+    return 0.8 * model["rf"].predict(X) + 0.2 * model["lr"].predict(X)
+
+
+class GridSurrogate:
+    def __init__(self, grid: np.ndarray, bounds: np.ndarray = BOUNDS, report: Dict[str, Any] | None = None):
+        if grid.ndim != bounds.shape[0] or len(set(grid.shape)) != 1:
+            raise ValueError("grid must be a hypercube matching the feature bounds")
+        self.grid = grid
+        self.lo = np.asarray(bounds[:, 0], dtype=float)
+        self.hi = np.asarray(bounds[:, 1], dtype=float)
+        self.resolution = grid.shape[0]
+        self._strides = np.array(
+            [self.resolution ** (grid.ndim - 1 - k) for k in range(grid.ndim)], dtype=np.intp
+        )
+        self.report = dict(report or {})
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.grid.nbytes)
+
+    @classmethod
+    def distill(
+        cls,
+        model: Dict[str, Any],
+        resolution: int = 9,
+        n_check: int = 20000,
+        seed: int = 0,
+        chunk: int = 65536,
+    ) -> "GridSurrogate":
+        axes = [np.linspace(lo, hi, resolution) for lo, hi in BOUNDS]
+        mesh = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, len(axes))
+        values = np.concatenate(
+            [blend_predict(model, mesh[i : i + chunk]) for i in range(0, len(mesh), chunk)]
+        )
+        grid = np.ascontiguousarray(values.reshape((resolution,) * len(axes)), dtype=np.float32)
+        surrogate = cls(grid)
+        surrogate.report = surrogate.error_report(model, n_check=n_check, seed=seed)
+        return surrogate
+
+    def error_report(self, model: Dict[str, Any], n_check: int = 20000, seed: int = 0) -> Dict[str, Any]:
+        """Max/mean/p99 absolute error against the full model on random in-box points."""
+        rng = np.random.default_rng(seed)
+        X = rng.uniform(self.lo, self.hi, (n_check, len(self.lo)))
+        if model.get("X_syn") is not None:
+            X = np.vstack([X, np.clip(model["X_syn"], self.lo, self.hi)])
+        err = np.abs(self.predict(X) - blend_predict(model, X))
+        return {
+            "resolution": int(self.resolution),
+            "bytes": self.nbytes,
+            "n_check": int(len(X)),
+            "max_abs_error": float(err.max()),
+            "p99_abs_error": float(np.percentile(err, 99)),
+            "mean_abs_error": float(err.mean()),
+        }
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Multilinear interpolation; rows outside the box are clamped to its faces."""
+        X = np.atleast_2d(np.asarray(X, dtype=float))
+        r = self.resolution
+        u = (np.clip(X, self.lo, self.hi) - self.lo) / (self.hi - self.lo) * (r - 1)
+        base = np.minimum(np.floor(u).astype(np.intp), r - 2)
+        frac = u - base
+        flat = (base @ self._strides)[:, None] + _CORNERS @ self._strides
+        weights = np.prod(np.where(_CORNERS[None], frac[:, None], 1.0 - frac[:, None]), axis=2)
+        return np.einsum("mc,mc->m", self.grid.reshape(-1)[flat], weights)
+
+
+__all__ = ["BOUNDS", "GridSurrogate", "blend_predict"]
@@ -0,0 +1,136 @@
+"""Sliding-window analysis of whole recordings.
+
+The recording is walked in ``window_sec`` windows every ``hop_sec``. Windows
+are grouped into spans of ``TIMELINE_CHUNK_WINDOWS``. Each span is read
+lazily through the loaders, with ``FEATURE_READ_PAD_SEC`` on both sides so the
+zero-phase filters settle. The span is conditioned once, and its windows go
+through the batched feature block together, sharing cached filter designs,
+Hann windows and FFT plans. Spans are independent, so they run on the domain
+process pool with a bounded number in flight. Memory stays at about one span
+per worker, whatever the recording length.
+"""
+import logging
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from ..core.config import settings
+from . import executors
+from .features import collapse_proxy_time, energy_drop_ratio, prepare_signal, window_features
+from .loaders import load_by_domain
+
+logger = logging.getLogger(__name__)
+
+
+def probe(domain: str, path: str) -> Tuple[float, int, dict]:
+    """Sample rate, total sample count and metadata, reading only the first second."""
+    _, fs, meta = load_by_domain(domain, path, start=0.0, duration=1.0)
+    return float(fs), int(meta.get("total_samples", 0)), meta
+
+
+def window_starts(total_sec: float, window_sec: float, hop_sec: float) -> np.ndarray:
+    """Start times of every full window; a recording shorter than one window gives one."""
+    if total_sec <= window_sec:
+        return np.zeros(1)
+    return np.arange(int(np.floor((total_sec - window_sec) / hop_sec + 1e-9)) + 1) * hop_sec
+
+
+def span_rows(domain: str, path: str, starts: Sequence[float], window_sec: float, pad_sec: float) -> List[Dict[str, Any]]:
+    """Feature rows for windows starting at ``starts``, read as one padded span."""
+    lo = max(0.0, float(starts[0]) - pad_sec)
+    sig, fs_raw, meta = load_by_domain(domain, path, start=lo, duration=float(starts[-1]) + window_sec + pad_sec - lo)
+    span_start = float(meta.get("start", lo))
+    sig, fs = prepare_signal(domain, sig, fs_raw)
+    n_win = max(1, int(round(window_sec * fs)))
+    windows = [sig[int(round((s - span_start) * fs)) :][:n_win] for s in starts]
+
+    rows = []
+    for s, window, (env, feat, vec) in zip(starts, windows, window_features(windows, fs)):
+        ct = collapse_proxy_time(env, fs)
+        rows.append(
+            {
+                "start": float(s),
+                "end": float(s) + window.size / fs,
+                **feat,
+                "ct_proxy": float(ct),
+                "ct_time": float(s) + float(ct),
+                "drop_ratio": float(energy_drop_ratio(env, fs, ct)),
+                "vector": [float(v) for v in vec],
+            }
+        )
+    return rows
+
+
+def plan(domain: str, path: str, window_sec: float | None = None, hop_sec: float | None = None) -> Dict[str, Any]:
+    """Validate the request and lay out the windows (raises ValueError)."""
+    window_sec = float(window_sec or settings.TIMELINE_WINDOW_SEC)
+    hop_sec = float(hop_sec or settings.TIMELINE_HOP_SEC)
+    if window_sec <= 0 or hop_sec <= 0:
+        raise ValueError("window_sec and hop_sec must be positive")
+    fs, total, meta = probe(domain, path)
+    if fs <= 0:
+        raise ValueError("recording has no sample rate")
+    starts = window_starts(total / fs, window_sec, hop_sec)
+    if len(starts) > settings.TIMELINE_MAX_WINDOWS:
+        raise ValueError(f"{len(starts)} windows exceeds TIMELINE_MAX_WINDOWS={settings.TIMELINE_MAX_WINDOWS}")
+    return {
+        "name": meta.get("name"),
+        "domain": domain,
+        "fs": fs,
+        "total_sec": total / fs,
+        "window_sec": window_sec,
+        "hop_sec": hop_sec,
+        "windows": int(len(starts)),
+        "starts": starts,
+    }
+
+
+def iter_timeline(domain: str, path: str, layout: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield the header, one row per window in time order, then a ``done`` record."""
+    starts = layout["starts"]
+    yield {k: v for k, v in layout.items() if k != "starts"}
+    step = max(1, int(settings.TIMELINE_CHUNK_WINDOWS))
+    spans = [starts[i : i + step].tolist() for i in range(0, len(starts), step)]
+    args = (layout["window_sec"], max(float(settings.FEATURE_READ_PAD_SEC), 0.0))
+
+    index = 0
+    pool = executors.domain_pool() if len(spans) > 1 else None
+    pending: deque = deque()
+    todo = iter(spans)
+    try:
+        while True:
+            if pool is not None:
+                # keep a couple of spans per worker in flight; results stay in order
+                while len(pending) < 2 * executors.domain_pool_size():
+                    span = next(todo, None)
+                    if span is None:
+                        break
+                    pending.append(pool.submit(span_rows, domain, path, span, *args))
+                if not pending:
+                    break
+                rows = pending.popleft().result()
+            else:
+                span = next(todo, None)
+                if span is None:
+                    break
+                rows = span_rows(domain, path, span, *args)
+            for row in rows:
+                yield {"index": index, **row}
+                index += 1
+    except BrokenProcessPool:
+        logger.exception("timeline pool failed; finishing serially")
+        executors.reset_domain_pool()
+        # spans complete whole, so the rows already sent end on a span boundary
+        for span in spans[index // step :]:
+            for row in span_rows(domain, path, span, *args):
+                yield {"index": index, **row}
+                index += 1
+    finally:
+        for fut in pending:
+            fut.cancel()
+    yield {"done": True, "windows": index}
+
+
+__all__ = ["iter_timeline", "plan", "probe", "span_rows", "window_starts"]
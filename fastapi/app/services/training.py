@@ -0,0 +1,109 @@
+import json
+from typing import Dict, Any
+
+import numpy as np
+
+from ..core.config import settings
+from ..core.lazy import lazy_import
+from .alignment import CoralAligner, coral
+
+optimize = lazy_import("scipy.optimize")
+ensemble = lazy_import("sklearn.ensemble")
+linear_model = lazy_import("sklearn.linear_model")
+
+_KITAB_KEYS = ("A", "alpha", "B", "C", "D", "E", "F")
+_KITAB_P0 = np.array([2.1, 1.48, 0.8, -1.2, 0.5, 0.02, 8.15], dtype=float)
+
+
+def synthetic_data(n: int = 1500, seed: int | None = 42):
+    rng = np.random.default_rng(seed)
+    g = rng.uniform(0, 3, n)
+    A0 = rng.random(n)
+    nse = rng.random(n)
+    b = rng.random(n)
+    lam = rng.uniform(0, 2, n)
+    X = np.vstack([g, A0, nse, b, lam]).T
+    y = (
+        2.1 * np.exp(-1.48 * g)
+        + 0.80 * A0
+        - 1.21 * nse
+        + 0.50 * b
+        + 0.026 * lam
+        + 8.15
+        + rng.normal(0, 0.04, n)
+    )
+    return X, y
+
+
+def load_kitab_params(path: str | None = None) -> np.ndarray:
+    """Read the published Kitab coefficients (MODEL_PARAMS_FILE); fall back to the built-in guess."""
+    path = path or settings.MODEL_PARAMS_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as fp:
+            raw = json.load(fp)
+        return np.array([float(raw[k]) for k in _KITAB_KEYS], dtype=float)
+    except (OSError, ValueError, KeyError, TypeError):
+        return _KITAB_P0.copy()
+
+
+def kitab_eval(params, X):
+    X = np.atleast_2d(X)
+    g, A0, n, b, lam = X.T
+    A, alpha, B, C, D, E, F = params
+    return A * np.exp(-alpha * g) + B * A0 + C * n + D * b + E * lam + F
+
+
+def fit_kitab(X: np.ndarray, y: np.ndarray, p0: np.ndarray | None = None):
+    def model(_, A, alpha, B, C, D, E, F):
+        return kitab_eval((A, alpha, B, C, D, E, F), X)
+
+    if p0 is None:
+        p0 = load_kitab_params()
+    try:
+        popt, _ = optimize.curve_fit(model, np.zeros(len(X)), y, p0=p0, maxfev=12000)
+        return popt
+    except Exception:
+        return np.asarray(p0, dtype=float)
+
+
+def train_models(
+    X_real: np.ndarray | None = None,
+    n_synthetic: int = 1500,
+    seed: int | None = 42,
+    aligner: CoralAligner | None = None,
+    n_jobs: int = -1,
+) -> Dict[str, Any]:
+    """Fit the RF/Ridge/Kitab stack on synthetic data (optionally CORAL-aligned to ``X_real``).
+
+    Passing the cached ``aligner`` of a previous bundle skips recomputing the
+    source statistics; it must have been built from the same synthetic draw.
+    """
+    Xs, ys = synthetic_data(n_synthetic, seed=seed)
+    source_aligner = aligner if aligner is not None else CoralAligner(Xs)
+    if X_real is not None and len(X_real):
+        Xs = coral(Xs, X_real, source_aligner)
+    rf = ensemble.RandomForestRegressor(
+        n_estimators=700, max_depth=18, random_state=42, n_jobs=n_jobs
+    )
+    rf.fit(Xs, ys)
+    rf_syn = rf.predict(Xs)
+    lr = linear_model.Ridge(alpha=0.1)
+    lr.fit(Xs, rf_syn)
+    kit = fit_kitab(Xs, rf_syn)
+    return {
+        "rf": rf,
+        "lr": lr,
+        "kit": kit,
+        "X_syn": Xs,
+        "y_syn": ys,
+        "aligner": source_aligner,
+    }
+
+
+__all__ = [
+    "synthetic_data",
+    "load_kitab_params",
+    "kitab_eval",
+    "fit_kitab",
+    "train_models",
+]
@@ -0,0 +1,72 @@
+"""Collapse / half-width detectors: cumulative-sum versions vs the original loops.
+
+Envelopes are 30 s at 4096 Hz (~123k samples, hold ~614). The adversarial ones
+dip below the collapse threshold constantly but never long enough to count,
+which made the old per-index ``np.all`` scan O(n·hold).
+
+Run from the fastapi/ directory:  python -m benchmarks.bench_detectors
+"""
+import timeit
+
+import numpy as np
+
+from app.services.features import collapse_proxy_time, gamma_proxy
+
+FS = 4096.0
+N = int(30 * FS)
+
+
+def legacy_collapse(env, fs, pk_pad_sec=0.05, thr=0.12, min_hold_sec=0.15):
+    n = len(env)
+    pk = int(np.argmax(env))
+    start = min(n - 1, pk + int(pk_pad_sec * fs))
+    tail = env[start:]
+    hold = max(1, int(min_hold_sec * fs))
+    for j in np.where(tail <= thr)[0]:
+        hi = min(len(tail), j + hold)
+        if np.all(tail[j:hi] <= thr):
+            return (start + j) / fs
+    return None  # the exponential-fit fallback is shared and not timed here
+
+
+def legacy_gamma(env, fs):
+    pk = int(np.argmax(env))
+    if pk <= 1 or pk >= len(env) - 2:
+        return 0.1
+    half = env[pk] / 2.0
+    left = np.where(env[:pk] <= half)[0]
+    right = np.where(env[pk:] <= half)[0]
+    if left.size == 0 or right.size == 0:
+        return 0.1
+    return float(1.0 / ((pk - left[-1] + right[0]) / fs + 1e-3))
+
+
+def envelopes():
+    rng = np.random.default_rng(0)
+    t = np.arange(N) / FS
+    flicker = np.where(np.arange(N) % 400 < 399, 0.05, 0.5)  # one spike every 400 samples
+    flicker[100:200] = 1.0
+    yield "flicker-below-thr", flicker
+    noisy = np.clip(0.12 + 0.02 * rng.standard_normal(N), 0, None)
+    noisy[50] = 1.0
+    yield "noise-around-thr", noisy
+    decay = np.exp(-np.abs(t - 2.0) / 3.0) + 0.01 * rng.standard_normal(N)
+    yield "clean-decay", np.abs(decay)
+
+
+def main():
+    for name, env in envelopes():
+        old = min(timeit.repeat(lambda: legacy_collapse(env, FS), number=1, repeat=3))
+        new = min(timeit.repeat(lambda: collapse_proxy_time(env, FS), number=1, repeat=3))
+        same = legacy_collapse(env, FS) in (None, collapse_proxy_time(env, FS))
+        same &= legacy_gamma(env, FS) == gamma_proxy(env, FS)
+        g_old = min(timeit.repeat(lambda: legacy_gamma(env, FS), number=20, repeat=3)) / 20
+        g_new = min(timeit.repeat(lambda: gamma_proxy(env, FS), number=20, repeat=3)) / 20
+        print(
+            f"{name:>18}: collapse legacy={old * 1e3:9.2f}ms new={new * 1e3:7.2f}ms "
+            f"({old / new:7.1f}x, same={same})  gamma legacy={g_old * 1e6:7.1f}us new={g_new * 1e6:7.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
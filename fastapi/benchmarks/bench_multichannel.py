@@ -0,0 +1,27 @@
+"""Multi-channel feature extraction: one 2-D pass vs a per-channel loop.
+
+Run from the fastapi/ directory:  python -m benchmarks.bench_multichannel
+"""
+import timeit
+
+import numpy as np
+
+from app.services.features import compute_channel_features, compute_features
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for channels in (8, 64):
+        for seconds in (10, 60, 300):
+            X = rng.standard_normal((channels, 256 * seconds)).astype(np.float32)
+            compute_channel_features("eeg", X, 256)  # warm the filter cache
+            block = min(timeit.repeat(lambda: compute_channel_features("eeg", X, 256), number=1, repeat=3))
+            loop = min(timeit.repeat(lambda: [compute_features("eeg", x, 256) for x in X], number=1, repeat=3))
+            print(
+                f"eeg {channels:3d}ch x {seconds:4d}s @256Hz: block={block * 1e3:8.1f}ms  "
+                f"loop={loop * 1e3:8.1f}ms  speedup={loop / block:4.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Accuracy/latency comparison of the alignment modes used by /predict.
+
+Each trial draws a fresh labelled synthetic batch, distorts it with a random
+affine map (the "upload" we actually observe), and scores it with:
+
+* ``source`` – the legacy path: CORAL the training set onto the upload, refit
+* ``target`` – inverse CORAL of the upload into the frozen model's space
+* ``none``   – frozen model on the raw upload features
+
+MAE is measured against the labels of the undistorted batch.
+Run from the fastapi/ directory:  python -m benchmarks.compare_alignment [--trials N]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.models.schemas import AlignmentEnum
+from app.routers.predict import _models_for
+from app.services.registry import get_models
+from app.services.training import kitab_eval, synthetic_data
+
+
+def _score(X, alignment):
+    started = time.perf_counter()
+    model, Xm = _models_for(X, alignment)
+    rf_ct = 0.8 * model["rf"].predict(Xm) + 0.2 * model["lr"].predict(Xm)
+    kit = kitab_eval(model["kit"], Xm)
+    return rf_ct, kit, time.perf_counter() - started
+
+
+def _distort(X, rng):
+    mix = np.eye(X.shape[1]) + rng.normal(0, 0.15, (X.shape[1], X.shape[1]))
+    scale = rng.uniform(0.5, 1.5, X.shape[1])
+    shift = rng.normal(0, 0.2, X.shape[1])
+    return (X - X.mean(axis=0)) @ mix * scale + X.mean(axis=0) + shift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--rows", type=int, default=24)
+    args = parser.parse_args(argv)
+
+    get_models()  # load/train once so timings are inference-only for frozen modes
+    rng = np.random.default_rng(7)
+    modes = list(AlignmentEnum)
+    stats = {m: {"rf": [], "kit": [], "sec": []} for m in modes}
+    agree = []
+    for trial in range(args.trials):
+        X_true, y_true = synthetic_data(args.rows, seed=1000 + trial)
+        X_obs = _distort(X_true, rng)
+        preds = {}
+        for mode in modes:
+            rf_ct, kit, sec = _score(X_obs, mode)
+            preds[mode] = rf_ct
+            stats[mode]["rf"].append(np.mean(np.abs(rf_ct - y_true)))
+            stats[mode]["kit"].append(np.mean(np.abs(kit - y_true)))
+            stats[mode]["sec"].append(sec)
+        agree.append(np.mean(np.abs(preds[AlignmentEnum.source] - preds[AlignmentEnum.target])))
+
+    print(f"{args.trials} trials x {args.rows} rows")
+    for mode in modes:
+        s = stats[mode]
+        print(
+            f"{mode.value:>7}: rf MAE={np.mean(s['rf']):.4f}  kitab MAE={np.mean(s['kit']):.4f}  "
+            f"latency={np.median(s['sec']) * 1e3:9.1f} ms"
+        )
+    print(f"mean |source - target| rf_ct: {np.mean(agree):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Per-worker memory with and without pre-fork model loading.
+
+Forks N workers the way gunicorn does and, after each has scored a batch,
+reads Rss / Pss / private (USS) memory from /proc/<pid>/smaps_rollup:
+
+* ``per-worker``: every worker loads the model artifact itself
+* ``preload``:    the master calls registry.preload() before forking
+
+Private memory is what actually scales with WEB_CONCURRENCY.
+Linux only.  Run from the fastapi/ directory:
+    python -m benchmarks.worker_rss [--workers 4]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from app.services import registry
+from app.services.surrogate import blend_predict
+
+
+def _smaps(pid: int):
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r", encoding="utf-8") as fp:
+        for line in fp:
+            parts = line.split()
+            if len(parts) >= 3 and parts[-1] == "kB":
+                out[parts[0].rstrip(":")] = int(parts[1])
+    private = out.get("Private_Clean", 0) + out.get("Private_Dirty", 0)
+    return out.get("Rss", 0) / 1024, out.get("Pss", 0) / 1024, private / 1024
+
+
+def _work(load_in_worker: bool, ready_w: int, go_r: int):
+    model = registry.load_bundle() if load_in_worker else registry.get_models()
+    X = np.random.default_rng(os.getpid()).uniform(0, 1, (16, 5))
+    blend_predict(model, X)
+    os.write(ready_w, b"1")
+    os.read(go_r, 1)  # hold until the parent has sampled memory
+    os._exit(0)
+
+
+def _run(workers: int, preload: bool):
+    if preload:
+        registry.preload()
+    ready_r, ready_w = os.pipe()
+    go_r, go_w = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            _work(not preload, ready_w, go_r)
+        pids.append(pid)
+    for _ in pids:
+        os.read(ready_r, 1)
+    time.sleep(0.2)
+    stats = np.array([_smaps(pid) for pid in pids])
+    os.write(go_w, b"x" * len(pids))
+    for pid in pids:
+        os.waitpid(pid, 0)
+    return stats.mean(axis=0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+    registry.load_bundle()  # make sure an artifact exists before timing either mode
+
+    # per-worker first: once preload() has run the parent holds the bundle
+    rows = [("per-worker", _run(args.workers, preload=False)), ("preload", _run(args.workers, preload=True))]
+    print(f"{args.workers} workers, mean per worker (MiB)")
+    for name, (rss, pss, private) in rows:
+        print(f"{name:>10}: rss={rss:7.1f}  pss={pss:7.1f}  private={private:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
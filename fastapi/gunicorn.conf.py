@@ -0,0 +1,21 @@
+# Gunicorn settings for the Phase-45 API (used by the Procfile).
+# The model stack is loaded once in the master and inherited copy-on-write by
+# every worker, instead of each worker unpickling its own 700-tree forest.
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# every worker forks its own domain pool; with DOMAIN_WORKERS=0 the app sizes
+# each pool to CPUs / WEB_CONCURRENCY, so pass the worker count on before the
+# preloaded app reads its settings (an explicit DOMAIN_WORKERS is per worker)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("WEB_TIMEOUT", "600"))
+preload_app = True
+
+
+def on_starting(server):
+    from app.services.registry import preload
+
+    bundle = preload()
+    server.log.info("preloaded model bundle %s", bundle["version"])
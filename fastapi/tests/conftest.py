@@ -0,0 +1,13 @@
+import pytest
+
+from app.core.config import settings
+from app.services import feature_cache
+
+
+@pytest.fixture(autouse=True)
+def feature_cache_dir(tmp_path_factory, monkeypatch):
+    """Keep the on-disk feature cache out of the working tree and fresh for every test."""
+    monkeypatch.setattr(settings, "FEATURE_CACHE_DIR", str(tmp_path_factory.mktemp("feature_cache")))
+    feature_cache.clear()
+    yield
+    feature_cache.clear()
@@ -0,0 +1,54 @@
+import numpy as np
+from scipy.linalg import fractional_matrix_power
+
+from app.services.alignment import CoralAligner, coral
+from app.services.training import synthetic_data
+
+
+def _reference_coral(Xs, Xt):
+    Cs = np.cov(Xs, rowvar=False) + np.eye(Xs.shape[1]) * 1e-3
+    Ct = np.cov(Xt, rowvar=False) + np.eye(Xt.shape[1]) * 1e-3
+    As = fractional_matrix_power(Cs, -0.5)
+    At = fractional_matrix_power(Ct, 0.5)
+    aligned = (Xs - Xs.mean(axis=0)) @ As @ At + Xt.mean(axis=0)
+    return np.real_if_close(aligned, tol=1000).astype(float)
+
+
+def _target(n, seed=0):
+    rng = np.random.default_rng(seed)
+    mix = rng.normal(size=(5, 5)) * 0.3 + np.eye(5)
+    return rng.normal(size=(n, 5)) @ mix * 0.2 + rng.uniform(0, 1, 5)
+
+
+def test_matches_fractional_matrix_power():
+    Xs, _ = synthetic_data(1500)
+    for n in (2, 3, 12, 200):
+        Xt = _target(n, seed=n)
+        np.testing.assert_allclose(coral(Xs, Xt), _reference_coral(Xs, Xt), rtol=1e-9, atol=1e-9)
+
+
+def test_batched_accumulation_equals_single_pass():
+    Xs, _ = synthetic_data(500)
+    Xt = _target(97)
+    whole = CoralAligner(Xs).fit_target(Xt)
+    streamed = CoralAligner(Xs)
+    for chunk in np.array_split(Xt, 7):
+        streamed.partial_fit(chunk)
+    assert streamed.n_t == 97
+    np.testing.assert_allclose(streamed.mean_t, Xt.mean(axis=0), atol=1e-12)
+    np.testing.assert_allclose(streamed.cov_t, whole.cov_t, atol=1e-12)
+    np.testing.assert_allclose(streamed.transform_source(), whole.transform_source(), atol=1e-10)
+
+
+def test_single_target_row_leaves_source_untouched():
+    Xs, _ = synthetic_data(100)
+    assert coral(Xs, _target(1)) is Xs
+
+
+def test_transform_target_maps_into_source_statistics():
+    Xs, _ = synthetic_data(800)
+    Xt = _target(300)
+    aligner = CoralAligner(Xs, eps=1e-12).fit_target(Xt)
+    mapped = aligner.transform_target(Xt)
+    np.testing.assert_allclose(mapped.mean(axis=0), Xs.mean(axis=0), atol=1e-9)
+    np.testing.assert_allclose(np.cov(mapped, rowvar=False), np.cov(Xs, rowvar=False), atol=1e-8)
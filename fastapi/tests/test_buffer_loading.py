@@ -0,0 +1,86 @@
+import io
+import os
+
+import h5py
+import numpy as np
+import pytest
+import soundfile as sf
+import xarray as xr
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import loaders
+from app.services.loaders import load_by_domain
+
+
+def _wav_bytes(seconds=3, fs=8000, channels=1):
+    x = np.random.default_rng(0).standard_normal((fs * seconds, channels)).astype(np.float32)
+    buf = io.BytesIO()
+    sf.write(buf, x, fs, format="WAV", subtype="FLOAT")
+    return buf.getvalue()
+
+
+def _as_sources(raw, tmp_path, suffix):
+    path = tmp_path / f"rec{suffix}"
+    path.write_bytes(raw)
+    return [str(path), raw, io.BytesIO(raw), open(path, "rb")]
+
+
+@pytest.mark.parametrize("multichannel", [False, True])
+def test_wav_sources_agree(tmp_path, multichannel):
+    raw = _wav_bytes(channels=2)
+    results = [
+        load_by_domain("audio", src, multichannel=multichannel, start=0.5, duration=1.0, name="rec.wav")
+        for src in _as_sources(raw, tmp_path, ".wav")
+    ]
+    for x, fs, meta in results[1:]:
+        assert np.array_equal(x, results[0][0]) and fs == results[0][1]
+        assert meta == results[0][2] and meta["name"] == "rec.wav"
+
+
+def test_hdf5_from_buffer(tmp_path):
+    data = np.random.default_rng(1).standard_normal(4096 * 4).astype(np.float32)
+    buf = io.BytesIO()
+    with h5py.File(buf, "w") as f:
+        f.create_dataset("strain/Strain", data=data).attrs["Xspacing"] = 1 / 4096
+    for src in _as_sources(buf.getvalue(), tmp_path, ".hdf5"):
+        x, fs, _ = load_by_domain("ligo", src, start=1.0, duration=1.0, name="strain.hdf5")
+        assert fs == 4096 and np.array_equal(x, data[4096:8192])
+
+
+def test_netcdf_from_buffer(tmp_path):
+    path = tmp_path / "grace.nc"
+    vals = np.random.default_rng(2).standard_normal((24, 3, 4))
+    xr.Dataset({"lwe": (("time", "lat", "lon"), vals)}).to_netcdf(path, engine="h5netcdf")
+    ref, _, _ = load_by_domain("grace", str(path))
+    x, fs, meta = load_by_domain("grace", path.read_bytes(), name="grace.nc")
+    assert fs == 1 and np.array_equal(x, ref) and meta["name"] == "grace.nc"
+
+
+def test_unnamed_buffer_is_recognised_by_content():
+    x, fs, meta = load_by_domain("audio", _wav_bytes())
+    assert fs == 8000 and x.size == 3 * 8000 and meta["name"] == "upload"
+    with pytest.raises(ValueError):
+        load_by_domain("audio", b"not a recording")
+
+
+def test_spool_fallback_removes_its_file():
+    with loaders._spooled(b"abc", ".edf") as path:
+        assert open(path, "rb").read() == b"abc"
+    assert not os.path.exists(path)
+    with loaders._spooled("/some/file.edf") as same:
+        assert same == "/some/file.edf"
+
+
+@pytest.mark.parametrize("route", ["/predict/spectrogram", "/spectrogram_json"])
+def test_spectrogram_endpoints_leave_no_temp_files(route):
+    before = set(os.listdir(settings.UPLOAD_DIR))
+    with TestClient(app) as client:
+        r = client.post(
+            settings.API_PREFIX + route,
+            data={"domain": "audio"},
+            files={"file": ("tone.wav", _wav_bytes(), "audio/wav")},
+        )
+    assert r.status_code == 200 and len(r.json()["f"]) > 0
+    assert set(os.listdir(settings.UPLOAD_DIR)) == before
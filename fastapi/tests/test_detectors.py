@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from app.services.features import collapse_proxy_time, gamma_proxy
+
+
+def _loop_first_run(tail, thr, hold):
+    for j in np.where(tail <= thr)[0]:
+        if np.all(tail[j : min(len(tail), j + hold)] <= thr):
+            return j
+    return None
+
+
+def _where_gamma(env, fs):
+    pk = int(np.argmax(env))
+    if pk <= 1 or pk >= len(env) - 2:
+        return 0.1
+    left = np.where(env[:pk] <= env[pk] / 2.0)[0]
+    right = np.where(env[pk:] <= env[pk] / 2.0)[0]
+    if left.size == 0 or right.size == 0:
+        return 0.1
+    return float(1.0 / ((pk - left[-1] + right[0]) / fs + 1e-3))
+
+
+def _envelopes(n=5000, count=30):
+    rng = np.random.default_rng(7)
+    for _ in range(count):
+        env = np.abs(rng.normal(0.15, rng.uniform(0.01, 0.2), n))
+        env[rng.integers(2, n - 2)] = 1.0
+        yield env
+
+
+@pytest.mark.parametrize("fs", [100.0, 1000.0])
+def test_collapse_matches_index_scan(fs):
+    for env in _envelopes():
+        ct = collapse_proxy_time(env, fs)
+        pk = int(np.argmax(env))
+        start = min(len(env) - 1, pk + int(0.05 * fs))
+        j = _loop_first_run(env[start:], 0.12, max(1, int(0.15 * fs)))
+        if j is not None:
+            assert ct == (start + j) / fs
+
+
+def test_collapse_accepts_run_cut_short_by_the_end():
+    env = np.full(1000, 0.5)
+    env[10] = 1.0
+    env[-5:] = 0.0  # shorter than hold but reaches the end
+    assert collapse_proxy_time(env, 100.0) == 995 / 100.0
+
+
+def test_gamma_matches_where_scan():
+    for env in _envelopes():
+        assert gamma_proxy(env, 1000.0) == _where_gamma(env, 1000.0)
+    assert gamma_proxy(np.linspace(0, 1, 50), 10.0) == 0.1  # peak at the edge
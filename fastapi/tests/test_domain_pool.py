@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from app.routers import predict
+from app.services import executors, registry
+from app.services.alignment import CoralAligner
+from app.services.plans import PLANS
+from app.services.training import load_kitab_params, synthetic_data
+
+
+@pytest.fixture
+def small_bundle(monkeypatch):
+    X, y = synthetic_data(300)
+    rf = RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0).fit(X, y)
+    lr = Ridge(alpha=0.1).fit(X, rf.predict(X))
+    bundle = {
+        "version": "test",
+        "seed": 42,
+        "rf": rf,
+        "lr": lr,
+        "kit": load_kitab_params(),
+        "X_syn": X,
+        "y_syn": y,
+        "aligner": CoralAligner(X),
+    }
+    monkeypatch.setattr(registry, "_bundle", bundle)
+    return bundle
+
+
+def _samples():
+    rng = np.random.default_rng(3)
+    out = []
+    for i, dom in enumerate(["eeg", "audio", "ligo", "eeg", "grace", "audio", "ligo", "grace"] * 4):
+        vec = rng.uniform([0, 0, 0, 0, 0], [3, 1, 1, 1, 2])
+        out.append(
+            {
+                "ok": True,
+                "name": f"f{i}",
+                "domain": dom,
+                "fs": 100.0,
+                "vector": vec,
+                "features": {"ct_proxy": float(rng.uniform(0.5, 3.0))},
+            }
+        )
+    return out
+
+
+def _strip(analysis):
+    return [r.model_dump() for r in analysis["results"]], analysis["per_domain"], analysis["metrics"]
+
+
+def test_parallel_domains_match_serial(small_bundle, monkeypatch):
+    monkeypatch.setattr(executors.settings, "DOMAIN_WORKERS", 1)
+    serial = predict._analyze_samples(_samples(), include_assets=False, plan=PLANS["standard"])
+
+    monkeypatch.setattr(executors.settings, "DOMAIN_WORKERS", 2)
+    executors.reset_domain_pool()
+    try:
+        assert executors.start_domain_pool() is not None  # forked, so workers see the test bundle
+        parallel = predict._analyze_samples(_samples(), include_assets=False, plan=PLANS["standard"])
+    finally:
+        executors.reset_domain_pool()
+
+    assert _strip(parallel) == _strip(serial)
+    assert [d["type"] for d in parallel["per_domain"]] == ["audio", "eeg", "grace", "ligo"]
+
+
+def test_worker_threads_never_oversubscribe(monkeypatch):
+    monkeypatch.setattr(executors, "_cpu_count", lambda: 8)
+    monkeypatch.setattr(executors.settings, "DOMAIN_WORKERS", 0)
+    assert executors.domain_pool_size() * executors.threads_per_worker() <= 8
+    monkeypatch.setattr(executors.settings, "DOMAIN_WORKERS", 3)
+    assert executors.threads_per_worker() == 2
+    # each gunicorn worker has a pool of its own; together they fill the machine once
+    monkeypatch.setattr(executors.settings, "WEB_CONCURRENCY", 2)
+    assert executors.threads_per_worker() == 1
+    monkeypatch.setattr(executors.settings, "DOMAIN_WORKERS", 0)
+    assert executors.domain_pool_size() == 4
+    assert 2 * executors.domain_pool_size() * executors.threads_per_worker() <= 8
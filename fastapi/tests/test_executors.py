@@ -0,0 +1,197 @@
+import asyncio
+import io
+import mmap
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.routers import predict
+from app.services import executors
+
+
+def _describe(x, parts):
+    # runs in a pool worker; returns a view of its shared input on purpose
+    return {"shared": isinstance(x.base, mmap.mmap), "sum": float(x.sum()), "head": x[:4], "parts": parts}
+
+
+def _shm_blocks():
+    return {n for n in os.listdir("/dev/shm") if n.startswith("psm_")} if os.path.isdir("/dev/shm") else set()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(settings, "DOMAIN_WORKERS", 2)
+    monkeypatch.setattr(settings, "SHARED_MEMORY_MIN_BYTES", 1024)
+    executors.reset_domain_pool()
+    yield executors.start_domain_pool()
+    executors.reset_domain_pool()
+
+
+def _wav(seed, fs=16000, seconds=6):
+    buf = io.BytesIO()
+    sf.write(buf, np.random.default_rng(seed).standard_normal(fs * seconds).astype(np.float32), fs, format="WAV")
+    return buf.getvalue()
+
+
+def test_run_cpu_passes_large_arrays_through_shared_memory(pool):
+    x = np.arange(100_000, dtype=np.float64)
+    before = _shm_blocks()
+    out = asyncio.run(executors.run_cpu(_describe, x, parts=[np.ones(8), (np.zeros(4096), 3)]))
+    assert out["shared"] and out["sum"] == x.sum()
+    assert np.array_equal(out["head"], x[:4]) and out["head"].base is None  # copied out of the block
+    assert np.array_equal(out["parts"][1][0], np.zeros(4096)) and out["parts"][1][1] == 3
+    assert _shm_blocks() == before
+
+
+def test_map_cpu_shares_arrays_and_keeps_order(pool):
+    xs = [np.full(10_000, float(i)) for i in range(3)]
+    before = _shm_blocks()
+    out = executors.map_cpu(_describe, [(x, i) for i, x in enumerate(xs)])
+    assert [o["parts"] for o in out] == [0, 1, 2] and all(o["shared"] for o in out)
+    assert [o["sum"] for o in out] == [0.0, 10_000.0, 20_000.0]
+    assert _shm_blocks() == before
+
+
+def test_pool_created_while_threads_run_does_not_fork(monkeypatch):
+    monkeypatch.setattr(settings, "DOMAIN_WORKERS", 2)
+    monkeypatch.setattr(settings, "POOL_START_METHOD", "fork")
+    executors.reset_domain_pool()
+    stop = threading.Event()
+    busy = threading.Thread(target=stop.wait)
+    busy.start()
+    try:
+        pool = executors.domain_pool()
+        assert pool._mp_context.get_start_method() == "forkserver"
+        assert pool.submit(os.getpid).result() != os.getpid()
+    finally:
+        stop.set()
+        busy.join()
+        executors.reset_domain_pool()
+
+
+def test_workers_leave_shared_blocks_to_the_parent():
+    # a pool started before any block exists; its workers must not track (and later "clean up") blocks
+    script = (
+        "import asyncio, numpy as np\n"
+        "from app.core.config import settings\n"
+        "from app.services import executors\n"
+        "settings.DOMAIN_WORKERS = 2\n"
+        "settings.SHARED_MEMORY_MIN_BYTES = 1024\n"
+        "executors.start_domain_pool()\n"
+        "print(asyncio.run(executors.run_cpu(np.sum, np.ones(100_000))))\n"
+        "executors.domain_pool().shutdown(wait=True)\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0 and out.stdout.strip() == "100000.0"
+    assert "resource_tracker" not in out.stderr and "leaked" not in out.stderr
+
+
+def test_run_cpu_without_pool_runs_on_a_thread(monkeypatch):
+    monkeypatch.setattr(executors, "domain_pool", lambda: None)
+    out = asyncio.run(executors.run_cpu(_describe, np.ones(10), parts=None))
+    assert not out["shared"] and out["sum"] == 10.0
+
+
+def test_pooled_predict_matches_serial(pool, monkeypatch):
+    files = [("files", (f"s{i}.wav", _wav(i), "audio/wav")) for i in range(3)]
+    monkeypatch.setattr(settings, "FEATURE_CACHE", False)
+    with TestClient(app) as client:
+        pooled = client.post(settings.API_PREFIX + "/predict/csv", data={"domain": "audio"}, files=files)
+        monkeypatch.setattr(executors, "domain_pool", lambda: None)
+        serial = client.post(settings.API_PREFIX + "/predict/csv", data={"domain": "audio"}, files=files)
+    assert pooled.status_code == serial.status_code == 200
+    assert pooled.text == serial.text
+
+
+def test_pooled_predict_sends_one_batch_per_domain(pool, monkeypatch):
+    calls = []
+    real = predict.run_cpu
+
+    async def recording(fn, *args, **kwargs):
+        if fn is predict.run_phase45_batch:
+            calls.append((args[0], len(args[1])))
+        return await real(fn, *args, **kwargs)
+
+    monkeypatch.setattr(settings, "FEATURE_CACHE", False)
+    monkeypatch.setattr(predict, "run_cpu", recording)
+    files = [("files", (f"s{i}.wav", _wav(i), "audio/wav")) for i in range(3)]
+    files.append(("files", ("broken.wav", b"RIFF\x00\x00\x00\x00WAVEjunk", "audio/wav")))
+    with TestClient(app) as client:
+        r = client.post(settings.API_PREFIX + "/predict", data={"domain": "ligo"}, files=files)
+    assert r.status_code == 200
+    assert calls == [("audio", 3)]
+    broken = [row for row in r.json()["results"] if row["name"].startswith("broken.wav")]
+    assert broken and broken[0]["domain"] == "audio"  # the sniffed domain, not the declared one
+
+
+def test_feature_batches_start_while_uploads_are_read(monkeypatch):
+    events = []
+    read, featurise = predict._read_upload, predict.run_phase45_batch
+
+    def slow_read(domain, name, source, multichannel):
+        if name == "late.wav":
+            time.sleep(0.5)
+        out = read(domain, name, source, multichannel)
+        events.append(("read", name))
+        return out
+
+    def batch(dom, loaded):
+        events.append(("batch", len(loaded)))
+        return featurise(dom, loaded)
+
+    monkeypatch.setattr(settings, "FEATURE_CACHE", False)
+    monkeypatch.setattr(settings, "FEATURE_BATCH_SIZE", 2)
+    monkeypatch.setattr(executors, "domain_pool", lambda: None)
+    monkeypatch.setattr(predict, "_read_upload", slow_read)
+    monkeypatch.setattr(predict, "run_phase45_batch", batch)
+    files = [("files", (f"s{i}.wav", _wav(i), "audio/wav")) for i in range(2)]
+    files.append(("files", ("late.wav", _wav(2), "audio/wav")))
+    with TestClient(app) as client:
+        r = client.post(settings.API_PREFIX + "/predict/csv", data={"domain": "audio"}, files=files)
+    assert r.status_code == 200
+    assert [e for e in events if e[0] == "batch"] == [("batch", 2), ("batch", 1)]
+    assert events.index(("batch", 2)) < events.index(("read", "late.wav"))
+
+
+def test_health_answers_while_predict_runs(monkeypatch):
+    monkeypatch.setattr(settings, "FEATURE_CACHE", False)
+    monkeypatch.setattr(executors, "domain_pool", lambda: None)
+    real = predict.run_phase45_batch
+
+    def slow(*args, **kwargs):
+        time.sleep(1.0)
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(predict, "run_phase45_batch", slow)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            busy = asyncio.create_task(
+                client.post(
+                    settings.API_PREFIX + "/predict/csv",
+                    data={"domain": "audio"},
+                    files={"files": ("s.wav", _wav(0), "audio/wav")},
+                )
+            )
+            await asyncio.sleep(0.2)
+            t0 = time.perf_counter()
+            health = await client.get(settings.API_PREFIX + "/health")
+            waited = time.perf_counter() - t0
+            done_first = busy.done()
+            assert (await busy).status_code == 200
+        return health, waited, done_first
+
+    health, waited, done_first = asyncio.run(scenario())
+    assert health.status_code == 200 and not done_first and waited < 0.5
@@ -0,0 +1,86 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from app.services import feature_cache, phase45
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch):
+    monkeypatch.setattr(feature_cache.settings, "FEATURE_CACHE", True)
+    feature_cache.clear()
+    yield
+    feature_cache.clear()
+
+
+@pytest.fixture
+def wav_path(tmp_path):
+    fs = 8000
+    t = np.arange(fs * 4) / fs
+    path = tmp_path / "tone.wav"
+    sf.write(path, (np.sin(2 * np.pi * 440 * t) * np.exp(-t)).astype(np.float32), fs, subtype="FLOAT")
+    return str(path)
+
+
+def _sample(n=1000):
+    return {
+        "name": "a.wav",
+        "fs": 16000.0,
+        "features": {"name": "a.wav", "ct_proxy": 1.5},
+        "vector": np.arange(6.0),
+        "window": np.ones(n, dtype=np.float32),
+        "env": np.ones(n, dtype=np.float32),
+    }
+
+
+def test_digest_is_the_same_for_every_source_kind(wav_path):
+    raw = open(wav_path, "rb").read()
+    f = io.BytesIO(raw)
+    f.seek(10)
+    assert feature_cache.source_digest(wav_path) == feature_cache.source_digest(raw) == feature_cache.source_digest(f)
+    assert f.tell() == 0
+
+
+def test_key_tracks_domain_channels_and_settings(monkeypatch):
+    key = feature_cache.cache_key("abc", "audio")
+    assert key != feature_cache.cache_key("abc", "eeg")
+    assert key != feature_cache.cache_key("abc", "audio", multichannel=True)
+    monkeypatch.setattr(feature_cache.settings, "RESAMPLE_AUDIO_HZ", 8000)
+    assert key != feature_cache.cache_key("abc", "audio")
+
+
+def test_memory_then_disk_tiers():
+    feature_cache.put("k", _sample())
+    hit = feature_cache.get("k", "audio")
+    assert hit["features"]["ct_proxy"] == 1.5 and np.array_equal(hit["vector"], np.arange(6.0))
+    hit["features"]["name"] = "renamed.wav"  # callers rename hits; the entry must not change
+    feature_cache.clear()  # drop the in-process tier only
+    again = feature_cache.get("k", "audio")
+    assert again["features"]["name"] == "a.wav" and again["window"].size == 1000
+    assert feature_cache.get("missing", "audio") is None
+    s = feature_cache.stats()
+    assert (s["disk_hits"], s["misses"], s["entries"]) == (1, 1, 1)
+
+
+def test_lru_evicts_by_bytes(monkeypatch):
+    monkeypatch.setattr(feature_cache.settings, "FEATURE_CACHE_DIR", "")
+    monkeypatch.setattr(feature_cache.settings, "FEATURE_CACHE_MAX_MB", 0.02)  # ~20 KB
+    for k in "abc":
+        feature_cache.put(k, _sample(2000))  # ~16 KB each
+    assert feature_cache.get("a", "audio") is None and feature_cache.get("c", "audio") is not None
+    assert feature_cache.stats()["evictions"] == 2
+
+
+def test_run_phase45_hit_skips_loading(wav_path, monkeypatch):
+    first = phase45.run_phase45("audio", wav_path)
+
+    def no_load(*args, **kwargs):
+        raise AssertionError("cache hit must not load the file")
+
+    monkeypatch.setattr(phase45, "load_by_domain", no_load)
+    second = phase45.run_phase45("audio", wav_path)
+    assert second["features"] == first["features"]
+    assert np.array_equal(second["vector"], first["vector"]) and np.array_equal(second["env"], first["env"])
+    assert feature_cache.stats()["hits"] == 1
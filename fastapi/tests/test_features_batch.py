@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from app.services.features import compute_features, compute_features_batch, window_features
+from app.services.phase45 import run_phase45_batch
+
+
+def _signals(fs, seconds, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(fs * seconds)) / fs
+    return [
+        np.sin(2 * np.pi * f0 * t) * np.exp(-t) + 0.1 * rng.standard_normal(t.size)
+        for f0 in (220.0, 440.0, 880.0)
+    ]
+
+
+@pytest.mark.parametrize(
+    "domain,fs,seconds", [("audio", 44100, 3.0), ("eeg", 256, 3.0), ("ligo", 4096, 3.0), ("grace", 1.0, 600.0)]
+)
+def test_batch_matches_per_signal(domain, fs, seconds):
+    sigs = _signals(fs, seconds) + _signals(fs, seconds * 0.7, seed=1)[:1]  # two length buckets
+    batch = compute_features_batch(domain, sigs, fs)
+    assert len(batch) == len(sigs)
+    for sig, (window, env, feat, vec) in zip(sigs, batch):
+        w1, e1, f1, v1 = compute_features(domain, sig, fs)
+        assert np.array_equal(window, w1)
+        assert np.array_equal(env, e1)
+        assert feat == f1
+        assert np.array_equal(vec, v1)
+
+
+def test_batch_accepts_per_signal_rates():
+    sigs = _signals(44100, 1.0) + _signals(22050, 1.0)
+    rates = [44100] * 3 + [22050] * 3
+    batch = compute_features_batch("audio", sigs, rates)
+    for sig, fs, (_, _, feat, _) in zip(sigs, rates, batch):
+        assert feat == compute_features("audio", sig, fs)[2]
+    with pytest.raises(ValueError):
+        compute_features_batch("audio", sigs, rates[:2])
+
+
+def test_window_features_accepts_2d_stack():
+    stack = np.stack(_signals(16000, 1.0)).astype(np.float32)
+    rows = window_features(stack, 16000.0)
+    assert [feat for _, feat, _ in rows] == [feat for _, feat, _ in window_features(list(stack), 16000.0)]
+    assert rows[0][1]["dom"] == pytest.approx(220.0, abs=2.0)
+
+
+def test_run_phase45_batch_isolates_bad_signals():
+    good = _signals(16000, 1.0)[0]
+    out = run_phase45_batch("audio", [(good, 16000, {"name": "a"}), (np.zeros(0), 16000, {"name": "b"})])
+    assert out[0]["name"] == "a" and out[0]["features"]["ct_proxy"] >= 0
+    assert isinstance(out[1], Exception)
@@ -0,0 +1,39 @@
+import numpy as np
+from scipy.signal import resample_poly
+
+from app.services import filters
+
+
+def _tones(fs, seconds=20.0):
+    t = np.arange(int(fs * seconds)) / fs
+    return t, np.sin(2 * np.pi * 10 * t) + np.sin(2 * np.pi * 50 * t) + np.sin(2 * np.pi * 60 * t)
+
+
+def test_eeg_bank_is_one_cascade_and_cached():
+    sos = filters.filter_bank("eeg", 256.0)
+    assert sos is filters.filter_bank("eeg", 256.0)
+    assert sos.shape == (4 + 2, 6)  # order-4 band-pass (4 sections) + two notches
+    assert filters.filter_bank("ligo", 4096.0) is None
+
+
+def test_eeg_bank_keeps_band_and_removes_mains():
+    # a 1-45 Hz order-4 band-pass in ba form is unstable at these rates
+    for fs in (256.0, 4000.0, 16000.0):
+        t, x = _tones(fs)
+        y = filters.apply_bank("eeg", x, fs)
+        mid = slice(len(t) // 4, -len(t) // 4)
+        assert np.all(np.isfinite(y))
+        assert np.max(np.abs(y[mid] - np.sin(2 * np.pi * 10 * t[mid]))) < 1e-3
+
+
+def test_notches_above_nyquist_are_dropped():
+    assert filters.notch_sos(110.0).shape == (1, 6)  # 60 Hz is beyond Nyquist
+    assert filters.notch_sos(90.0) is None
+
+
+def test_cached_resample_matches_resample_poly():
+    x = np.random.default_rng(0).standard_normal((2, 44100))
+    y, fs = filters.resample(x, 44100.0, 16000.0)
+    assert fs == 16000.0
+    assert np.array_equal(y, resample_poly(x, 160, 441, axis=-1))
+    assert filters.resample_fir(160, 441) is filters.resample_fir(160, 441)
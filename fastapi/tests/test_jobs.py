@@ -0,0 +1,208 @@
+import io
+import time
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import jobs
+
+
+def _wav(seed, fs=16000, seconds=6):
+    buf = io.BytesIO()
+    sf.write(buf, np.random.default_rng(seed).standard_normal(fs * seconds).astype(np.float32), fs, format="WAV")
+    return buf.getvalue()
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOBS_BACKEND", request.param)
+    monkeypatch.setattr(settings, "JOBS_DB", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(settings, "JOBS_POLL_SEC", 0.05)
+    jobs.reset(wait=True)
+    yield request.param
+    jobs.reset(wait=True)
+
+
+def _wait(client, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f"{settings.API_PREFIX}/jobs/{job_id}").json()
+        if status["status"] in (jobs.DONE, jobs.FAILED):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_result_matches_synchronous_predict(backend):
+    files = [("files", (f"s{i}.wav", _wav(i), "audio/wav")) for i in range(3)]
+    with TestClient(app) as client:
+        sync = client.post(settings.API_PREFIX + "/predict", data={"domain": "audio", "mode": "standard"}, files=files)
+        r = client.post(settings.API_PREFIX + "/jobs/predict", data={"domain": "audio", "mode": "standard"}, files=files)
+        assert r.status_code == 202 and r.headers["location"].endswith(r.json()["id"])
+        status = _wait(client, r.json()["id"])
+        result = client.get(f"{settings.API_PREFIX}/jobs/{status['id']}/result").json()
+    assert status["status"] == "done" and status["done"] == status["total"] == 3
+    assert result["results"] == sync.json()["results"] and result["r2"] == sync.json()["r2"]
+    assert result["zip_base64"] is None  # assets only on request
+    assert not jobs.job_dir(status["id"]).exists()
+
+
+def test_unreadable_file_is_an_error_row(backend, monkeypatch):
+    from app.routers import predict
+
+    sniff = predict.detect_format
+
+    def flaky(source, name=None):
+        if name == "bad.wav":
+            raise OSError("unreadable header")
+        return sniff(source, name)
+
+    monkeypatch.setattr(predict, "detect_format", flaky)
+    files = [("files", (name, _wav(i), "audio/wav")) for i, name in enumerate(["a.wav", "bad.wav", "b.wav"])]
+    with TestClient(app) as client:
+        r = client.post(settings.API_PREFIX + "/jobs/predict", data={"domain": "audio", "mode": "fast"}, files=files)
+        status = _wait(client, r.json()["id"])
+        result = client.get(f"{settings.API_PREFIX}/jobs/{status['id']}/result").json()
+    assert status["status"] == "done" and status["done"] == status["total"] == 3
+    assert [row["name"] for row in result["results"]] == ["a.wav", "bad.wav (error)", "b.wav"]
+
+
+def test_idempotency_key(backend):
+    wav = ("files", ("a.wav", _wav(0), "audio/wav"))
+    headers = {"Idempotency-Key": "batch-42"}
+    with TestClient(app) as client:
+        first = client.post(settings.API_PREFIX + "/jobs/predict", data={"domain": "audio"}, files=[wav], headers=headers)
+        again = client.post(settings.API_PREFIX + "/jobs/predict", data={"domain": "audio"}, files=[wav], headers=headers)
+        other = client.post(
+            settings.API_PREFIX + "/jobs/predict",
+            data={"domain": "audio"},
+            files=[("files", ("a.wav", _wav(1), "audio/wav"))],
+            headers=headers,
+        )
+        _wait(client, first.json()["id"])
+    assert first.status_code == 202 and again.status_code == 200
+    assert again.json()["id"] == first.json()["id"]
+    assert other.status_code == 409
+
+
+def test_result_before_done_and_after_ttl(backend, monkeypatch):
+    release = []
+
+    def blocked(job, progress):
+        while not release:
+            time.sleep(0.01)
+        progress(1)
+        return {"ok": True}
+
+    jobs.register_handler("blocked", blocked)
+    with TestClient(app) as client:
+        job, _ = jobs.submit(jobs.Job("blocked", {}, total=1))
+        r = client.get(f"{settings.API_PREFIX}/jobs/{job.id}/result")
+        assert r.status_code == 409 and "0/1" in r.json()["detail"]
+        release.append(1)
+        assert _wait(client, job.id)["status"] == "done"
+        assert client.get(f"{settings.API_PREFIX}/jobs/{job.id}/result").json() == {"ok": True}
+        monkeypatch.setattr(settings, "JOBS_TTL_SEC", 0)
+        jobs._evict_expired(force=True)
+        assert client.get(f"{settings.API_PREFIX}/jobs/{job.id}").status_code == 404
+
+
+def test_failed_job_reports_error(backend):
+    def boom(job, progress):
+        raise RuntimeError("disk on fire")
+
+    jobs.register_handler("boom", boom)
+    with TestClient(app) as client:
+        job, _ = jobs.submit(jobs.Job("boom", {}, total=2))
+        status = _wait(client, job.id)
+        r = client.get(f"{settings.API_PREFIX}/jobs/{job.id}/result")
+    assert status["status"] == "failed" and status["error"] == "disk on fire"
+    assert r.status_code == 409
+
+
+@pytest.mark.parametrize("make", [lambda p: jobs.MemoryJobStore(), lambda p: jobs.SQLiteJobStore(p)])
+def test_requeue_stale_only_touches_lapsed_leases(make, tmp_path):
+    s = make(str(tmp_path / "jobs.sqlite3"))
+    for i in range(3):
+        s.add(jobs.Job("predict", {"i": i}, total=2, created=float(i)))
+    lapsed, live = s.claim(), s.claim()
+    s.update(lapsed.id, done=1, heartbeat=time.time() - 120)
+    assert s.requeue_stale(time.time() - 60) == [lapsed.id]
+    again = s.get(lapsed.id)
+    assert again.status == jobs.QUEUED and again.done == 0
+    assert s.get(live.id).status == jobs.RUNNING
+    assert s.claim().id == lapsed.id  # oldest first, ahead of the never-claimed job
+
+
+def test_restart_requeues_job_left_running(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOBS_BACKEND", "sqlite")
+    monkeypatch.setattr(settings, "JOBS_DB", str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(settings, "JOBS_POLL_SEC", 0.05)
+    monkeypatch.setattr(settings, "JOBS_LEASE_SEC", 30)
+    jobs.reset(wait=True)
+    # the previous process claimed both jobs; one died a minute ago, the other is still alive elsewhere
+    before = jobs.SQLiteJobStore(settings.JOBS_DB)
+    crashed, alive = jobs.Job("resumable", {}, total=1), jobs.Job("resumable", {}, total=1)
+    before.add(crashed)
+    before.add(alive)
+    assert before.claim().id == crashed.id and before.claim().id == alive.id
+    before.update(crashed.id, heartbeat=time.time() - 60)
+
+    ran = []
+    jobs.register_handler("resumable", lambda job, progress: ran.append(job.id) or {"ok": True})
+    try:
+        jobs.resume()
+        deadline = time.monotonic() + 30
+        while jobs.get(crashed.id).status != jobs.DONE and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert jobs.get(crashed.id).result == {"ok": True}
+        assert ran == [crashed.id] and jobs.get(alive.id).status == jobs.RUNNING
+    finally:
+        jobs.reset(wait=True)
+
+
+def test_long_job_keeps_its_lease(backend, monkeypatch):
+    monkeypatch.setattr(settings, "JOBS_LEASE_SEC", 0.3)
+    runs = []
+
+    def slow(job, progress):
+        runs.append(job.id)
+        time.sleep(1.0)  # well past the lease, without reporting progress
+        return {"ok": True}
+
+    jobs.register_handler("slow", slow)
+    job, _ = jobs.submit(jobs.Job("slow", {}, total=1))
+    deadline = time.monotonic() + 30
+    while jobs.get(job.id).status != jobs.DONE and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert jobs.get(job.id).status == jobs.DONE and runs == [job.id]
+
+
+def test_store_interface_is_abstract():
+    class Partial(jobs.JobStore):
+        def get(self, job_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_default_db_lives_under_upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOBS_DB", None)
+    monkeypatch.setattr(settings, "UPLOAD_DIR", "_uploads")
+    monkeypatch.chdir(tmp_path)
+    assert jobs.db_path() == tmp_path.resolve() / "_uploads" / "jobs.sqlite3"
+
+
+def test_sqlite_claims_are_exclusive_across_stores(tmp_path):
+    path = str(tmp_path / "shared.sqlite3")
+    a, b = jobs.SQLiteJobStore(path), jobs.SQLiteJobStore(path)
+    for i in range(4):
+        a.add(jobs.Job("predict", {"i": i}, total=1, created=float(i)))
+    claimed = [s.claim() for s in (a, b, b, a, b)]
+    assert [j.params["i"] for j in claimed[:4]] == [0, 1, 2, 3] and claimed[4] is None
+    assert {a.get(j.id).status for j in claimed[:4]} == {jobs.RUNNING}
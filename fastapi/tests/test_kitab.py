@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from app.services.kitab import bootstrap_kitab, fit_kitab_batch, fit_kitab_point
+from app.services.training import fit_kitab, kitab_eval
+
+TRUE = np.array([2.0, 1.3, 0.7, -1.1, 0.6, 0.05, 8.0])
+
+
+def _data(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack(
+        [rng.uniform(0, 3, n), rng.random(n), rng.random(n), rng.random(n), rng.uniform(0, 2, n)]
+    )
+    return X, kitab_eval(TRUE, X) + rng.normal(0, 0.05, n)
+
+
+def _loop_bootstrap(X, y, runs=40, rng=np.random):
+    preds = []
+    for _ in range(runs):
+        idx = rng.choice(len(X), len(X), replace=True)
+        preds.append(kitab_eval(fit_kitab(X[idx], y[idx]), X))
+    return np.array(preds)
+
+
+def test_point_fit_matches_curve_fit():
+    X, y = _data(60)
+    np.testing.assert_allclose(fit_kitab_point(X, y), fit_kitab(X, y), rtol=1e-5, atol=1e-6)
+
+
+def test_batch_solves_independent_problems():
+    Xa, ya = _data(40, seed=1)
+    Xb, yb = _data(40, seed=2)
+    P = fit_kitab_batch(np.stack([Xa, Xb]), np.stack([ya, yb]), np.ones(7))
+    np.testing.assert_allclose(P[0], fit_kitab(Xa, ya), rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(P[1], fit_kitab(Xb, yb), rtol=1e-5, atol=1e-6)
+
+
+def test_bootstrap_intervals_match_curve_fit_loop():
+    X, y = _data(50, seed=3)
+    np.random.seed(11)
+    ref = _loop_bootstrap(X, y)
+    np.random.seed(11)
+    fast = bootstrap_kitab(X, y)
+    assert fast.shape == ref.shape
+    for q in (2.5, 97.5):
+        np.testing.assert_allclose(
+            np.percentile(fast, q, axis=0), np.percentile(ref, q, axis=0), atol=1e-5
+        )
+
+
+@pytest.mark.parametrize("n", [8, 9, 10, 12, 15])
+@pytest.mark.parametrize("seed", [0, 4])
+def test_small_bootstrap_fits_resamples_like_curve_fit(n, seed):
+    # resamples with few distinct rows have many optima, so only the fit to the
+    # resampled rows is comparable; it must be as good and must not vary per call
+    X, y = _data(n, seed=seed)
+    ref = _loop_bootstrap(X, y, rng=np.random.RandomState(seed + 100))
+    fast = bootstrap_kitab(X, y, rng=np.random.RandomState(seed + 100))
+    np.testing.assert_array_equal(fast, bootstrap_kitab(X, y, rng=np.random.RandomState(seed + 100)))
+    idx = np.random.RandomState(seed + 100).randint(0, n, size=(len(ref), n))
+    rows = np.arange(len(ref))[:, None]
+    rms = lambda P: np.sqrt(((P[rows, idx] - y[idx]) ** 2).mean(axis=1))
+    assert np.all(rms(fast) <= rms(ref) + 0.02)  # well inside the 0.05 noise
+
+
+def test_small_uploads_fall_back_to_published_params():
+    X, y = _data(4)
+    np.random.seed(0)
+    ref = _loop_bootstrap(X, y)
+    np.random.seed(0)
+    np.testing.assert_allclose(bootstrap_kitab(X, y), ref)
+    assert bootstrap_kitab(X[:1], y[:1]) is None
+
+
+def test_early_stopping_uses_fewer_runs():
+    X, y = _data(200, seed=4)
+    np.random.seed(5)
+    boot = bootstrap_kitab(X, y, runs=200, tol=0.5, block=10, min_runs=20)
+    assert 20 <= len(boot) < 200
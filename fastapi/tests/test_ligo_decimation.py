@@ -0,0 +1,65 @@
+import h5py
+import numpy as np
+import pytest
+from scipy.signal import resample_poly
+
+from app.services import loaders
+from app.services.filters import resample_fir
+from app.services.loaders import load_by_domain
+
+
+@pytest.fixture
+def two_detectors(tmp_path):
+    rng = np.random.default_rng(5)
+    data = {det: rng.standard_normal(4096 * 20).astype(np.float32) for det in ("H1", "L1")}
+    path = tmp_path / "pair.hdf5"
+    with h5py.File(path, "w") as f:
+        for det, x in data.items():
+            f.create_dataset(f"{det}:GWOSC-4KHZ_R1/strain/Strain", data=x).attrs["Xspacing"] = 1 / 4096
+    return str(path), data
+
+
+@pytest.fixture(autouse=True)
+def native_rate(monkeypatch):
+    monkeypatch.setattr(loaders.settings, "RESAMPLE_LIGO_HZ", 0)
+    loaders._layouts.clear()
+
+
+@pytest.mark.parametrize("block", [4096, 10_000, 1 << 20])
+def test_decimation_on_read_matches_resample_poly(two_detectors, monkeypatch, block):
+    path, data = two_detectors
+    monkeypatch.setattr(loaders.settings, "RESAMPLE_LIGO_HZ", 1024)
+    monkeypatch.setattr(loaders.settings, "LIGO_READ_BLOCK_SAMPLES", block)
+    x, fs, meta = load_by_domain("ligo", path, start=2.0, duration=10.5)
+    ref = resample_poly(data["H1"][8192 : 8192 + 43008].astype(np.float64), 1, 4, window=resample_fir(1, 4))
+    assert fs == 1024 and meta["native_fs"] == 4096 and meta["total_samples"] == 20 * 1024
+    assert x.dtype == np.float32 and x.size == ref.size
+    assert np.allclose(x, ref, atol=1e-5)
+
+
+def test_non_integer_ratio_reads_native_rate(two_detectors, monkeypatch):
+    monkeypatch.setattr(loaders.settings, "RESAMPLE_LIGO_HZ", 1000)
+    x, fs, meta = load_by_domain("ligo", two_detectors[0], duration=1.0)
+    assert fs == 4096 and x.size == 4096 and "native_fs" not in meta
+
+
+def test_multichannel_stacks_detectors(two_detectors):
+    path, data = two_detectors
+    x, fs, meta = load_by_domain("ligo", path, multichannel=True, duration=2.0)
+    assert x.shape == (2, 8192) and meta["channels"] == ["H1", "L1"]
+    assert np.array_equal(x[1], data["L1"][:8192])
+    mono, _, _ = load_by_domain("ligo", path, duration=2.0)
+    assert np.array_equal(mono, data["H1"][:8192])
+
+
+def test_layout_is_discovered_once_per_file(two_detectors, monkeypatch):
+    calls = []
+    real = loaders._discover_strain
+    monkeypatch.setattr(loaders, "_discover_strain", lambda f: calls.append(1) or real(f))
+    path = two_detectors[0]
+    for _ in range(3):
+        load_by_domain("ligo", path, duration=1.0)
+    raw = open(path, "rb").read()
+    for _ in range(2):
+        load_by_domain("ligo", raw, duration=1.0, name="pair.hdf5")
+    assert len(calls) == 2  # one per signature: the path, then the in-memory copy
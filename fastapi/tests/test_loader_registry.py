@@ -0,0 +1,96 @@
+import io
+
+import h5py
+import numpy as np
+import pytest
+import soundfile as sf
+import xarray as xr
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import loaders
+from app.services.loaders import LoaderSpec, detect_domain, load_by_domain, sniff_format
+
+
+def _wav(fs=8000, seconds=2):
+    buf = io.BytesIO()
+    sf.write(buf, np.random.default_rng(0).standard_normal(fs * seconds).astype(np.float32), fs, format="WAV")
+    return buf.getvalue()
+
+
+def _strain():
+    buf = io.BytesIO()
+    with h5py.File(buf, "w") as f:
+        f.create_dataset("strain/Strain", data=np.zeros(4096, dtype=np.float32)).attrs["Xspacing"] = 1 / 4096
+    return buf.getvalue()
+
+
+def _netcdf(tmp_path, engine):
+    path = tmp_path / f"grace_{engine}.nc"
+    xr.Dataset({"lwe": (("time", "lat"), np.ones((12, 3)))}).to_netcdf(path, engine=engine)
+    return path.read_bytes()
+
+
+def test_signatures(tmp_path):
+    assert sniff_format(_wav()) == "wav"
+    assert sniff_format(_strain()) == "hdf5"
+    assert sniff_format(_netcdf(tmp_path, "h5netcdf")) == "netcdf"  # HDF5 underneath
+    assert sniff_format(_netcdf(tmp_path, "scipy")) == "netcdf"  # NetCDF3 classic
+    assert sniff_format(b"0       " + b" " * 248) == "edf"
+    assert sniff_format(b"rec 2 360 650000\n", name="rec.hea") == "wfdb"  # extension fallback
+    assert sniff_format(b"????", name="x.bin") is None
+    assert detect_domain(None, "a.hdf5") == "ligo"
+
+
+def test_content_beats_name_and_declaration(tmp_path):
+    x, fs, meta = load_by_domain("ligo", _wav(), name="mislabelled.h5")
+    assert fs == 8000 and meta["type"] == "audio"
+    _, fs, meta = load_by_domain("ligo", _netcdf(tmp_path, "h5netcdf"), name="grace.hdf5")
+    assert fs == 1 and meta["type"] == "grace"
+    with pytest.raises(ValueError):
+        load_by_domain("radar", _wav())
+
+
+def test_netcdf_engine_check_is_cached(tmp_path):
+    raw = _netcdf(tmp_path, "h5netcdf")
+    loaders._netcdf_engines.cache_clear()
+    for _ in range(3):
+        load_by_domain("grace", raw, name="g.nc")
+    info = loaders._netcdf_engines.cache_info()
+    assert info.misses == 1 and info.hits == 2
+
+
+def test_registered_loader_is_picked_by_signature(monkeypatch):
+    monkeypatch.setattr(loaders, "_LOADERS", dict(loaders._LOADERS))
+    fake = lambda src, mc, start, dur, name: (np.ones(4, dtype=np.float32), 2, {"type": "audio", "name": name})
+    loaders.register_loader(LoaderSpec("fake", "audio", fake, (".fk",), lambda h, _: h.startswith(b"FAKE")))
+    x, fs, meta = load_by_domain("audio", b"FAKE....", name="clip.bin")
+    assert fs == 2 and x.size == 4
+
+
+@pytest.mark.parametrize("route", ["/predict/spectrogram", "/spectrogram_json", "/predict/csv"])
+def test_wrong_declaration_decodes_once(route, monkeypatch):
+    calls, sniffs = [], []
+    real = loaders._LOADERS["wav"]
+
+    def counting(*args, **kwargs):
+        calls.append(1)
+        return real.load(*args, **kwargs)
+
+    def sniff(head, source):
+        sniffs.append(1)
+        return real.sniff(head, source)
+
+    monkeypatch.setattr(settings, "FEATURE_CACHE", False)
+    monkeypatch.setitem(loaders._LOADERS, "wav", LoaderSpec("wav", "audio", counting, real.extensions, sniff))
+    field = "files" if route == "/predict/csv" else "file"
+    with TestClient(app) as client:
+        r = client.post(
+            settings.API_PREFIX + route,
+            data={"domain": "ligo"},
+            files={field: ("clip.h5", _wav(), "application/octet-stream")},
+        )
+    assert r.status_code == 200
+    assert route == "/predict/csv" or len(r.json()["f"]) > 0
+    assert len(calls) == 1 and len(sniffs) == 1
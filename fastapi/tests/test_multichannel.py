@@ -0,0 +1,52 @@
+import numpy as np
+import soundfile as sf
+
+from app.services.features import compute_channel_features, compute_features
+from app.services.loaders import load_by_domain
+from app.services.phase45 import run_phase45, run_phase45_batch
+
+
+def _stereo(path, fs=16000, seconds=2.0):
+    t = np.arange(int(fs * seconds)) / fs
+    left = np.sin(2 * np.pi * 300 * t) * np.exp(-t)
+    right = 0.5 * np.sin(2 * np.pi * 1200 * t) * np.exp(-2 * t)
+    sf.write(path, np.stack([left, right], axis=1), fs)
+    return left, right
+
+
+def test_wav_loads_as_channels(tmp_path):
+    path = str(tmp_path / "stereo.wav")
+    _stereo(path)
+    mono, fs, _ = load_by_domain("audio", path)
+    block, fs2, meta = load_by_domain("audio", path, multichannel=True)
+    assert mono.ndim == 1 and block.shape == (2, mono.size) and fs == fs2
+    assert meta["channels"] == ["ch0", "ch1"]
+    assert np.allclose(block.mean(axis=0), mono)
+
+
+def test_channel_block_matches_per_channel_path():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((6, 256 * 20)).astype(np.float32)
+    window, env, feats, vecs = compute_channel_features("eeg", X, 256)
+    assert window.shape[0] == env.shape[0] == vecs.shape[0] == 6
+    for i, x in enumerate(X):
+        w1, e1, f1, v1 = compute_features("eeg", x, 256)
+        assert np.array_equal(window[i], w1) and np.array_equal(env[i], e1)
+        assert feats[i] == f1 and np.array_equal(vecs[i], v1)
+
+
+def test_sample_carries_channels_and_aggregate(tmp_path):
+    path = str(tmp_path / "stereo.wav")
+    _stereo(path)
+    sample = run_phase45("audio", path, multichannel=True)
+    assert [c["channel"] for c in sample["channels"]] == ["ch0", "ch1"]
+    doms = [c["dom"] for c in sample["channels"]]
+    assert abs(doms[0] - 300) < 5 and abs(doms[1] - 1200) < 5
+    assert sample["features"]["dom"] == np.mean(doms)
+    assert sample["features"]["n_channels"] == 2
+    assert sample["vector"].shape == (5,)
+
+    block, fs, meta = load_by_domain("audio", path, multichannel=True)
+    mono, _, mono_meta = load_by_domain("audio", path)
+    mixed = run_phase45_batch("audio", [(block, fs, meta), (mono, fs, mono_meta)])
+    assert "channels" in mixed[0] and "channels" not in mixed[1]
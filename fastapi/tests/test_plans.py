@@ -0,0 +1,67 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.plans import PLANS, StageTimer, alignment_for, select_plan
+
+
+def test_explicit_mode_wins_over_budget():
+    assert select_plan("full", latency_budget_ms=50).name == "full"
+
+
+def test_budget_maps_to_richest_plan_that_fits():
+    assert select_plan(None, 200).name == "fast"
+    assert select_plan(None, 5000).name == "standard"
+    assert select_plan(None, 120000).name == "full"
+
+
+def test_default_plan_keeps_full_fidelity():
+    assert select_plan() is PLANS["full"]
+    assert PLANS["full"].assets and PLANS["full"].bootstrap
+
+
+def test_fast_plan_skips_intervals_and_assets():
+    fast = PLANS["fast"]
+    assert not (fast.blend or fast.bootstrap or fast.assets or fast.retrain)
+
+
+def test_source_alignment_needs_a_retraining_plan(monkeypatch):
+    assert alignment_for(PLANS["full"], "source") == "source"
+    with pytest.raises(ValueError, match="plan=full"):
+        alignment_for(PLANS["standard"], "source")
+    monkeypatch.setattr(settings, "ALIGNMENT_MODE", "source")
+    assert alignment_for(PLANS["fast"]) == "target"  # configured default degrades quietly
+
+
+def test_predict_reports_or_rejects_alignment(monkeypatch):
+    buf = io.BytesIO()
+    sf.write(buf, np.random.default_rng(0).standard_normal(16000 * 6).astype(np.float32), 16000, format="WAV")
+    files = {"files": ("a.wav", buf.getvalue(), "audio/wav")}
+    monkeypatch.setattr(settings, "ALIGNMENT_MODE", "source")
+    with TestClient(app) as client:
+        url = settings.API_PREFIX + "/predict"
+        explicit = client.post(url, data={"domain": "audio", "mode": "fast", "alignment": "source"}, files=files)
+        implicit = client.post(url, data={"domain": "audio", "mode": "fast"}, files=files)
+    assert explicit.status_code == 400 and "plan=full" in explicit.json()["detail"]
+    assert implicit.status_code == 200 and implicit.json()["plan"]["alignment"] == "target"
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        select_plan("turbo")
+
+
+def test_stage_timer_accumulates_in_order():
+    timer = StageTimer()
+    for _ in range(2):
+        with timer.stage("kitab"):
+            pass
+    with timer.stage("assets"):
+        pass
+    assert [s["stage"] for s in timer.stages()] == ["kitab", "assets"]
+    assert timer.server_timing().startswith("kitab;dur=")
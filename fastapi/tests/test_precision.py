@@ -0,0 +1,59 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from app.services import precision, spectral
+from app.services.features import compute_features, prepare_signal, psi_envelope
+from app.services.smoothing import moving_average
+
+
+def _signal(fs, seconds, f0, seed=0):
+    t = np.arange(int(fs * seconds)) / fs
+    rng = np.random.default_rng(seed)
+    return (np.sin(2 * np.pi * f0 * t) * np.exp(-3 * t / seconds) + 0.05 * rng.standard_normal(t.size)).astype(
+        np.float32
+    )
+
+
+def _features(monkeypatch, mode, domain, x, fs):
+    monkeypatch.setattr(precision.settings, "PRECISION", mode)
+    return compute_features(domain, x, fs)
+
+
+@pytest.mark.parametrize(
+    "domain,fs,seconds,f0",
+    [("audio", 44100, 3, 440.0), ("eeg", 256, 120, 10.0), ("ligo", 4096, 40, 150.0), ("grace", 1.0, 2000, 0.01)],
+)
+def test_float32_feature_drift_is_bounded(monkeypatch, domain, fs, seconds, f0):
+    x = _signal(fs, seconds, f0)
+    _, _, f64, v64 = _features(monkeypatch, "float64", domain, x, fs)
+    _, env32, f32, v32 = _features(monkeypatch, "float32", domain, x, fs)
+    assert env32.dtype == np.float32
+    for key, ref in f64.items():
+        assert abs(f32[key] - ref) <= 1e-3 * abs(ref) + 1e-6, key
+    assert np.allclose(v32, v64, rtol=1e-3, atol=1e-6)
+
+
+def test_float32_mode_stays_single_precision(monkeypatch):
+    monkeypatch.setattr(precision.settings, "PRECISION", "float32")
+    x = _signal(256, 30, 10.0)
+    assert precision.as_work(x) is x  # no up-cast copy
+    sig, fs = prepare_signal("eeg", x, 256)
+    assert sig.dtype == np.float32
+    Y, F = spectral.spectrum(sig[None], fs)
+    assert Y.dtype == np.float32 and F.dtype == np.float32
+    assert psi_envelope(sig).dtype == np.float32
+    assert moving_average(sig, 101).dtype == np.float32
+
+
+def test_float32_halves_ligo_peak_memory(monkeypatch):
+    x = _signal(4096, 256, 150.0)
+    peaks = {}
+    for mode in ("float64", "float32"):
+        monkeypatch.setattr(precision.settings, "PRECISION", mode)
+        tracemalloc.start()
+        compute_features("ligo", x, 4096)
+        peaks[mode] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    assert peaks["float32"] < 0.6 * peaks["float64"]
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.services import registry
+from app.services.training import load_kitab_params
+
+
+def _tiny_bundle(version="test-1"):
+    return {
+        "version": version,
+        "rf": None,
+        "lr": None,
+        "kit": np.arange(7, dtype=float),
+        "X_syn": np.zeros((4, 5)),
+        "y_syn": np.zeros(4),
+    }
+
+
+def test_bundle_roundtrip_records_checksum(tmp_path):
+    path = registry.save_bundle(_tiny_bundle(), str(tmp_path))
+    assert path.exists()
+    bundle = registry.load_bundle(str(tmp_path), "test-1")
+    assert bundle["version"] == "test-1"
+    assert np.allclose(bundle["kit"], np.arange(7))
+    manifest = json.loads((tmp_path / "phase45-test-1.json").read_text())
+    assert manifest["sha256"] == bundle["manifest"]["sha256"]
+    assert manifest["kitab"] == list(range(7))
+
+
+def test_corrupt_artifact_is_rejected(tmp_path):
+    path = registry.save_bundle(_tiny_bundle(), str(tmp_path))
+    with open(path, "ab") as fp:
+        fp.write(b"tampered")
+    with pytest.raises(registry.RegistryError):
+        registry.load_bundle(str(tmp_path), "test-1")
+
+
+def test_missing_version_is_rejected(tmp_path):
+    with pytest.raises(registry.RegistryError):
+        registry.load_bundle(str(tmp_path), "nope")
+
+
+def test_kitab_params_read_from_params_file():
+    params = load_kitab_params()
+    assert params.shape == (7,)
+    assert abs(params[0] - 2.1041) < 1e-9
+    assert abs(params[-1] - 8.1496) < 1e-9
+
+
+def test_array_payloads_are_memory_mapped(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry.settings, "MODEL_MMAP", True)
+    registry.save_bundle(_tiny_bundle(), str(tmp_path))
+    bundle = registry.load_bundle(str(tmp_path), "test-1")
+    assert isinstance(bundle["X_syn"], np.memmap)
+    assert not bundle["X_syn"].flags.writeable
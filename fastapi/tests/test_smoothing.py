@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from app.services.smoothing import StreamingMovingAverage, moving_average
+
+
+@pytest.mark.parametrize("n,win", [(5000, 25), (12289, 61), (7, 7), (2, 3)])
+def test_matches_convolve_same(n, win):
+    x = np.random.default_rng(n).random(n)
+    expected = np.convolve(x, np.ones(win) / win, mode="same")
+    out = moving_average(x, win)
+    assert out.shape == expected.shape
+    assert np.allclose(out, expected, rtol=0, atol=1e-12)
+
+
+def test_rows_are_smoothed_independently():
+    X = np.random.default_rng(0).random((3, 1000))
+    out = moving_average(X, 11)
+    for row, smoothed in zip(X, out):
+        assert np.allclose(smoothed, moving_average(row, 11), rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize("chunks", [1, 4, 37])
+def test_streaming_matches_one_shot(chunks):
+    x = np.random.default_rng(1).random(4000)
+    sm = StreamingMovingAverage(41)
+    parts = [sm.push(c) for c in np.array_split(x, chunks)] + [sm.flush()]
+    assert np.allclose(np.concatenate(parts), moving_average(x, 41), rtol=0, atol=1e-12)
+
+
+def test_even_window_rejected():
+    with pytest.raises(ValueError):
+        moving_average(np.ones(10), 4)
@@ -0,0 +1,33 @@
+import numpy as np
+from scipy.signal import hilbert
+
+from app.services import spectral
+
+
+def test_tone_peak_on_prime_length_window():
+    fs, n = 4096.0, 8191  # prime length: padded to a fast size internally
+    t = np.arange(n) / fs
+    x = np.sin(2 * np.pi * 300.0 * t)[None]
+    dom, cen, bw = spectral.spectral_stats(x, fs)
+    assert abs(dom[0] - 300.0) < 1.0
+    assert abs(cen[0] - 300.0) < 5.0
+    assert bw[0] < 50.0
+
+
+def test_windows_and_grids_are_cached_read_only():
+    assert spectral.hann(1000) is spectral.hann(1000)
+    assert spectral.rfft_grid(1024, 16000.0) is spectral.rfft_grid(1024, 16000.0)
+    assert not spectral.hann(1000).flags.writeable
+
+
+def test_analytic_envelope_matches_scipy_hilbert():
+    x = np.random.default_rng(0).standard_normal((3, 4801)).astype(np.float32)
+    assert np.array_equal(spectral.analytic_envelope(x), np.abs(hilbert(x, axis=-1)))
+    assert np.array_equal(spectral.analytic_envelope(x[0].astype(float)), np.abs(hilbert(x[0].astype(float))))
+
+
+def test_fft_workers_only_for_large_blocks(monkeypatch):
+    monkeypatch.setattr(spectral.settings, "FFT_WORKERS", 4)
+    monkeypatch.setattr(spectral.settings, "FFT_PARALLEL_MIN_SAMPLES", 1000)
+    assert spectral.fft_workers(999) == 1
+    assert spectral.fft_workers(1000) == 4
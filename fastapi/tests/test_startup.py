@@ -0,0 +1,54 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.lazy import has_module, lazy_import
+
+HEAVY = ("scipy.signal", "scipy.optimize", "sklearn", "matplotlib", "h5py", "soundfile", "boto3", "xarray")
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import app.main
+ms = (time.perf_counter() - t) * 1000
+print(json.dumps({"ms": ms, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY,)
+
+
+def _import_app():
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_import_stays_light_and_within_budget():
+    # best of two: the first run may also pay for a cold filesystem cache
+    runs = [_import_app() for _ in range(2)]
+    assert runs[0]["loaded"] == []
+    assert min(r["ms"] for r in runs) < settings.IMPORT_BUDGET_MS
+
+
+def test_lazy_module_loads_on_first_use():
+    sys.modules.pop("colorsys", None)  # stdlib and cheap; just needs to be unloaded
+    mod = lazy_import("colorsys")
+    assert "colorsys" not in sys.modules
+    assert mod.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert "colorsys" in sys.modules and "rgb_to_hsv" in vars(mod)
+    assert has_module("json") and not has_module("no_such_module_xyz")
+
+
+def test_health_reports_boot_timings():
+    from app.main import app
+
+    with TestClient(app) as client:
+        body = client.get(settings.API_PREFIX + "/health").json()
+    assert body["import_ms"] > 0 and body["boot_ms"] >= body["import_ms"]
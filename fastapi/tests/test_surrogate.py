@@ -0,0 +1,55 @@
+import numpy as np
+
+from app.services import registry
+from app.services.surrogate import BOUNDS, GridSurrogate
+
+
+class _Linear:
+    def __init__(self, coef, bias):
+        self.coef, self.bias = np.asarray(coef, dtype=float), bias
+
+    def predict(self, X):
+        return np.asarray(X) @ self.coef + self.bias
+
+
+class _Bumpy:
+    def predict(self, X):
+        X = np.asarray(X)
+        return np.exp(-1.5 * X[:, 0]) + X[:, 1] * X[:, 2]
+
+
+def _model(rf):
+    return {"rf": rf, "lr": _Linear([0.1, 0.2, -0.3, 0.4, 0.05], 8.0), "X_syn": None}
+
+
+def test_exact_for_multilinear_models():
+    model = _model(_Linear([0.5, 1.0, -1.0, 0.5, 0.02], 8.0))
+    sur = GridSurrogate.distill(model, resolution=3, n_check=500)
+    assert sur.report["max_abs_error"] < 1e-5
+    assert sur.grid.dtype == np.float32 and sur.grid.flags.c_contiguous
+
+
+def test_reported_bound_holds_and_shrinks_with_resolution():
+    model = _model(_Bumpy())
+    coarse = GridSurrogate.distill(model, resolution=4, n_check=2000)
+    fine = GridSurrogate.distill(model, resolution=8, n_check=2000)
+    assert fine.report["max_abs_error"] < coarse.report["max_abs_error"]
+    X = np.random.default_rng(9).uniform(BOUNDS[:, 0], BOUNDS[:, 1], (300, 5))
+    ref = 0.8 * model["rf"].predict(X) + 0.2 * model["lr"].predict(X)
+    assert np.max(np.abs(fine.predict(X) - ref)) <= fine.report["max_abs_error"] * 1.5
+
+
+def test_out_of_box_rows_are_clamped():
+    model = _model(_Linear([0.5, 1.0, -1.0, 0.5, 0.02], 8.0))
+    sur = GridSurrogate.distill(model, resolution=3, n_check=10)
+    inside = sur.predict([[3.0, 1.0, 0.0, 1.0, 2.0]])
+    outside = sur.predict([[9.0, 4.0, -2.0, 1.5, 7.0]])
+    np.testing.assert_allclose(inside, outside)
+
+
+def test_surrogate_roundtrip_through_registry(tmp_path):
+    sur = GridSurrogate.distill(_model(_Bumpy()), resolution=4, n_check=100)
+    registry.save_surrogate(sur, "t1", str(tmp_path))
+    loaded = registry.load_surrogate(str(tmp_path), "t1", 4)
+    np.testing.assert_array_equal(loaded.grid, sur.grid)
+    assert loaded.report["max_abs_error"] == sur.report["max_abs_error"]
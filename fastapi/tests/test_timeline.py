@@ -0,0 +1,98 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.services import executors, timeline
+from app.services.features import compute_features, prepare_signal
+from app.services.loaders import load_by_domain
+
+
+@pytest.fixture
+def wav_path(tmp_path):
+    fs = 8000
+    t = np.arange(fs * 40) / fs
+    x = np.sin(2 * np.pi * 440 * t) * (1 + 0.5 * np.sin(2 * np.pi * t / 10)) + 0.01 * np.random.default_rng(0).standard_normal(t.size)
+    path = tmp_path / "long.wav"
+    sf.write(path, x.astype(np.float32), fs, subtype="FLOAT")
+    return str(path)
+
+
+def test_window_starts():
+    assert timeline.window_starts(100.0, 30.0, 15.0).tolist() == [0.0, 15.0, 30.0, 45.0, 60.0]
+    assert timeline.window_starts(10.0, 30.0, 15.0).tolist() == [0.0]
+
+
+def test_rows_match_single_window_features(wav_path, monkeypatch):
+    monkeypatch.setattr(settings, "TIMELINE_CHUNK_WINDOWS", 3)
+    layout = timeline.plan("audio", wav_path, 10.0, 5.0)
+    assert layout["windows"] == 7 and layout["total_sec"] == pytest.approx(40.0)
+    rows = list(timeline.iter_timeline("audio", wav_path, layout))
+    assert rows[-1] == {"done": True, "windows": 7}
+    windows = rows[1:-1]
+    assert [r["index"] for r in windows] == list(range(7))
+    assert [r["start"] for r in windows] == [0.0, 5.0, 10.0, 15.0, 20.0, 25.0, 30.0]
+
+    # the third window is interior to its padded span, so it agrees with a whole-file pass
+    full, fs, _ = load_by_domain("audio", wav_path)
+    prepared, fs_p = prepare_signal("audio", full, fs)
+    i0 = int(10.0 * fs_p)
+    _, _, feat, _ = compute_features("audio", prepared[i0 : i0 + int(10.0 * fs_p)], fs_p)
+    assert windows[2]["dom"] == pytest.approx(feat["dom"], rel=1e-3)
+    assert windows[2]["energy"] == pytest.approx(feat["energy"], rel=1e-2)
+    assert windows[2]["ct_time"] == pytest.approx(10.0 + windows[2]["ct_proxy"])
+
+
+def test_pooled_matches_serial(wav_path, monkeypatch):
+    monkeypatch.setattr(settings, "TIMELINE_CHUNK_WINDOWS", 2)
+    layout = timeline.plan("audio", wav_path, 10.0, 10.0)
+    monkeypatch.setattr(executors, "domain_pool", lambda: None)
+    serial = list(timeline.iter_timeline("audio", wav_path, layout))
+    monkeypatch.undo()
+    monkeypatch.setattr(settings, "TIMELINE_CHUNK_WINDOWS", 2)
+    monkeypatch.setattr(settings, "DOMAIN_WORKERS", 2)
+    executors.start_domain_pool()
+    try:
+        pooled = list(timeline.iter_timeline("audio", wav_path, layout))
+    finally:
+        executors.reset_domain_pool()
+    assert pooled == serial
+
+
+def test_endpoint_streams_ndjson(wav_path, monkeypatch):
+    threads = []
+    real = timeline.plan
+
+    def plan(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(timeline, "plan", plan)
+    with TestClient(app) as client, open(wav_path, "rb") as f:
+        r = client.post(
+            f"{settings.API_PREFIX}/predict/timeline",
+            data={"domain": "audio", "window_sec": "20", "hop_sec": "10"},
+            files={"file": ("long.wav", f, "audio/wav")},
+        )
+    assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert lines[0]["name"] == "long.wav" and lines[0]["windows"] == 3
+    assert [line["index"] for line in lines[1:-1]] == [0, 1, 2]
+    assert len(lines[1]["vector"]) == len(lines[2]["vector"]) > 0
+    assert lines[-1] == {"done": True, "windows": 3}
+    assert threads and threads[0].startswith("phase45-io")  # probed off the event loop
+
+
+def test_endpoint_rejects_bad_hop(wav_path):
+    with TestClient(app) as client, open(wav_path, "rb") as f:
+        r = client.post(
+            f"{settings.API_PREFIX}/predict/timeline",
+            data={"domain": "audio", "hop_sec": "-1"},
+            files={"file": ("long.wav", f, "audio/wav")},
+        )
+    assert r.status_code == 400
@@ -0,0 +1,62 @@
+import h5py
+import numpy as np
+import pytest
+import soundfile as sf
+import xarray as xr
+
+from app.services import phase45
+from app.services.loaders import load_by_domain
+
+
+@pytest.fixture
+def wav_path(tmp_path):
+    fs = 8000
+    t = np.arange(fs * 60) / fs
+    x = (np.sin(2 * np.pi * 440 * t) * np.exp(-t / 5) + 0.01 * np.random.default_rng(0).standard_normal(t.size))
+    path = tmp_path / "long.wav"
+    sf.write(path, x.astype(np.float32), fs, subtype="FLOAT")
+    return str(path)
+
+
+def test_wav_window_is_a_slice_of_the_full_read(wav_path):
+    full, fs, _ = load_by_domain("audio", wav_path)
+    part, fs2, meta = load_by_domain("audio", wav_path, start=2.5, duration=4.0)
+    assert fs == fs2 == 8000
+    assert np.array_equal(part, full[20000:52000])
+    assert meta["start"] == 2.5 and meta["duration"] == 4.0 and meta["total_samples"] == full.size
+
+
+def test_window_is_clipped_to_the_file(wav_path):
+    part, _, meta = load_by_domain("audio", wav_path, start=58.0, duration=10.0)
+    assert part.size == 2 * 8000 and meta["duration"] == 2.0
+
+
+def test_hdf5_window_reads_a_slice(tmp_path):
+    path = str(tmp_path / "strain.hdf5")
+    data = np.random.default_rng(1).standard_normal(4096 * 8).astype(np.float32)
+    with h5py.File(path, "w") as f:
+        f.create_dataset("strain/Strain", data=data).attrs["Xspacing"] = 1 / 4096
+    x, fs, meta = load_by_domain("ligo", path, start=1.0, duration=2.0)
+    assert fs == 4096 and np.array_equal(x, data[4096:3 * 4096])
+    assert meta["total_samples"] == data.size
+
+
+def test_grace_window_selects_time_steps(tmp_path):
+    path = str(tmp_path / "grace.nc")
+    values = np.random.default_rng(2).standard_normal((100, 3, 4))
+    xr.Dataset({"lwe": (("time", "lat", "lon"), values)}).to_netcdf(path, engine="h5netcdf")
+    x, _, meta = load_by_domain("grace", path, start=10, duration=30)
+    assert np.allclose(x, values[10:40].reshape(30, -1).mean(axis=1))
+    assert meta["total_samples"] == 100
+
+
+def test_run_phase45_reads_only_the_feature_window(wav_path, monkeypatch):
+    monkeypatch.setattr(phase45.settings, "FEATURE_WINDOW_SEC", 10.0)
+    monkeypatch.setattr(phase45.settings, "FEATURE_READ_PAD_SEC", 5.0)
+    windowed = phase45.run_phase45("audio", wav_path)
+    monkeypatch.setattr(phase45.settings, "WINDOWED_READS", False)
+    full = phase45.run_phase45("audio", wav_path)
+    assert windowed["window"].size == full["window"].size
+    for key, ref in full["features"].items():
+        if isinstance(ref, float):
+            assert windowed["features"][key] == pytest.approx(ref, rel=1e-6, abs=1e-9), key